@@ -10,6 +10,7 @@ from db import db, db_session, initialize as initialize_db
 from config import Config
 from utils import logger, hostaway_webhook_manager
 from workers import (
+    jobs,
     hostaway_webhook_processor,
     slack_command_processor,
     reservation_sync_worker,
@@ -21,6 +22,10 @@ from blueprints.home import home_bp
 from blueprints.hostaway_routes import hostaway_routes_bp
 from blueprints.slack_routes import slack_routes_bp
 from blueprints.log_routes import log_routes_bp
+from blueprints.sync_routes import sync_routes_bp
+from blueprints.metrics_routes import metrics_routes_bp
+from blueprints.trace_routes import trace_routes_bp
+from blueprints.profiling_routes import profiling_routes_bp
 
 
 def create_app(config_class=Config):
@@ -34,8 +39,14 @@ def create_app(config_class=Config):
     initialize_db(app)
     Migrate(app, db)
 
+    # Bind the durable job queues to their storage
+    jobs.initialize(app)
+
     # Setup Logging
-    logger.setup_logging()
+    logger.setup_logging(
+        max_bytes=int(app.config["LOG_MAX_BYTES"]),
+        backup_count=int(app.config["LOG_BACKUP_COUNT"]),
+    )
 
     # Register blueprints / routes
     register_routes(app)
@@ -46,6 +57,9 @@ def create_app(config_class=Config):
     # Deregister webhook when the app shuts down
     atexit.register(hostaway_webhook_manager.deregister_all_unified_webhooks)
 
+    # Drain the Hostaway webhook workers when the app shuts down
+    atexit.register(hostaway_webhook_processor.stop_worker)
+
     # Register teardown function
     @app.teardown_appcontext
     def shutdown_session(exception=None):
@@ -64,6 +78,10 @@ def register_routes(app):
     app.register_blueprint(hostaway_routes_bp)
     app.register_blueprint(slack_routes_bp)
     app.register_blueprint(log_routes_bp)
+    app.register_blueprint(sync_routes_bp)
+    app.register_blueprint(metrics_routes_bp)
+    app.register_blueprint(trace_routes_bp)
+    app.register_blueprint(profiling_routes_bp)
 
 
 def start_worker_threads(app):
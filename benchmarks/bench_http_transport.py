@@ -0,0 +1,101 @@
+"""
+Micro-benchmark: pooled HTTP transport vs. module-level requests calls.
+
+Every requests.get/post opens a new connection (TCP handshake, plus a TLS handshake
+against the real APIs). The shared transport keeps connections alive per host.
+Runs against a local HTTP/1.1 stand-in server; with --tls (needs the openssl CLI)
+the server uses a throwaway self-signed certificate, closer to Hostaway and Slack.
+
+Usage: python benchmarks/bench_http_transport.py [requests] [--tls]
+"""
+
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from utils.http_transport import HttpTransport
+
+BODY = b'{"status": "success", "result": {"id": 12345678, "guestName": "Jane Doe"}}'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Headers and body are separate writes
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(tls, directory):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    scheme = "http"
+    if tls:
+        cert, key = os.path.join(directory, "cert.pem"), os.path.join(
+            directory, "key.pem"
+        )
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes"]
+            + ["-keyout", key, "-out", cert, "-days", "1", "-subj", "/CN=127.0.0.1"],
+            check=True,
+            capture_output=True,
+        )
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/v1/reservations/1"
+
+
+def measure(call, url, count):
+    call(url)  # Warm up
+    start = time.perf_counter()
+    for _ in range(count):
+        call(url).json()
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    count = int(args[0]) if args else 500
+    tls = "--tls" in sys.argv
+
+    with tempfile.TemporaryDirectory() as directory:
+        server, url = start_server(tls, directory)
+        transport = HttpTransport()
+
+        per_call = measure(lambda url: requests.get(url, verify=False), url, count)
+        pooled = measure(lambda url: transport.get(url, verify=False), url, count)
+
+        server.shutdown()
+
+    print(
+        f"{'https' if tls else 'http'}, {count} requests: "
+        f"requests.get {per_call * 1e3:6.3f} ms/call, "
+        f"pooled transport {pooled * 1e3:6.3f} ms/call "
+        f"({per_call / pooled:.1f}x, {(per_call - pooled) * 1e3:.3f} ms saved per call)"
+    )
+
+
+if __name__ == "__main__":
+    import urllib3
+
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: finding the events of one reservation, by scanning the log files vs through the log index.
+
+Logs N events spread over 2000 reservations through utils/logger, then looks up the events of
+reservations: scanning is what downloading the logs and grepping them amounts to (every line of
+every segment read and matched), the index answers the same question from the SQLite log index.
+Also reports the listener's time to write the events, with and without the index.
+
+Usage: python benchmarks/bench_log_search.py [events]
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import logger, log_index, log_reader
+
+RESERVATIONS = 2000
+LOOKUPS = 20
+
+
+def write_events(directory, count):
+    """Logs the events and returns the time the listener took to write them all."""
+    logger.LOG_DIRECTORY = directory
+    logger.setup_logging()
+    for name in logger.LOGGERS:
+        logging.getLogger(name).propagate = False
+    start = time.perf_counter()
+    for index in range(count):
+        reservation_id = 100000 + index % RESERVATIONS
+        logger.log_inform(
+            f"Reservation {reservation_id} updated",
+            logger="hostaway",
+            reservation_id=reservation_id,
+        )
+    logger.stop_logging()
+    return time.perf_counter() - start
+
+
+def scan(reservation_id):
+    needle = f'"reservation_id": {reservation_id}'.encode()
+    with log_reader.open_log("hostaway") as segments:
+        return [json.loads(line) for line in segments.iter_lines() if needle in line]
+
+
+def search(reservation_id):
+    return [
+        json.loads(record)
+        for event, record in log_index.search(
+            logger.get_index_path(),
+            fields={"reservation_id": reservation_id},
+            limit=log_index.MAX_SEARCH_RESULTS,
+        )
+    ]
+
+
+def measure(lookup):
+    start = time.perf_counter()
+    for index in range(LOOKUPS):
+        results = lookup(100000 + index * 37)
+    return (time.perf_counter() - start) / LOOKUPS, len(results)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    with tempfile.TemporaryDirectory() as directory:
+        original_handler = log_index.IndexHandler
+        log_index.IndexHandler = lambda path, queue: logging.NullHandler()
+        write_without_index = write_events(directory, count)
+        log_index.IndexHandler = original_handler
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_with_index = write_events(directory, count)
+        scan_time, scan_results = measure(scan)
+        search_time, search_results = measure(search)
+        start = time.perf_counter()
+        recent = log_index.search(
+            logger.get_index_path(),
+            since=datetime.now() - timedelta(hours=1),
+            until=datetime.now(),
+        )
+        range_time = time.perf_counter() - start
+
+    print(f"{count} events over {RESERVATIONS} reservations:")
+    print(
+        f"  write:  {write_without_index:.2f}s without the index, {write_with_index:.2f}s with it"
+    )
+    print(
+        f"  lookup: scan {scan_time * 1000:8.1f} ms, index {search_time * 1000:6.2f} ms "
+        f"({scan_time / search_time:.0f}x), {scan_results}/{search_results} events"
+    )
+    print(f"  last hour, first page: {range_time * 1000:.2f} ms, {len(recent)} events")
+
+
+if __name__ == "__main__":
+    main()
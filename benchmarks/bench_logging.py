@@ -0,0 +1,97 @@
+"""
+Benchmark: per-event logging overhead on the calling thread, before and after the queue-based backend.
+
+Before, each named logger had its own RotatingFileHandler (100 kB files), so every call formatted
+and wrote its record synchronously, and warnings and errors wrote two records (a pointer in the
+named log, the message in the standard log). After, calls only put one record on a queue; a
+background listener formats it as JSON, writes it to every log it belongs to and rotates with
+gzip compression. The drain time is the listener's time to write everything once calls are done.
+
+Usage: python benchmarks/bench_logging.py [events]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import logger
+
+MESSAGE = "Reservation %d data is out of sync with Hostaway. Resolving discrepancies..."
+
+
+def setup_legacy_logging(directory):
+    """utils/logger.setup_logging as it was before the queue-based backend."""
+    for name, level in [
+        ("general", logging.INFO),
+        ("errors", logging.ERROR),
+        ("warnings", logging.WARNING),
+        ("hostaway_data_sync", logging.INFO),
+    ]:
+        handler = RotatingFileHandler(
+            os.path.join(directory, f"{name}.log"), maxBytes=100000, backupCount=5
+        )
+        handler.setLevel(level)
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+        )
+        logging.getLogger(f"legacy.{name}").addHandler(handler)
+        logging.getLogger(f"legacy.{name}").setLevel(level)
+        logging.getLogger(f"legacy.{name}").propagate = False
+
+
+def legacy_log_inform(message, logger="general"):
+    logging.getLogger(f"legacy.{logger}").info(message)
+
+
+def legacy_log_warning(message, logger="general"):
+    logging.getLogger(f"legacy.{logger}").info(
+        f"Warning issued, see 'Warnings' log for details: {logger}/logs/warnings"
+    )
+    logging.getLogger("legacy.warnings").warning(message)
+
+
+def measure(log, count):
+    start = time.perf_counter()
+    for index in range(count):
+        log(MESSAGE % index, logger="hostaway_data_sync")
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_legacy_logging(directory)
+        legacy_inform = measure(legacy_log_inform, count)
+        legacy_warning = measure(legacy_log_warning, count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        logger.LOG_DIRECTORY = directory
+        logger.setup_logging()
+        for name in logger.LOGGERS:
+            logging.getLogger(name).propagate = False
+        inform = measure(logger.log_inform, count)
+        warning = measure(logger.log_warning, count)
+        start = time.perf_counter()
+        logger.stop_logging()
+        drain = time.perf_counter() - start
+
+    print(f"{count} events per kind, time on the calling thread:")
+    print(
+        f"  inform:  before {legacy_inform * 1e6:6.1f} us/event, "
+        f"after {inform * 1e6:6.1f} us/event ({legacy_inform / inform:.1f}x)"
+    )
+    print(
+        f"  warning: before {legacy_warning * 1e6:6.1f} us/event, "
+        f"after {warning * 1e6:6.1f} us/event ({legacy_warning / warning:.1f}x)"
+    )
+    print(f"  background listener drained {2 * count} events in {drain:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
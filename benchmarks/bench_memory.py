@@ -0,0 +1,85 @@
+"""
+Benchmark: cost of the memory introspection on the process it inspects.
+
+tracemalloc hooks every allocation while tracing, so it's only started on demand; this measures
+how much it slows down decoding webhook payloads, the allocation-heavy part of event handling,
+by traceback depth. Snapshots and queue footprints run on the admin request's thread.
+
+Usage: python benchmarks/bench_memory.py [payloads]
+"""
+
+import json
+import os
+import sys
+import time
+from queue import Queue
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import memory
+
+PAYLOAD = json.dumps(
+    {
+        "object": "reservation",
+        "event": "reservation.updated",
+        "data": {
+            "id": 12345678,
+            "listingMapId": 100,
+            "guestName": "Jane Doe",
+            "arrivalDate": "2024-06-01",
+            "departureDate": "2024-06-05",
+            "customFieldValues": [
+                {"id": index, "value": "x" * 20} for index in range(20)
+            ],
+        },
+    }
+)
+
+
+def decode(count):
+    start = time.perf_counter()
+    payloads = [json.loads(PAYLOAD) for _ in range(count)]
+    elapsed = time.perf_counter() - start
+    del payloads
+    return elapsed / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    baseline = min(decode(count) for _ in range(3))
+    print(f"decoding a payload: {baseline * 1e6:.1f} us")
+    for frames in (1, 5, 10):
+        memory.start_tracing(frames)
+        traced = min(decode(count) for _ in range(3))
+        print(
+            f"  traced, {frames:2} frame(s): {traced * 1e6:.1f} us "
+            f"({(traced / baseline - 1) * 100:+.0f}%)"
+        )
+        if frames == 1:
+            retained = [json.loads(PAYLOAD) for _ in range(count)]
+            start = time.perf_counter()
+            memory.take_snapshot()
+            print(
+                f"  snapshot with {count} payloads retained: "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms"
+            )
+            del retained
+        memory.stop_tracing()
+
+    # A full partition queue per webhook worker
+    queues = [Queue() for _ in range(4)]
+    for queue in queues:
+        for _ in range(100):
+            queue.put(json.loads(PAYLOAD))
+    memory.register_queue("bench", lambda: queues)
+    start = time.perf_counter()
+    footprint = memory.get_queue_footprints()["bench"]
+    print(
+        f"queue footprint of {footprint['items']} payloads ({footprint['bytes']} bytes): "
+        f"{(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
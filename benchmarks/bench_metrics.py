@@ -0,0 +1,71 @@
+"""
+Benchmark: cost of a histogram observation, per-thread shards vs a single shared lock.
+
+Instrumented code paths (event handling, HTTP calls, rate limiter grants) observe from many
+threads at once. A histogram guarded by one lock makes them contend on every observation;
+the metrics histograms update a per-thread shard instead and add the shards up when scraped.
+
+Usage: python benchmarks/bench_metrics.py [observations per thread]
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import metrics
+
+
+class LockedHistogram:
+    """A histogram whose buckets are shared by all threads under one lock."""
+
+    def __init__(self, buckets=metrics.DEFAULT_BUCKETS):
+        self.buckets = tuple(float(bound) for bound in buckets)
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observe(self, value, *label_values):
+        with self.lock:
+            values = self.series.setdefault(
+                label_values, [0] * (len(self.buckets) + 1) + [0.0]
+            )
+            values[bisect.bisect_left(self.buckets, value)] += 1
+            values[-1] += value
+
+
+def measure(histogram, thread_count, count):
+    def observe():
+        for index in range(count):
+            histogram.observe((index % 100) / 1000, "hostaway", "interactive")
+
+    threads = [threading.Thread(target=observe) for _ in range(thread_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return (time.perf_counter() - start) / (thread_count * count)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    print(f"{count} observations per thread:")
+    for thread_count in (1, 4, 8):
+        locked = measure(LockedHistogram(), thread_count, count)
+        sharded = measure(
+            metrics.Histogram("bench_seconds", "", labels=("limiter", "lane")),
+            thread_count,
+            count,
+        )
+        print(
+            f"  {thread_count} thread(s): lock {locked * 1e9:5.0f} ns, "
+            f"shards {sharded * 1e9:5.0f} ns per observation"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Benchmark: per-row reservation sync vs. the bulk-loaded, fingerprint-based diff engine.
+
+Syncs a portfolio of N stored reservations against Hostaway pages of 500 in which
+1% of the reservations changed. The per-row sync loads each reservation with
+db_session.get, compares str() of every column after inspecting the model, and
+updates the outdated ones one by one. The diff engine reads the stored content
+hashes of each page in one query, loads and diffs only the changed rows and
+writes them with a single bulk upsert per page.
+
+Usage: python benchmarks/bench_reservation_sync.py [reservation_count...]
+"""
+
+import os
+import sys
+import time
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event, inspect, insert
+
+from db import db, db_session, initialize, unit_of_work, savepoint
+import models
+from services import reservation_service, reservation_sync_service
+from utils import content_hash
+
+PAGE_SIZE = 500
+CHANGED_EVERY = 100  # 1% of the reservations changed on Hostaway
+
+
+def create_app(database_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{database_path}"
+    initialize(app)
+
+    with app.app_context():
+        engine = db.engine
+
+        # Let SQLAlchemy, not pysqlite, manage transactions so SAVEPOINTs work
+        @event.listens_for(engine, "connect")
+        def do_connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, "begin")
+        def do_begin(connection):
+            connection.exec_driver_sql("BEGIN")
+
+        db.create_all()
+
+    return app
+
+
+def reservation(reservation_id, version):
+    arrival = date(2024, 1, 1) + timedelta(days=reservation_id % 700)
+    return {
+        "id": reservation_id,
+        "listingMapId": 1000 + reservation_id % 50,
+        "channelId": 2000,
+        "source": "benchmark",
+        "status": f"modified v{version}" if version else "new",
+        "guestName": f"Guest {reservation_id}",
+        "arrivalDate": arrival.isoformat(),
+        "departureDate": (arrival + timedelta(days=3)).isoformat(),
+    }
+
+
+def remote_pages(count, version):
+    """Hostaway pages, with every CHANGED_EVERY-th reservation at the given version."""
+    for page_start in range(1, count + 1, PAGE_SIZE):
+        yield [
+            reservation(
+                reservation_id, version if reservation_id % CHANGED_EVERY == 0 else 0
+            )
+            for reservation_id in range(
+                page_start, min(page_start + PAGE_SIZE, count + 1)
+            )
+        ]
+
+
+def populate(count):
+    rows = []
+    for page in remote_pages(count, 0):
+        for obj in page:
+            rows.append(
+                {
+                    **obj,
+                    "arrivalDate": date.fromisoformat(obj["arrivalDate"]),
+                    "departureDate": date.fromisoformat(obj["departureDate"]),
+                }
+            )
+    for row in rows:
+        row["content_hash"] = content_hash.compute(models.Reservation.__table__, row)
+    db_session.execute(insert(models.Reservation), rows)
+    db_session.commit()
+
+
+def legacy_check_for_discrepancies(local_reservation, hostaway_reservation):
+    """check_for_discrepancies as it was before the diff engine."""
+    discrepancies = []
+    inspector = inspect(models.Reservation)
+    columns = {
+        column.name
+        for column in inspector.columns
+        if (column.name != "created_at" and column.name != "updated_at")
+        and column.name != "content_hash"  # Didn't exist back then
+    }
+    for column in columns:
+        local_value = getattr(local_reservation, column)
+        hostaway_value = hostaway_reservation.get(column)
+        if str(local_value) != str(hostaway_value):
+            discrepancies.append(
+                f"{column}: Local({local_value}) vs Hostaway({hostaway_value})"
+            )
+    return discrepancies
+
+
+def legacy_sync_page(reservations):
+    """The per-row page sync, without Slack notifications."""
+    outdated = 0
+    with unit_of_work():
+        for hostaway_reservation in reservations:
+            local_reservation = db_session.get(
+                models.Reservation, hostaway_reservation["id"]
+            )
+            if legacy_check_for_discrepancies(local_reservation, hostaway_reservation):
+                outdated += 1
+                with savepoint():
+                    reservation_service.update_reservation(
+                        hostaway_reservation, notifySuccess=False
+                    )
+    db_session.expunge_all()
+    return 0, outdated
+
+
+def run(sync_page, count, version):
+    start = time.perf_counter()
+    outdated = 0
+    for page in remote_pages(count, version):
+        outdated += sync_page(page)[1]
+    return time.perf_counter() - start, outdated
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+
+    for count in counts:
+        with tempfile.TemporaryDirectory() as directory:
+            app = create_app(os.path.join(directory, "bench.db"))
+            with app.app_context():
+                populate(count)
+                legacy_seconds, legacy_outdated = run(legacy_sync_page, count, 1)
+                engine_seconds, engine_outdated = run(
+                    reservation_sync_service.sync_reservation_page, count, 2
+                )
+                db_session.remove()
+
+        assert legacy_outdated == engine_outdated == count // CHANGED_EVERY
+        print(
+            f"{count:>7} reservations ({legacy_outdated} outdated): "
+            f"per-row {legacy_seconds:6.2f}s ({count / legacy_seconds:8,.0f}/s), "
+            f"diff engine {engine_seconds:6.2f}s ({count / engine_seconds:8,.0f}/s), "
+            f"{legacy_seconds / engine_seconds:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: per-event commits vs. micro-batched unit of work for webhook ingestion.
+
+Creates reservations through reservation_service.create_reservation against a
+SQLite file database (synchronous=FULL, so every commit pays an fsync), first
+with one commit per event, then with batches of BATCH_SIZE events committed in
+a single transaction with one savepoint per event.
+
+Usage: python benchmarks/bench_unit_of_work.py [event_count] [batch_size]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+
+from db import db, db_session, initialize, unit_of_work, savepoint
+from services import reservation_service
+
+
+def create_app(database_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{database_path}"
+    initialize(app)
+
+    with app.app_context():
+        engine = db.engine
+
+        # Let SQLAlchemy, not pysqlite, manage transactions so SAVEPOINTs work
+        @event.listens_for(engine, "connect")
+        def do_connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+            dbapi_connection.execute("PRAGMA synchronous=FULL")
+
+        @event.listens_for(engine, "begin")
+        def do_begin(connection):
+            connection.exec_driver_sql("BEGIN")
+
+        db.create_all()
+
+    return app
+
+
+def reservation(reservation_id):
+    return {
+        "id": reservation_id,
+        "listingMapId": 1000 + reservation_id % 50,
+        "channelId": 2000,
+        "source": "benchmark",
+        "status": "new",
+        "guestName": f"Guest {reservation_id}",
+    }
+
+
+def run_per_event(first_id, count):
+    for reservation_id in range(first_id, first_id + count):
+        reservation_service.create_reservation(
+            reservation(reservation_id), notifySuccess=False
+        )
+
+
+def run_batched(first_id, count, batch_size):
+    for batch_start in range(first_id, first_id + count, batch_size):
+        batch_end = min(batch_start + batch_size, first_id + count)
+        with unit_of_work():
+            for reservation_id in range(batch_start, batch_end):
+                with savepoint():
+                    reservation_service.create_reservation(
+                        reservation(reservation_id), notifySuccess=False
+                    )
+
+
+def main():
+    event_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app(os.path.join(directory, "bench.db"))
+        with app.app_context():
+            start = time.perf_counter()
+            run_per_event(1, event_count)
+            per_event_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            run_batched(event_count + 1, event_count, batch_size)
+            batched_seconds = time.perf_counter() - start
+
+            db_session.remove()
+
+    print(f"events: {event_count}, batch size: {batch_size}")
+    print(
+        f"per-event commits: {per_event_seconds:.2f}s ({event_count / per_event_seconds:,.0f} events/s)"
+    )
+    print(
+        f"micro-batched:     {batched_seconds:.2f}s ({event_count / batched_seconds:,.0f} events/s)"
+    )
+    print(f"speedup: {per_event_seconds / batched_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
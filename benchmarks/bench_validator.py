@@ -0,0 +1,115 @@
+"""
+Micro-benchmark: compiled per-model validators vs. the previous per-call inspection.
+
+The previous implementation ran sqlalchemy.inspect(model) and walked every column
+with isinstance chains on each call, and the services then rebuilt the set of
+valid columns to filter the payload. The compiled validator does validation,
+conversion and filtering in a single pass over precomputed column metadata.
+
+Usage: python benchmarks/bench_validator.py [iterations]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect
+from sqlalchemy.types import Integer, String, Boolean
+
+import models
+from utils import validator
+
+RESERVATION = {
+    "id": 12345678,
+    "listingMapId": 98765,
+    "channelId": 2005,
+    "source": "airbnbOfficial",
+    "status": "new",
+    "guestName": "Jane Doe",
+    "arrivalDate": "2024-09-01",
+    "departureDate": "2024-09-05",
+    "guestEmail": "jane@example.com",
+    "totalPrice": 1234.5,
+    "isPaid": 1,
+    "customFieldValues": [],
+}
+
+MESSAGE = {
+    "id": 555,
+    "accountId": 1,
+    "reservationId": 12345678,
+    "conversationId": 777,
+    "body": "What time is check-in?",
+    "communicationType": "channel",
+    "status": "sent",
+    "isIncoming": 1,
+    "date": "2024-08-30 10:00:00",
+    "insertedOn": "2024-08-30 10:00:01",
+    "updatedOn": "2024-08-30 10:00:01",
+    "attachments": [],
+}
+
+
+def legacy_validate(data, model, object_type):
+    """The validator as it was before compilation."""
+    inspector = inspect(model)
+
+    for column in inspector.columns:
+        column_name = column.name
+        column_type = column.type
+        is_nullable = column.nullable
+
+        if (
+            not is_nullable
+            and column_name not in data
+            and column_name not in ["created_at", "updated_at"]
+        ):
+            return False, f"Missing required field: {column_name}"
+
+        if column_name in data:
+            value = data[column_name]
+            if value is not None:
+                if isinstance(column_type, Integer) and not isinstance(value, int):
+                    return False, f"Incorrect type for {object_type}"
+                elif isinstance(column_type, String) and not isinstance(value, str):
+                    return False, f"Incorrect type for {object_type}"
+                elif isinstance(column_type, Boolean) and not isinstance(value, int):
+                    if value not in [0, 1]:
+                        return False, f"Incorrect type for {object_type}"
+
+    return True, "Valid data"
+
+
+def legacy_validate_and_filter(data, model, object_type):
+    """Legacy validation followed by the per-event column filtering done in the services."""
+    isValid, msg = legacy_validate(data, model, object_type)
+    valid_columns = {column.name for column in model.__table__.columns}
+    return {key: value for key, value in data.items() if key in valid_columns}
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    for object_type, model, payload in (
+        ("reservation", models.Reservation, RESERVATION),
+        ("conversationMessage", models.ConversationMessage, MESSAGE),
+    ):
+        legacy = timeit.timeit(
+            lambda: legacy_validate_and_filter(payload, model, object_type),
+            number=iterations,
+        )
+        compiled = timeit.timeit(
+            lambda: validator.validate_and_clean_hostaway_payload(payload, object_type),
+            number=iterations,
+        )
+        print(
+            f"{object_type:>20}: legacy {legacy / iterations * 1e6:6.2f} us/call, "
+            f"compiled {compiled / iterations * 1e6:6.2f} us/call "
+            f"({legacy / compiled:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
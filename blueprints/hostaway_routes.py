@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from workers import jobs
+from utils import hostaway_client, tracing
 
 hostaway_routes_bp = Blueprint("hostaway", __name__)
 
@@ -17,8 +18,12 @@ def receive_hostaway_webhook():
             400,
         )
 
-    # Send payload to Hostaway Webhook job queue
-    jobs.hostaway_webhook_queue.put(request.json)
+    # Send payload to Hostaway Webhook job queue, with the id of its trace through the pipeline
+    trace_id = tracing.new_trace_id()
+    with tracing.trace(trace_id, "receive"):
+        payload = request.json
+        with tracing.span("enqueue"):
+            jobs.hostaway_webhook_queue.put(payload, trace_id=trace_id)
 
     # Return a success response to Hostaway
     return (
@@ -26,7 +31,14 @@ def receive_hostaway_webhook():
             {
                 "status": "success",
                 "message": "Webhook data received successfully",
+                "trace_id": trace_id,
             }
         ),
         200,
     )
+
+
+@hostaway_routes_bp.route("/hostaway/rate-limit", methods=["GET"])
+def get_rate_limit_stats():
+    """Report the Hostaway API budget: available tokens and per-lane queue waits."""
+    return jsonify(hostaway_client.hostaway_rate_limiter.stats()), 200
@@ -1,45 +1,177 @@
-import os
-from flask import Blueprint, jsonify, Response
-from utils import notifier
+import json
+import logging
+import re
+import zlib
+from collections import deque
+from datetime import datetime
+from flask import Blueprint, jsonify, Response, request
+from utils import notifier, log_reader, log_index, logger
 
 log_routes_bp = Blueprint("logs", __name__)
 
+LOG_TYPE_PATTERN = re.compile(r"^[\w-]+$")
+
+
+@log_routes_bp.route("/logs/search", methods=["GET"])
+def search_logs():
+    """
+    Search the log index, newest events first, without scanning the log files.
+    Criteria are combined: ?reservation_id=, ?task_id= and ?conversation_id=,
+    ?level= (lowest level, e.g. warning), ?logger=, ?since= and ?until= (ISO timestamps) and ?q= (a phrase
+    in the message). Results are paged with ?limit= and ?before=, set to the previous page's next_before.
+    """
+    try:
+        since = __parse_time(request.args.get("since"))
+        until = __parse_time(request.args.get("until"))
+        level = __parse_level(request.args.get("level"))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    limit = min(
+        max(request.args.get("limit", 100, type=int), 0), log_index.MAX_SEARCH_RESULTS
+    )
+    events = log_index.search(
+        logger.get_index_path(),
+        fields={
+            name: request.args[name]
+            for name in log_index.INDEXED_FIELDS
+            if name in request.args
+        },
+        level=level,
+        logger=request.args.get("logger"),
+        since=since,
+        until=until,
+        text=request.args.get("q"),
+        before=request.args.get("before", type=int),
+        limit=limit,
+    )
+
+    return (
+        jsonify(
+            {
+                "events": [json.loads(record) for event, record in events],
+                "next_before": (
+                    events[-1][0] if events and len(events) == limit else None
+                ),
+            }
+        ),
+        200,
+    )
+
 
 @log_routes_bp.route("/logs/<log_type>", methods=["GET"])
 def get_log(log_type):
     """
-    Serve the specified log file content.
+    Stream the specified log file content, across its rotated segments (oldest first).
+    ?tail=N serves the last N lines, ?since= and ?until= (ISO timestamps) the lines logged in that range.
+    Unfiltered logs support Range requests. Responses are gzip-compressed for clients accepting it.
     """
-    log_file_path = f"logs/{log_type}.log"
+    try:
+        tail = request.args.get("tail", type=int)
+        since = __parse_time(request.args.get("since"))
+        until = __parse_time(request.args.get("until"))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if tail is not None and tail < 0:
+        return (
+            jsonify({"status": "error", "message": "tail must not be negative"}),
+            400,
+        )
 
-    # Check if the log file exists
-    if not os.path.exists(log_file_path):
+    try:
+        segments = (
+            log_reader.open_log(log_type) if LOG_TYPE_PATTERN.match(log_type) else None
+        )
+    except OSError as e:
+        notifier.error(f"Error serving log file: {str(e)}")
         return (
             jsonify(
                 {
                     "status": "error",
-                    "message": f"Log file '{log_type}.log' not found",
+                    "message": f"Failed to read log file: {log_type}.log",
                 }
             ),
-            404,
+            500,
         )
 
-    try:
-        # Read the log file
-        with open(log_file_path, "r") as log_file:
-            log_content = log_file.read()
-
-        # Return the log content as a plain text response
-        return Response(log_content, mimetype="text/plain")
-
-    except Exception as e:
-        notifier.error(f"Error serving log file: {str(e)}")
+    # Check if the log file exists
+    if segments is None or not segments.exists():
+        if segments is not None:
+            segments.close()
         return (
             jsonify(
                 {
                     "status": "error",
-                    "message": f"Failed to read log file: {log_file_path}",
+                    "message": f"Log file '{log_type}.log' not found",
                 }
             ),
-            500,
+            404,
         )
+
+    status = 200
+    headers = {"Accept-Ranges": "bytes"}
+    length = None
+    if since is not None or until is not None:
+        lines = log_reader.filter_lines(segments.iter_lines(), since, until)
+        body = deque(lines, maxlen=tail) if tail is not None else lines
+    elif tail is not None:
+        body = segments.iter_bytes(segments.get_tail_offset(tail))
+    elif request.range is not None and request.range.units == "bytes":
+        byte_range = request.range.range_for_length(segments.size)
+        if byte_range is None:
+            segments.close()
+            return Response(
+                status=416, headers={"Content-Range": f"bytes */{segments.size}"}
+            )
+        start, stop = byte_range
+        status = 206
+        headers["Content-Range"] = request.range.to_content_range_header(segments.size)
+        body = segments.iter_bytes(start, stop)
+        length = stop - start
+    else:
+        body = segments.iter_bytes()
+        length = segments.size
+
+    # Ranges address the uncompressed content, so they are served as is
+    if status != 206 and "gzip" in request.accept_encodings:
+        body = __gzip(body)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+        length = None
+    if length is not None:
+        headers["Content-Length"] = str(length)
+
+    response = Response(body, status=status, headers=headers, mimetype="text/plain")
+    response.call_on_close(segments.close)
+    return response
+
+
+def __parse_time(value):
+    """Parses an ISO timestamp into a naive local time, the time the log lines are written in."""
+    if value is None:
+        return None
+    try:
+        timestamp = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {value}")
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+
+def __parse_level(value):
+    if value is None:
+        return None
+    level = logging.getLevelName(value.upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Invalid level: {value}")
+    return level
+
+
+def __gzip(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)  # gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
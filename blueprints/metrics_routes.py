@@ -0,0 +1,12 @@
+from flask import Blueprint, Response
+from utils import metrics
+
+metrics_routes_bp = Blueprint("metrics", __name__)
+
+
+@metrics_routes_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Expose the process metrics (queues, event handling, outbound APIs) in the Prometheus text format."""
+    return Response(
+        metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,226 @@
+import hmac
+from datetime import datetime
+from flask import Blueprint, Response, current_app, jsonify, request
+from utils import profiler, memory
+
+profiling_routes_bp = Blueprint("profiling", __name__)
+
+SORT_KEYS = ("cumulative", "tottime", "calls", "ncalls", "time")
+
+
+@profiling_routes_bp.before_request
+def check_admin_token():
+    """Admin endpoints require the ADMIN_TOKEN as a bearer token, and are disabled without one."""
+    token = current_app.config.get("ADMIN_TOKEN")
+    if not token:
+        return (
+            jsonify({"status": "error", "message": "Admin endpoints are disabled"}),
+            403,
+        )
+
+    authorization = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        return jsonify({"status": "error", "message": "Unauthorized"}), 401
+
+
+@profiling_routes_bp.route("/admin/profile", methods=["POST"])
+def profile():
+    """
+    Sample the stacks of every thread for ?seconds= (default 10, at most 120) every ?interval_ms= (default 10),
+    and serve them as collapsed stacks, one "thread;frame;...;frame count" line each, for flamegraph.pl or
+    speedscope (?format=collapsed, the default), or as JSON (?format=json).
+    ?thread= keeps the threads whose name contains it, e.g. hostaway-webhook-worker.
+    """
+    seconds = min(
+        max(request.args.get("seconds", 10, type=float), 0),
+        profiler.MAX_PROFILE_SECONDS,
+    )
+    interval = max(
+        request.args.get("interval_ms", 10, type=float) / 1000,
+        profiler.MIN_SAMPLE_INTERVAL_SECONDS,
+    )
+    output_format = request.args.get("format", "collapsed")
+    if output_format not in ("collapsed", "json"):
+        return (
+            jsonify({"status": "error", "message": f"Unknown format: {output_format}"}),
+            400,
+        )
+
+    try:
+        stacks, samples, sampling_time = profiler.sample_stacks(
+            seconds, interval, request.args.get("thread")
+        )
+    except profiler.ProfilerBusyError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+
+    if output_format == "json":
+        return (
+            jsonify(
+                {
+                    "seconds": seconds,
+                    "samples": samples,
+                    "sampling_ms": round(sampling_time * 1000, 3),
+                    "stacks": [
+                        {"stack": stack.split(";"), "count": count}
+                        for stack, count in stacks.most_common()
+                    ],
+                }
+            ),
+            200,
+        )
+
+    filename = f"profile-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.folded"
+    return Response(
+        profiler.format_collapsed(stacks),
+        mimetype="text/plain",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@profiling_routes_bp.route("/admin/profile/events/<event_type>", methods=["POST"])
+def arm_event_profile(event_type):
+    """Profile the handling of the next ?count= (default 10) Hostaway events of the type with cProfile."""
+    count = min(
+        max(request.args.get("count", 10, type=int), 1), profiler.MAX_PROFILED_EVENTS
+    )
+    profiler.arm_event_profile(event_type, count)
+    return jsonify({"status": "success", "event_type": event_type, "count": count}), 200
+
+
+@profiling_routes_bp.route("/admin/profile/events/<event_type>", methods=["GET"])
+def get_event_profile(event_type):
+    """
+    Serve the cProfile statistics of the events of the type profiled so far, added up:
+    the ?limit= (default 40) functions with the highest ?sort= key (default cumulative, or tottime, calls).
+    """
+    sort = request.args.get("sort", "cumulative")
+    if sort not in SORT_KEYS:
+        return jsonify({"status": "error", "message": f"Unknown sort: {sort}"}), 400
+
+    event_profile = profiler.get_event_profile(
+        event_type, sort, max(request.args.get("limit", 40, type=int), 1)
+    )
+    if event_profile is None:
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "message": f"Profiling isn't armed for {event_type} events",
+                }
+            ),
+            404,
+        )
+
+    return jsonify(event_profile), 200
+
+
+@profiling_routes_bp.route("/admin/profile/events/<event_type>", methods=["DELETE"])
+def disarm_event_profile(event_type):
+    """Stop profiling the events of the type and discard their statistics."""
+    if not profiler.disarm_event_profile(event_type):
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "message": f"Profiling isn't armed for {event_type} events",
+                }
+            ),
+            404,
+        )
+
+    return jsonify({"status": "success"}), 200
+
+
+@profiling_routes_bp.route("/admin/memory", methods=["GET"])
+def get_memory():
+    """
+    Report the memory of the process: resident memory, the identity maps of the open ORM sessions,
+    the footprint of the in-memory queues and, while tracing allocations, the ?limit= (default 20)
+    locations holding the most memory, grouped by ?group_by= (lineno, the default, filename or traceback).
+    """
+    group_by = request.args.get("group_by", "lineno")
+    if group_by not in memory.GROUP_BY:
+        return (
+            jsonify({"status": "error", "message": f"Unknown group_by: {group_by}"}),
+            400,
+        )
+
+    report = {
+        "process": memory.get_process_stats(),
+        "sessions": memory.get_session_stats(),
+        "queues": memory.get_queue_footprints(),
+        "tracemalloc": memory.get_tracing_stats(),
+    }
+    if report["tracemalloc"]["tracing"]:
+        report["tracemalloc"]["top_allocators"] = memory.get_top_allocators(
+            max(request.args.get("limit", 20, type=int), 1), group_by
+        )
+    return jsonify(report), 200
+
+
+@profiling_routes_bp.route("/admin/memory/tracing", methods=["POST"])
+def start_memory_tracing():
+    """
+    Start tracing allocations with tracemalloc, keeping ?frames= (default 1) frames per allocation,
+    more to tell the callers of an allocating line apart (group_by=traceback).
+    Tracing slows every allocation down and takes memory of its own: stop it once done.
+    """
+    frames = min(
+        max(request.args.get("frames", memory.DEFAULT_TRACEBACK_FRAMES, type=int), 1),
+        100,
+    )
+    started = memory.start_tracing(frames)
+    return jsonify({"status": "success", "started": started}), 200
+
+
+@profiling_routes_bp.route("/admin/memory/tracing", methods=["DELETE"])
+def stop_memory_tracing():
+    """Stop tracing allocations and discard the snapshots."""
+    memory.stop_tracing()
+    return jsonify({"status": "success"}), 200
+
+
+@profiling_routes_bp.route("/admin/memory/snapshots", methods=["POST"])
+def take_memory_snapshot():
+    """Take a snapshot of the traced allocations, to diff later ones against (the last 5 are kept)."""
+    try:
+        return jsonify(memory.take_snapshot()), 200
+    except memory.TracingNotStartedError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+
+
+@profiling_routes_bp.route("/admin/memory/snapshots", methods=["GET"])
+def get_memory_snapshots():
+    return jsonify({"snapshots": memory.get_snapshots()}), 200
+
+
+@profiling_routes_bp.route("/admin/memory/diff", methods=["GET"])
+def diff_memory():
+    """
+    List the ?limit= (default 20) locations whose memory changed the most between snapshot ?from=
+    (default: the oldest kept) and snapshot ?to= (default: a new snapshot, taken now), grouped by ?group_by=.
+    """
+    group_by = request.args.get("group_by", "lineno")
+    if group_by not in memory.GROUP_BY:
+        return (
+            jsonify({"status": "error", "message": f"Unknown group_by: {group_by}"}),
+            400,
+        )
+
+    try:
+        memory_diff = memory.diff(
+            request.args.get("from", type=int),
+            request.args.get("to", type=int),
+            max(request.args.get("limit", 20, type=int), 1),
+            group_by,
+        )
+    except memory.TracingNotStartedError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+
+    if memory_diff is None:
+        return (
+            jsonify({"status": "error", "message": "Snapshot not found"}),
+            404,
+        )
+
+    return jsonify(memory_diff), 200
@@ -0,0 +1,35 @@
+from flask import Blueprint, request, jsonify
+from services import reservation_sync_service
+
+sync_routes_bp = Blueprint("sync", __name__)
+
+
+@sync_routes_bp.route("/sync/reports/<int:report_id>", methods=["GET"])
+def get_sync_report(report_id):
+    """
+    Serve a reservation sync report with its discrepancies.
+    Discrepancies can be filtered with ?field= and paged with ?limit= and ?offset=.
+    """
+    limit = min(
+        request.args.get("limit", reservation_sync_service.REPORT_PAGE_SIZE, type=int),
+        reservation_sync_service.REPORT_PAGE_SIZE,
+    )
+    report = reservation_sync_service.get_report_details(
+        report_id,
+        field=request.args.get("field"),
+        limit=max(limit, 0),
+        offset=max(request.args.get("offset", 0, type=int), 0),
+    )
+
+    if report is None:
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "message": f"Sync report {report_id} not found",
+                }
+            ),
+            404,
+        )
+
+    return jsonify(report), 200
@@ -0,0 +1,40 @@
+from flask import Blueprint, request, jsonify
+from utils import tracing
+
+trace_routes_bp = Blueprint("traces", __name__)
+
+MAX_TRACES = 100
+
+
+@trace_routes_bp.route("/traces", methods=["GET"])
+def get_slowest_traces():
+    """
+    List the slowest recent webhook traces, slowest first, with the time spent in each kind of span
+    (queue wait, validation, service, db, commit, http, hydration, notification).
+    ?limit= sets the number of traces (default 20) and ?min_duration_ms= the shortest one listed.
+    Older traces are in the 'tracing' log, and can be found with /logs/search?trace_id=.
+    """
+    limit = min(max(request.args.get("limit", 20, type=int), 0), MAX_TRACES)
+    min_duration_ms = request.args.get("min_duration_ms", 0, type=float)
+    return (
+        jsonify({"traces": tracing.get_slowest_traces(limit, min_duration_ms)}),
+        200,
+    )
+
+
+@trace_routes_bp.route("/traces/<trace_id>", methods=["GET"])
+def get_trace(trace_id):
+    """Serve a recent trace with its segments and their spans."""
+    trace = tracing.get_trace(trace_id)
+    if trace is None:
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "message": f"Trace {trace_id} not found among recent traces",
+                }
+            ),
+            404,
+        )
+
+    return jsonify(trace), 200
@@ -4,3 +4,28 @@ import os
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URI")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Optional separate store for the durable job queue (e.g. "sqlite:///jobs.db")
+    JOB_QUEUE_DATABASE_URI = os.getenv("JOB_QUEUE_DATABASE_URI")
+
+    # Number of parallel Hostaway webhook workers (events are partitioned by entity)
+    HOSTAWAY_WEBHOOK_WORKER_COUNT = os.getenv("HOSTAWAY_WEBHOOK_WORKER_COUNT", 4)
+
+    # Micro-batching of Hostaway webhook payloads: up to BATCH_SIZE payloads collected for
+    # at most BATCH_WAIT_MS are committed in one transaction (a size of 1 disables batching)
+    HOSTAWAY_WEBHOOK_BATCH_SIZE = os.getenv("HOSTAWAY_WEBHOOK_BATCH_SIZE", 1)
+    HOSTAWAY_WEBHOOK_BATCH_WAIT_MS = os.getenv("HOSTAWAY_WEBHOOK_BATCH_WAIT_MS", 20)
+
+    # Reservation sync: "incremental" re-scans date windows of the portfolio on their own schedule
+    # (see services/reservation_sync_service.py), "full" re-downloads every reservation at midnight
+    RESERVATION_SYNC_MODE = os.getenv("RESERVATION_SYNC_MODE", "incremental")
+
+    # Months of arrivals re-scanned month by month; older reservations are synced as one archive window
+    RESERVATION_SYNC_HISTORY_MONTHS = os.getenv("RESERVATION_SYNC_HISTORY_MONTHS", 24)
+
+    # Log files are rotated at LOG_MAX_BYTES into LOG_BACKUP_COUNT gzip-compressed segments
+    LOG_MAX_BYTES = os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)
+    LOG_BACKUP_COUNT = os.getenv("LOG_BACKUP_COUNT", 5)
+
+    # Bearer token of the admin endpoints (/admin/profile, /admin/memory); they are disabled when unset
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
@@ -1,6 +1,11 @@
+import threading
+from contextlib import contextmanager
+
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import scoped_session, sessionmaker
 
+from utils import tracing, memory
+
 # Create a new SQLAlchemy instance
 db = SQLAlchemy()
 
@@ -8,6 +13,13 @@ db = SQLAlchemy()
 session_factory = sessionmaker()
 db_session = scoped_session(session_factory)
 
+# Per-thread unit of work state (see unit_of_work)
+__unit_of_work = threading.local()
+
+# Per-thread callbacks waiting for the current transaction to commit (see on_commit)
+# One list for the transaction, plus one per open savepoint
+__commit_callbacks = threading.local()
+
 
 def initialize(app):
     """
@@ -19,3 +31,118 @@ def initialize(app):
         session_factory.configure(
             bind=db.engine
         )  # Bind the session factory to the engine within app context
+        tracing.instrument_engine(db.engine)
+        memory.instrument_sessions(session_factory)
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Groups the database work of several events into a single transaction.
+    Inside the block, commit() only flushes and the transaction is committed once when the block exits.
+    Wrap each event in savepoint() so a failing event doesn't poison the rest of the batch.
+    """
+    __unit_of_work.savepoints = []
+    try:
+        yield
+        with tracing.span("commit"):
+            db_session.commit()
+    except Exception:
+        db_session.rollback()
+        __discard_commit_callbacks()
+        raise
+    finally:
+        del __unit_of_work.savepoints
+
+    __run_commit_callbacks()
+
+
+@contextmanager
+def savepoint():
+    """
+    Isolates one event inside a unit of work.
+    The event's changes are released into the batch on success and rolled back on error.
+    """
+    nested = db_session.begin_nested()
+    __unit_of_work.savepoints.append(nested)
+    callback_stack = __get_commit_callback_stack()
+    callback_stack.append([])
+    try:
+        yield
+        if nested.is_active:
+            nested.commit()
+    except Exception:
+        if nested.is_active:
+            nested.rollback()
+        callback_stack.pop()
+        raise
+    else:
+        # Released savepoint: its callbacks now wait for the enclosing transaction
+        callbacks = callback_stack.pop()
+        callback_stack[-1].extend(callbacks)
+    finally:
+        __unit_of_work.savepoints.pop()
+
+
+def in_unit_of_work():
+    """Returns True if the current thread is inside a unit_of_work() block."""
+    return hasattr(__unit_of_work, "savepoints")
+
+
+def commit():
+    """
+    Commits the session, or only flushes it when running inside a unit of work.
+    Outside a unit of work, a failed commit rolls the session back, so the thread's next
+    transaction doesn't fail on the leftovers of this one.
+    """
+    if in_unit_of_work():
+        db_session.flush()
+        return
+
+    try:
+        with tracing.span("commit"):
+            db_session.commit()
+    except Exception:
+        db_session.rollback()
+        __discard_commit_callbacks()
+        raise
+    __run_commit_callbacks()
+
+
+def rollback():
+    """Rolls back the session, or only the current event's savepoint when running inside a unit of work."""
+    savepoints = getattr(__unit_of_work, "savepoints", None)
+    if savepoints:
+        if savepoints[-1].is_active:
+            savepoints[-1].rollback()
+        __get_commit_callback_stack()[-1].clear()
+    else:
+        db_session.rollback()
+        __discard_commit_callbacks()
+
+
+def on_commit(callback):
+    """
+    Runs the callback once the current transaction commits through commit() or unit_of_work().
+    Use it to update in-process caches, so they never reflect changes that were rolled back.
+    Callbacks registered in a savepoint that is rolled back are discarded.
+    """
+    __get_commit_callback_stack()[-1].append(callback)
+
+
+def __get_commit_callback_stack():
+    if not hasattr(__commit_callbacks, "stack"):
+        __commit_callbacks.stack = [[]]
+    return __commit_callbacks.stack
+
+
+def __run_commit_callbacks():
+    callback_stack = __get_commit_callback_stack()
+    callbacks = callback_stack[0]
+    callback_stack[:] = [[]]
+    for callback in callbacks:
+        callback()
+
+
+def __discard_commit_callbacks():
+    __get_commit_callback_stack()[:] = [[]]
@@ -1,15 +1,30 @@
-from services import task_service, reservation_service, message_service
-from utils import notifier, validator, hostaway_client
-from db import db_session
-import models
+from services import (
+    task_service,
+    reservation_service,
+    message_service,
+    reservation_index,
+    hydration_service,
+)
+from utils import notifier, validator, metrics, tracing, profiler
+
+HANDLING_SECONDS = metrics.histogram(
+    "hostaway_event_handling_seconds",
+    "Time to handle a Hostaway webhook event, by object and event type.",
+    labels=("object", "event"),
+)
+INVALID_EVENTS = metrics.counter(
+    "hostaway_invalid_events_total", "Hostaway webhook payloads failing validation."
+)
 
 
 def handle_event(payload):
     """Handles Hostaway events"""
 
     # Validate the webhook payload
-    isValid, msg = validator.validate_hostaway_webhook_payload(payload)
+    with tracing.span("validate"):
+        isValid, msg, payload = validator.validate_hostaway_webhook_payload(payload)
     if not isValid:
+        INVALID_EVENTS.inc()
         notifier.error(msg)
         return
 
@@ -19,14 +34,18 @@ def handle_event(payload):
     obj = payload["data"]
 
     # Dispatch the event to the appropriate handler function
-    if object_type == "task":
-        __handle_task_event(event_type, obj)
+    # (profiled with cProfile when armed for the event type, see /admin/profile/events)
+    with HANDLING_SECONDS.time(object_type, event_type), tracing.span(
+        "service", object=object_type, event=event_type
+    ), profiler.profile_event(event_type):
+        if object_type == "task":
+            __handle_task_event(event_type, obj)
 
-    elif object_type == "reservation":
-        __handle_reservation_event(event_type, obj)
+        elif object_type == "reservation":
+            __handle_reservation_event(event_type, obj)
 
-    elif object_type == "conversationMessage":
-        __handle_conversation_message_event(obj)
+        elif object_type == "conversationMessage":
+            __handle_conversation_message_event(obj)
 
 
 def __handle_task_event(event_type, task_obj):
@@ -67,17 +86,16 @@ def __handle_conversation_message_event(message_obj):
 
 def __ensure_referenced_reservation_exists(reservation_id):
     """Ensures the referenced reservation exists in the database, polling Hostaway API if necessary"""
-    reservation = db_session.get(models.Reservation, reservation_id)
-    if not reservation:
+    if not reservation_index.reservation_exists(reservation_id):
         notifier.inform(
             f"Data received for missing reservation {reservation_id}. Polling Hostaway API for reservation data...",
+            reservation_id=reservation_id,
         )
-        # Reservation not found, try to fetch it from Hostaway API
-        reservation_data = hostaway_client.get_reservation(reservation_id)
-        if reservation_data:
-            # Ingest the fetched reservation into the database
-            reservation_service.create_reservation(reservation_data)
-        else:
+        # Reservation not found, fetch it from Hostaway API (joining any fetch already in flight)
+        with tracing.span("hydrate"):
+            hydrated = hydration_service.hydrate(reservation_id)
+        if not hydrated:
             notifier.inform(
-                f"Failed to retrieve reservation {reservation_id} from Hostaway API."
+                f"Failed to retrieve reservation {reservation_id} from Hostaway API.",
+                reservation_id=reservation_id,
             )
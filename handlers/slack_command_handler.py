@@ -1,4 +1,4 @@
-from utils import validator, logger, slackbot
+from utils import validator, logger, slack_outbox
 
 
 def handle_command(command, request_data):
@@ -8,7 +8,7 @@ def handle_command(command, request_data):
     isValid, text = validator.validate_and_sanitize_slack_input(request_data)
     if not isValid:
         logger.log_error(text, logger="slack")
-        slackbot.message_channel(text, channel_id=request_data["channel_id"])
+        slack_outbox.post(text, channel_id=request_data["channel_id"])
         return
 
     # Dispatch the slash command to the appropriate function
@@ -25,7 +25,7 @@ def __slash_speak(channel_id, sanitised_user_text):
         logger="slack",
     )
 
-    # Use the Slack API to send a message to the channel
-    slackbot.message_channel(
+    # Queue the reply for the channel
+    slack_outbox.post(
         f'"{sanitised_user_text}" is such a silly thing to say!', channel_id=channel_id
     )
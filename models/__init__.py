@@ -4,3 +4,6 @@ from models.reservation_revision import ReservationRevision
 from models.reservation import Reservation
 from models.task_revision import TaskRevision
 from models.task import Task
+from models.queued_job import QueuedJob
+from models.sync_checkpoint import SyncCheckpoint
+from models.sync_report import SyncReport, SyncDiscrepancy
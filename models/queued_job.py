@@ -0,0 +1,18 @@
+from db import db
+
+
+# Table for storing durable job queue entries (see utils/persistent_queue.py)
+class QueuedJob(db.Model):
+    __tablename__ = "job_queue"
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    queue_name = db.Column(db.String, nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    enqueued_at = db.Column(db.DateTime, nullable=False)
+    available_at = db.Column(db.DateTime, nullable=False)
+    trace_id = db.Column(db.String, nullable=True)  # See utils/tracing.py
+
+    __table_args__ = (
+        db.Index("ix_job_queue_queue_name_available_at", "queue_name", "available_at"),
+    )
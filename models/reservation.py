@@ -1,7 +1,9 @@
 from db import db
+from utils.content_hash import track_content_hash
 
 
 # Table for storing reservations
+@track_content_hash
 class Reservation(db.Model):
     __tablename__ = "reservations"
 
@@ -17,6 +19,8 @@ class Reservation(db.Model):
     updated_at = db.Column(
         db.DateTime, nullable=False, default=db.func.now(), onupdate=db.func.now()
     )
+    # Hash of the Hostaway data of the row, to detect unchanged payloads without loading it (see utils/content_hash.py)
+    content_hash = db.Column(db.String(32))
 
     # Relationship to revisions
     revisions = db.relationship("ReservationRevision", backref="reservation", lazy=True)
@@ -24,3 +28,7 @@ class Reservation(db.Model):
     messages = db.relationship("ConversationMessage", backref="reservation", lazy=True)
     # Relationship to conversations
     conversations = db.relationship("Conversation", backref="reservation", lazy=True)
+
+    __table_args__ = (
+        db.Index("ix_reservations_id_content_hash", "id", "content_hash"),
+    )
@@ -9,5 +9,15 @@ class ReservationRevision(db.Model):
     reservation_id = db.Column(
         db.Integer, db.ForeignKey("reservations.id"), nullable=False
     )
+    # Previous values of the columns changed by the update, or the full previous row for checkpoints
     revision_data = db.Column(db.JSON, nullable=False)
+    is_checkpoint = db.Column(db.Boolean, nullable=False, default=False)
     created_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
+
+    __table_args__ = (
+        db.Index(
+            "ix_reservation_revisions_reservation_id_created_at",
+            "reservation_id",
+            "created_at",
+        ),
+    )
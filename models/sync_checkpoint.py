@@ -0,0 +1,13 @@
+from db import db
+
+
+# Table for storing the progress of the incremental reservation sync, one row per sync window
+class SyncCheckpoint(db.Model):
+    __tablename__ = "sync_checkpoints"
+
+    window = db.Column(db.String, primary_key=True)
+    next_offset = db.Column(db.Integer, nullable=False, default=0)
+    synced_at = db.Column(db.DateTime)
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=db.func.now(), onupdate=db.func.now()
+    )
@@ -0,0 +1,33 @@
+from db import db
+
+
+# Table for storing the outcome of each reservation sync run
+class SyncReport(db.Model):
+    __tablename__ = "sync_reports"
+
+    id = db.Column(db.Integer, primary_key=True)
+    mode = db.Column(db.String, nullable=False)  # "full" or "incremental"
+    started_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
+    finished_at = db.Column(db.DateTime)
+    synced = db.Column(db.Integer, nullable=False, default=0)
+    missing = db.Column(db.Integer, nullable=False, default=0)
+    outdated = db.Column(db.Integer, nullable=False, default=0)
+    # Number of discrepancies per column, e.g. {"status": 12, "arrivalDate": 3}
+    field_counts = db.Column(db.JSON)
+    error = db.Column(db.Text)
+
+
+# Table for storing the column-level discrepancies found by a sync run
+class SyncDiscrepancy(db.Model):
+    __tablename__ = "sync_discrepancies"
+
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(db.Integer, db.ForeignKey("sync_reports.id"), nullable=False)
+    reservation_id = db.Column(db.Integer, nullable=False)
+    field = db.Column(db.String, nullable=False)
+    local_value = db.Column(db.Text)
+    hostaway_value = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index("ix_sync_discrepancies_report_id_field", "report_id", "field"),
+    )
@@ -1,7 +1,9 @@
 from db import db
+from utils.content_hash import track_content_hash
 
 
 # Table for storing tasks
+@track_content_hash
 class Task(db.Model):
     __tablename__ = "tasks"
 
@@ -18,6 +20,10 @@ class Task(db.Model):
     updated_at = db.Column(
         db.DateTime, nullable=False, default=db.func.now(), onupdate=db.func.now()
     )
+    # Hash of the Hostaway data of the row, to detect unchanged payloads without loading it (see utils/content_hash.py)
+    content_hash = db.Column(db.String(32))
 
     # Relationship to revisions
     revisions = db.relationship("TaskRevision", backref="task", lazy=True)
+
+    __table_args__ = (db.Index("ix_tasks_id_content_hash", "id", "content_hash"),)
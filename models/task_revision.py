@@ -7,5 +7,11 @@ class TaskRevision(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey("tasks.id"), nullable=False)
+    # Previous values of the columns changed by the update, or the full previous row for checkpoints
     revision_data = db.Column(db.JSON, nullable=False)
+    is_checkpoint = db.Column(db.Boolean, nullable=False, default=False)
     created_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
+
+    __table_args__ = (
+        db.Index("ix_task_revisions_task_id_created_at", "task_id", "created_at"),
+    )
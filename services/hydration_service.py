@@ -0,0 +1,197 @@
+import time
+from queue import Queue, Empty
+from threading import Thread, Lock, Event
+
+from db import rollback
+from services import reservation_service
+from utils import notifier, validator, hostaway_client, memory
+
+# Time to wait for more missing reservations before fetching, so bursts share API calls
+BATCH_WINDOW_SECONDS = 0.25
+MAX_BATCH_SIZE = 20
+
+# Size of the "latest activity" page fetched when several reservations are missing at once.
+# New bookings are the most recently active, so one list call usually covers the whole burst.
+RECENT_RESERVATIONS_PAGE_SIZE = 100
+
+# Reservations that failed to hydrate are not fetched again for this long
+FAILURE_TTL_SECONDS = 60
+
+# reservation_id -> in-flight request state, shared by every caller asking for that reservation
+__pending = {}
+__recent_failures = {}
+__lock = Lock()
+__fetch_queue = Queue()
+__hydrator_thread = None
+
+memory.register_queue("reservation_hydration", lambda: __fetch_queue)
+
+
+class __PendingHydration:
+    def __init__(self):
+        self.done = Event()
+        self.success = False
+        self.callbacks = []
+
+
+def start(app):
+    """Start the hydration thread that fetches missing reservations from Hostaway."""
+    global __hydrator_thread
+    if __hydrator_thread is not None and __hydrator_thread.is_alive():
+        return __hydrator_thread
+
+    __hydrator_thread = Thread(
+        target=__hydrator, args=(app,), name="reservation-hydrator"
+    )
+    __hydrator_thread.daemon = True
+    __hydrator_thread.start()
+    return __hydrator_thread
+
+
+def is_running():
+    return __hydrator_thread is not None and __hydrator_thread.is_alive()
+
+
+def request(reservation_id, on_done):
+    """
+    Asks for a missing reservation to be fetched from Hostaway and stored, without blocking.
+    Concurrent requests for the same reservation share a single fetch.
+    on_done(success) is called from the hydration thread once the fetch completes.
+    Returns False, without calling on_done, if the hydration thread isn't running.
+    """
+    if not is_running():
+        return False
+
+    pending = __get_or_create_pending(reservation_id)
+    with __lock:
+        if not pending.done.is_set():
+            pending.callbacks.append(on_done)
+            return True
+
+    on_done(pending.success)
+    return True
+
+
+def hydrate(reservation_id, timeout=60):
+    """
+    Fetches a missing reservation from Hostaway and stores it, waiting for the result.
+    Joins the in-flight fetch if the reservation is already being fetched.
+    Returns True if the reservation was stored.
+    """
+    if not is_running():
+        return __hydrate_batch([reservation_id])[reservation_id]
+
+    pending = __get_or_create_pending(reservation_id)
+    pending.done.wait(timeout)
+    return pending.success
+
+
+def __get_or_create_pending(reservation_id):
+    """Returns the in-flight request for the reservation, queueing a new fetch if there is none."""
+    with __lock:
+        pending = __pending.get(reservation_id)
+        if pending is not None:
+            return pending
+
+        pending = __pending[reservation_id] = __PendingHydration()
+        failed_at = __recent_failures.get(reservation_id)
+        if failed_at is not None and time.monotonic() - failed_at < FAILURE_TTL_SECONDS:
+            # Failed recently: answer right away instead of burning API budget again
+            del __pending[reservation_id]
+            pending.done.set()
+            return pending
+
+    __fetch_queue.put(reservation_id)
+    return pending
+
+
+def __hydrator(app):
+    """Collects missing reservation ids over a short window and fetches them together."""
+    with app.app_context():
+        while True:
+            reservation_ids = [__fetch_queue.get()]
+            deadline = time.monotonic() + BATCH_WINDOW_SECONDS
+            while len(reservation_ids) < MAX_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    reservation_ids.append(__fetch_queue.get(timeout=remaining))
+                except Empty:
+                    break
+
+            try:
+                results = __hydrate_batch(reservation_ids)
+            except Exception as e:
+                rollback()
+                notifier.error(f"Failed to hydrate reservations {reservation_ids}: {e}")
+                results = {reservation_id: False for reservation_id in reservation_ids}
+
+            for reservation_id, success in results.items():
+                __complete(reservation_id, success)
+
+
+def __hydrate_batch(reservation_ids):
+    """
+    Fetches and stores the given reservations, returning {reservation_id: success}.
+    Several ids are first looked up in one page of the most recently active reservations;
+    the remaining ones are fetched individually.
+    """
+    fetched = {}
+    if len(reservation_ids) > 1:
+        recent_reservations = hostaway_client.get_reservations(
+            limit=RECENT_RESERVATIONS_PAGE_SIZE, order="latestActivityDesc"
+        )
+        for reservation in recent_reservations or []:
+            if reservation.get("id") in reservation_ids:
+                isValid, msg, cleaned_reservation = (
+                    validator.validate_and_clean_hostaway_payload(
+                        reservation, "reservation"
+                    )
+                )
+                if isValid:
+                    fetched[reservation["id"]] = cleaned_reservation
+
+    for reservation_id in reservation_ids:
+        if reservation_id not in fetched:
+            reservation = hostaway_client.get_reservation(reservation_id)
+            if reservation:
+                fetched[reservation_id] = reservation
+
+    results = {}
+    for reservation_id in reservation_ids:
+        if reservation_id in fetched:
+            # Ingest the fetched reservation into the database
+            reservation_service.create_reservation(fetched[reservation_id])
+            results[reservation_id] = True
+        else:
+            results[reservation_id] = False
+
+    return results
+
+
+def __complete(reservation_id, success):
+    """Resolves the in-flight request for a reservation and notifies its waiters."""
+    with __lock:
+        pending = __pending.pop(reservation_id, None)
+        if success:
+            __recent_failures.pop(reservation_id, None)
+        else:
+            __recent_failures[reservation_id] = time.monotonic()
+
+    if pending is None:
+        return
+
+    pending.success = success
+    with __lock:
+        pending.done.set()
+        callbacks = pending.callbacks
+        pending.callbacks = []
+
+    for callback in callbacks:
+        try:
+            callback(success)
+        except Exception as e:
+            notifier.error(
+                f"Failed to resume events waiting for reservation {reservation_id}: {e}"
+            )
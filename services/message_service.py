@@ -1,54 +1,50 @@
-from sqlalchemy.exc import IntegrityError
-from psycopg2.errors import UniqueViolation
-
-from db import db_session
+from db import commit, on_commit
 import models
 from utils import notifier
+from services import upsert_service
 
 
 def create_conversation_message(message_obj, notifySuccess=True):
     """Creates a new conversationMessage in the database"""
     message_id = message_obj["id"]
-
-    # Create or update the conversation message
-    conversation_id = message_obj["conversationId"]
     reservation_id = message_obj["reservationId"]
 
-    # Ensure the conversation exists
-    conversation = db_session.get(models.Conversation, conversation_id)
-    if not conversation:
-        conversation = models.Conversation(
-            id=conversation_id, reservation_id=reservation_id
-        )
-        db_session.add(conversation)
-        db_session.commit()
-
-    # Get a list of valid columns for the conversationMessage model
-    valid_columns = {
-        column.name for column in models.ConversationMessage.__table__.columns
-    }
+    counts = upsert_conversation_messages([message_obj])
 
-    # Filter conversationMessage data to include only valid fields
-    filtered_conversationMessage_data = {
-        key: value for key, value in message_obj.items() if key in valid_columns
-    }
-
-    try:
-        # Create the conversation message
-        conversation_message = models.ConversationMessage(
-            **filtered_conversationMessage_data
-        )
-        db_session.add(conversation_message)
-        db_session.commit()
+    # Notify once committed: in a batch, nothing is sent for changes rolled back
+    if counts["created"]:
         if notifySuccess:
-            notifier.inform(
-                f"ConversationMessage received associated with Reservation {reservation_id}"
+            on_commit(
+                lambda: notifier.inform(
+                    f"ConversationMessage received associated with Reservation {reservation_id}",
+                    reservation_id=reservation_id,
+                    conversation_id=message_obj.get("conversationId"),
+                )
             )
-    except IntegrityError as ie:
-        db_session.rollback()
-        if isinstance(ie.orig, UniqueViolation):
-            notifier.warn(
-                f"Duplicate conversationMessage received for Reservation {reservation_id}. Duplicated conversationMessage ID: {message_id}"
+    elif not counts["updated"]:
+        on_commit(
+            lambda: notifier.warn(
+                f"Duplicate conversationMessage received for Reservation {reservation_id}. Duplicated conversationMessage ID: {message_id}",
+                reservation_id=reservation_id,
+                conversation_id=message_obj.get("conversationId"),
             )
-        else:
-            raise  # Re-raise the exception if it's not a unique constraint violation
+        )
+    commit()
+
+
+def upsert_conversation_messages(message_objs):
+    """
+    Creates or updates conversation messages in bulk, creating their conversations if needed.
+    Unchanged messages (e.g. duplicate deliveries) are left untouched.
+    Returns a dict with created, updated and unchanged message counts. The caller commits.
+    """
+    # Ensure the conversations exist
+    upsert_service.insert_missing(
+        models.Conversation,
+        [
+            {"id": obj["conversationId"], "reservation_id": obj["reservationId"]}
+            for obj in message_objs
+        ],
+    )
+
+    return upsert_service.upsert(models.ConversationMessage, message_objs)
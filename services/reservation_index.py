@@ -0,0 +1,49 @@
+from sqlalchemy import select
+
+from db import db_session, on_commit
+import models
+from utils import logger
+from utils.id_bitmap import IdBitmap
+
+# Ids of the reservations known to exist in the database
+known_reservation_ids = IdBitmap()
+
+# Number of ids fetched per round trip when warming the index
+WARM_BATCH_SIZE = 10000
+
+
+def warm():
+    """Loads the ids of all stored reservations into the index."""
+    known_reservation_ids.clear()
+    result = db_session.execute(
+        select(models.Reservation.id).execution_options(yield_per=WARM_BATCH_SIZE)
+    )
+    for ids in result.scalars().partitions():
+        known_reservation_ids.update(ids)
+
+    logger.log_inform(
+        f"Reservation index warmed with {len(known_reservation_ids)} reservation ids "
+        f"({known_reservation_ids.memory_usage() // 1024} KiB)",
+        logger="hostaway",
+    )
+
+
+def reservation_exists(reservation_id):
+    """
+    Returns True if the reservation is stored in the database.
+    Known ids are answered from memory; the database is only queried on a miss.
+    """
+    if reservation_id in known_reservation_ids:
+        return True
+
+    if db_session.get(models.Reservation, reservation_id) is None:
+        return False
+
+    add_on_commit([reservation_id])
+    return True
+
+
+def add_on_commit(reservation_ids):
+    """Adds reservation ids to the index once the current transaction commits."""
+    reservation_ids = list(reservation_ids)
+    on_commit(lambda: known_reservation_ids.update(reservation_ids))
@@ -1,72 +1,70 @@
-from sqlalchemy.exc import IntegrityError
-from psycopg2.errors import UniqueViolation
-
-from datetime import date, datetime
-
-from db import db_session
+from db import commit, on_commit
 import models
 from utils import notifier
+from services import upsert_service, reservation_index
 
 
 def create_reservation(reservation_obj, notifySuccess=True):
     """Creates a new reservation in the database"""
     reservation_id = reservation_obj["id"]
 
-    # Get a list of valid columns for the Reservation model
-    valid_columns = {column.name for column in models.Reservation.__table__.columns}
-
-    # Filter reservation data to include only valid fields
-    filtered_reservation_data = {
-        key: value for key, value in reservation_obj.items() if key in valid_columns
-    }
+    counts = upsert_reservations([reservation_obj])
 
-    try:
-        reservation = models.Reservation(**filtered_reservation_data)
-        db_session.add(reservation)
-        db_session.commit()
+    # Notify once committed: in a batch, nothing is sent for changes rolled back
+    if counts["created"]:
         if notifySuccess:
-            notifier.inform(f"Reservation created with ID: {reservation_id}")
-
-    except IntegrityError as ie:
-        db_session.rollback()
-        if isinstance(ie.orig, UniqueViolation):
-            notifier.warn(
-                f"Duplicate reservation creation for Reservation ID: {reservation_id}"
+            on_commit(
+                lambda: notifier.inform(
+                    f"Reservation created with ID: {reservation_id}",
+                    reservation_id=reservation_id,
+                )
             )
-        else:
-            raise  # Re-raise the exception if it's not a unique constraint violation
+    else:
+        on_commit(
+            lambda: notifier.warn(
+                f"Duplicate reservation creation for Reservation ID: {reservation_id}",
+                reservation_id=reservation_id,
+            )
+        )
+    commit()
 
 
 def update_reservation(reservation_obj, notifySuccess=True):
-    """Updates an existing reservation in the database"""
+    """Updates an existing reservation in the database, saving a revision of the previous data"""
     reservation_id = reservation_obj["id"]
-    reservation = db_session.get(models.Reservation, reservation_id)
-    if reservation:
-        # Serialize only the relevant fields from the reservation instance
-        reservation_revision_data = {
-            column.name: (
-                getattr(reservation, column.name).isoformat()
-                if isinstance(getattr(reservation, column.name), (datetime, date))
-                else getattr(reservation, column.name)
-            )
-            for column in reservation.__table__.columns
-        }
 
-        # Save a revision before updating
-        reservation_revision = models.ReservationRevision(
-            reservation_id=reservation.id, revision_data=reservation_revision_data
+    # Updates don't create reservations: an unknown one means its creation was missed
+    if not reservation_index.reservation_exists(reservation_id):
+        notifier.error(
+            f"Reservation update received for non-existent reservation ID: {reservation_id}",
+            reservation_id=reservation_id,
         )
-        db_session.add(reservation_revision)
+        return
 
-        # Update reservation fields
-        for key, value in reservation_obj.items():
-            setattr(reservation, key, value)
-        db_session.commit()
+    counts = upsert_reservations([reservation_obj])
 
-        if notifySuccess:
-            notifier.inform(f"Reservation {reservation_id} updated")
-
-    else:
-        notifier.error(
-            f"Reservation update received for non-existent reservation ID: {reservation_id}"
+    if counts["updated"] and notifySuccess:
+        on_commit(
+            lambda: notifier.inform(
+                f"Reservation {reservation_id} updated", reservation_id=reservation_id
+            )
         )
+    commit()
+
+
+def upsert_reservations(reservation_objs):
+    """
+    Creates or updates reservations in bulk, saving a revision of every reservation that changed.
+    Unchanged reservations (e.g. duplicate deliveries) are left untouched.
+    Returns a dict with created, updated and unchanged counts. The caller commits.
+    """
+    counts = upsert_service.upsert(
+        models.Reservation,
+        reservation_objs,
+        revision_model=models.ReservationRevision,
+        revision_foreign_key="reservation_id",
+    )
+
+    # Remember the reservations as known once they are committed
+    reservation_index.add_on_commit(obj["id"] for obj in reservation_objs)
+    return counts
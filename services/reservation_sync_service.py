@@ -1,75 +1,538 @@
-from sqlalchemy import inspect
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from queue import Queue, Full
+from threading import Thread, Event
 
-from db import db_session
+from sqlalchemy import delete, func, insert, select
+
+from db import db_session, unit_of_work, savepoint, commit
 import models
-from utils import logger, notifier, slackbot, hostaway_client, validator
+from utils import logger, notifier, hostaway_client, validator, content_hash, metrics
 from services import reservation_service
 
+# A slice of the portfolio synced as one listing: its filters for get_reservations, and how often it's re-scanned
+SyncWindow = namedtuple("SyncWindow", ["key", "filters", "interval"])
+
+# Stays that haven't ended yet change the most; older arrivals rarely change at all
+UPCOMING_SYNC_INTERVAL = timedelta(hours=6)
+RECENT_SYNC_INTERVAL = timedelta(days=1)
+HISTORY_SYNC_INTERVAL = timedelta(days=30)
+ARCHIVE_SYNC_INTERVAL = timedelta(days=90)
+
+# Months of past arrivals re-scanned at RECENT_SYNC_INTERVAL
+RECENT_MONTHS = 3
+
+# Months of past arrivals synced month by month, older ones are synced as a single archive window
+DEFAULT_HISTORY_MONTHS = 24
+
+# Fields listed in the Slack digest of a sync report, the full detail is behind the report's link
+DIGEST_FIELDS = 10
+
+# Sync reports, and their discrepancies, are deleted after this long
+REPORT_RETENTION = timedelta(days=30)
+
+# Discrepancies returned per request for a report's detail
+REPORT_PAGE_SIZE = 1000
+
+PAGE_SYNC_SECONDS = metrics.histogram(
+    "reservation_sync_page_seconds",
+    "Time to compare and write a page of reservations fetched from Hostaway.",
+)
+
 
 def sync_reservations_with_hostaway():
-    """Fetches reservations from Hostaway and ensures they match the local database."""
+    """
+    Fetches reservations from Hostaway and ensures they match the local database.
+    Reservations are streamed page by page: each page is applied and committed while the next one is
+    fetched, so memory use doesn't grow with the size of the portfolio.
+    Discrepancies are recorded in a sync report, summarized on Slack once the sync is done.
+    """
 
     notifier.inform("Syncing reservations with Hostaway...")
 
-    # Fetch all reservations from the Hostaway API
-    reservations = hostaway_client.get_reservations()
-    if not reservations:
+    report_id = start_report("full")
+    counts, error = sync_listing(report_id=report_id)
+    report = finish_report(report_id, counts, error)
+    if error is not None and counts["synced"] > 0:
+        notifier.error(
+            f"Reservation sync interrupted after {counts['synced']} reservations: {error}"
+        )
+
+    if counts["synced"] == 0:
         notifier.error("Failed to retrieve all reservations from Hostaway API.")
         return
 
-    outdatedReservationCount = 0
-    missingReservationCount = 0
+    # Post the digest of the sync report
+    notifier.inform(get_digest(report))
+
+
+def sync_reservations_incrementally(history_months=DEFAULT_HISTORY_MONTHS, now=None):
+    """
+    Syncs the date windows of the portfolio that are due for a re-scan (see get_sync_windows).
+    Progress is checkpointed in the database after every page, so an interrupted window resumes
+    where it stopped on the next run. Returns the number of windows synced.
+    Discrepancies of all windows are recorded in one sync report.
+    """
+    now = now or datetime.now()
+    windows = get_sync_windows(now.date(), history_months)
+
+    checkpoints = {
+        checkpoint.window: (checkpoint.next_offset, checkpoint.synced_at)
+        for checkpoint in db_session.scalars(select(models.SyncCheckpoint))
+    }
+
+    # Forget windows that rolled out of the schedule
+    stale_windows = set(checkpoints) - {window.key for window in windows}
+    if stale_windows:
+        db_session.execute(
+            delete(models.SyncCheckpoint).where(
+                models.SyncCheckpoint.window.in_(stale_windows)
+            )
+        )
+        commit()
+
+    report_id = start_report("incremental")
+    totals = {"synced": 0, "missing": 0, "outdated": 0}
+    errors = []
+    synced_windows = 0
+    for window in windows:
+        next_offset, synced_at = checkpoints.get(window.key, (0, None))
+        # Interrupted windows are resumed right away, the others when their interval has elapsed
+        if (
+            next_offset == 0
+            and synced_at is not None
+            and now - synced_at < window.interval
+        ):
+            continue
+
+        counts, error = sync_listing(
+            offset=next_offset,
+            on_page=lambda next_offset, key=window.key: __save_checkpoint(
+                key, next_offset
+            ),
+            report_id=report_id,
+            **window.filters,
+        )
+        for key in totals:
+            totals[key] += counts[key]
+
+        if error is not None:
+            errors.append(f"{window.key}: {error}")
+            notifier.error(f"Failed to sync reservation window {window.key}: {error}")
+            continue
+
+        __save_checkpoint(window.key, 0, synced_at=now)
+        synced_windows += 1
+
+    report = finish_report(report_id, totals, "; ".join(errors) or None)
+    if totals["missing"] or totals["outdated"]:
+        notifier.inform(get_digest(report))
+    else:
+        logger.log_inform(
+            f"{__get_summary(totals)} ({synced_windows} windows)",
+            logger="hostaway_data_sync",
+        )
+
+    return synced_windows
+
+
+def get_sync_windows(today, history_months=DEFAULT_HISTORY_MONTHS):
+    """
+    Partitions the portfolio into date windows, each re-scanned at its own interval:
+    stays that haven't ended yet, each month of arrivals of the last history_months months
+    (recent months more often), and every older reservation as a single archive window.
+    Together the windows cover every reservation.
+    """
+    windows = [
+        SyncWindow(
+            "upcoming",
+            {"departureStartDate": (today - timedelta(days=1)).isoformat()},
+            UPCOMING_SYNC_INTERVAL,
+        )
+    ]
+
+    month_start = today.replace(day=1)
+    for months_ago in range(history_months):
+        start = __add_months(month_start, -months_ago)
+        end = __add_months(start, 1) - timedelta(days=1)
+        windows.append(
+            SyncWindow(
+                f"arrivals:{start:%Y-%m}",
+                {
+                    "arrivalStartDate": start.isoformat(),
+                    "arrivalEndDate": end.isoformat(),
+                },
+                (
+                    RECENT_SYNC_INTERVAL
+                    if months_ago < RECENT_MONTHS
+                    else HISTORY_SYNC_INTERVAL
+                ),
+            )
+        )
+
+    history_start = __add_months(month_start, -max(history_months - 1, 0))
+    windows.append(
+        SyncWindow(
+            "archive",
+            {"arrivalEndDate": (history_start - timedelta(days=1)).isoformat()},
+            ARCHIVE_SYNC_INTERVAL,
+        )
+    )
+    return windows
+
+
+def sync_listing(offset=0, on_page=None, report_id=None, **filters):
+    """
+    Streams the reservations matching the filters from Hostaway into the local database, one page at a time.
+    Pages are fetched in the background lane of the Hostaway rate limiter, behind webhook-driven fetches.
+    on_page(next_offset) is called after each page is committed. Discrepancies are recorded in the sync report, if given.
+    Returns (counts, error): the synced, missing and outdated reservation counts, and the
+    ReservationListingError that interrupted the listing, if any.
+    """
+    counts = {"synced": 0, "missing": 0, "outdated": 0}
+
+    try:
+        for page_offset, reservations, next_offset in __prefetch(
+            hostaway_client.iter_reservation_pages(
+                offset=offset, lane=hostaway_client.BACKGROUND_LANE, **filters
+            )
+        ):
+            with logger.timed(
+                "Reservation page synced",
+                logger="hostaway_data_sync",
+                offset=page_offset,
+                reservations=len(reservations),
+            ), PAGE_SYNC_SECONDS.time():
+                missing, outdated = sync_reservation_page(reservations, report_id)
+            counts["synced"] += len(reservations)
+            counts["missing"] += missing
+            counts["outdated"] += outdated
+            if on_page is not None:
+                on_page(next_offset)
+
+    except hostaway_client.ReservationListingError as e:
+        return counts, e
+
+    return counts, None
+
+
+def start_report(mode):
+    """Creates the sync report of a new sync run, deleting expired ones, and returns its id."""
+    expired_report_ids = select(models.SyncReport.id).where(
+        models.SyncReport.started_at < datetime.now() - REPORT_RETENTION
+    )
+    db_session.execute(
+        delete(models.SyncDiscrepancy).where(
+            models.SyncDiscrepancy.report_id.in_(expired_report_ids)
+        )
+    )
+    db_session.execute(
+        delete(models.SyncReport).where(models.SyncReport.id.in_(expired_report_ids))
+    )
+
+    report = models.SyncReport(mode=mode, started_at=datetime.now())
+    db_session.add(report)
+    commit()
+    return report.id
+
+
+def finish_report(report_id, counts, error=None):
+    """Records the outcome of a sync run and its discrepancy counts per field. Returns the report."""
+    field_counts = db_session.execute(
+        select(models.SyncDiscrepancy.field, func.count())
+        .where(models.SyncDiscrepancy.report_id == report_id)
+        .group_by(models.SyncDiscrepancy.field)
+        .order_by(func.count().desc(), models.SyncDiscrepancy.field)
+    ).all()
+
+    report = db_session.get(models.SyncReport, report_id)
+    report.finished_at = datetime.now()
+    report.synced = counts["synced"]
+    report.missing = counts["missing"]
+    report.outdated = counts["outdated"]
+    report.field_counts = dict(field_counts)
+    report.error = str(error) if error is not None else None
+    commit()
+    return report
+
+
+def get_digest(report):
+    """Returns the Slack digest of a sync report: its summary, discrepancy counts per field and a link to the detail."""
+    digest = __get_summary(
+        {
+            "synced": report.synced,
+            "missing": report.missing,
+            "outdated": report.outdated,
+        }
+    )
+    if report.field_counts:
+        fields = list(report.field_counts.items())
+        total = sum(report.field_counts.values())
+        digest += (
+            f" {total} {'discrepancy' if total == 1 else 'discrepancies'} by field: "
+            + ", ".join(f"{field} ({count})" for field, count in fields[:DIGEST_FIELDS])
+        )
+        if len(fields) > DIGEST_FIELDS:
+            digest += f" and {len(fields) - DIGEST_FIELDS} more fields"
+        digest += f". Details: {notifier.APP_STATIC_DOMAIN}/sync/reports/{report.id}"
+    return digest
+
+
+def get_report_details(report_id, field=None, limit=REPORT_PAGE_SIZE, offset=0):
+    """
+    Returns a sync report and a page of its discrepancies (optionally of a single field) as a dict,
+    or None if the report doesn't exist.
+    """
+    report = db_session.get(models.SyncReport, report_id)
+    if report is None:
+        return None
+
+    query = select(models.SyncDiscrepancy).where(
+        models.SyncDiscrepancy.report_id == report_id
+    )
+    if field is not None:
+        query = query.where(models.SyncDiscrepancy.field == field)
+    discrepancies = db_session.scalars(
+        query.order_by(models.SyncDiscrepancy.id).limit(limit).offset(offset)
+    )
+
+    return {
+        "id": report.id,
+        "mode": report.mode,
+        "started_at": report.started_at.isoformat(),
+        "finished_at": report.finished_at and report.finished_at.isoformat(),
+        "synced": report.synced,
+        "missing": report.missing,
+        "outdated": report.outdated,
+        "field_counts": report.field_counts or {},
+        "error": report.error,
+        "discrepancies": [
+            {
+                "reservation_id": discrepancy.reservation_id,
+                "field": discrepancy.field,
+                "local_value": discrepancy.local_value,
+                "hostaway_value": discrepancy.hostaway_value,
+            }
+            for discrepancy in discrepancies
+        ],
+    }
+
+
+def __get_summary(counts):
+    summary_msg = f"Synced {counts['synced']} reservations with Hostaway."
+    if counts["missing"] > 0:
+        summary_msg += f" Ingested {counts['missing']} missing reservations."
+    if counts["outdated"] > 0:
+        summary_msg += f" Updated {counts['outdated']} outdated reservations."
+    return summary_msg
+
+
+def __save_checkpoint(window_key, next_offset, synced_at=None):
+    """Records the progress of a sync window."""
+    checkpoint = db_session.get(models.SyncCheckpoint, window_key)
+    if checkpoint is None:
+        checkpoint = models.SyncCheckpoint(window=window_key)
+        db_session.add(checkpoint)
+
+    checkpoint.next_offset = next_offset
+    if synced_at is not None:
+        checkpoint.synced_at = synced_at
+    commit()
+
+
+def __add_months(month_start, months):
+    """Returns the first day of the month the given number of months away."""
+    month_index = month_start.year * 12 + month_start.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
 
-    # Iterate through each reservation from Hostaway
+def sync_reservation_page(reservations, report_id=None):
+    """
+    Applies one page of Hostaway reservations to the local database in a single transaction.
+    The page's stored content hashes are loaded in one query and compared with the hashes of the
+    Hostaway reservations; only rows whose hash differs are loaded and diffed column by column.
+    Missing and outdated reservations are then written with a single bulk upsert, along with the
+    discrepancies found, if a sync report is given.
+    Returns the number of (missing, outdated) reservations found.
+    """
+    # Validate and normalize the page, so values compare with the stored ones by type
+    remote_reservations = {}
     for hostaway_reservation in reservations:
-        reservation_id = hostaway_reservation["id"]
-        local_reservation = db_session.get(models.Reservation, reservation_id)
+        isValid, msg, cleaned_reservation = (
+            validator.validate_and_clean_hostaway_payload(
+                hostaway_reservation, "reservation"
+            )
+        )
+        if not isValid:
+            logger.log_error(
+                f"Invalid reservation fetched from Hostaway API (id {hostaway_reservation.get('id')}): {msg}",
+                logger="hostaway_data_sync",
+                reservation_id=hostaway_reservation.get("id"),
+            )
+            continue
+        remote_reservations[cleaned_reservation["id"]] = cleaned_reservation
+
+    # Compare the stored content hashes first, reading only the (id, content_hash) index
+    table = models.Reservation.__table__
+    stored_hashes = dict(
+        db_session.execute(
+            select(table.c.id, table.c.content_hash).where(
+                table.c.id.in_(remote_reservations)
+            )
+        ).all()
+    )
 
-        if not local_reservation:
+    missing_reservations = []
+    changed_reservation_ids = []
+    for reservation_id, remote_reservation in remote_reservations.items():
+        if reservation_id not in stored_hashes:
             logger.log_inform(
                 f"Reservation {reservation_id} not found locally. Creating it...",
                 logger="hostaway_data_sync",
+                reservation_id=reservation_id,
             )
-            missingReservationCount += 1
+            missing_reservations.append(remote_reservation)
+        elif stored_hashes[reservation_id] != content_hash.compute(
+            table, remote_reservation
+        ):
+            changed_reservation_ids.append(reservation_id)
 
-            # Reservation not found locally, ingest it into the database if valid
-            isValid, msg = validator.validate_hostaway_payload_against_model(
-                hostaway_reservation, "reservation"
+    # Only load the rows whose hash differs, to diff them column by column
+    local_reservations = {}
+    if changed_reservation_ids:
+        local_reservations = {
+            row["id"]: row
+            for row in db_session.execute(
+                select(*table.columns).where(table.c.id.in_(changed_reservation_ids))
+            ).mappings()
+        }
+
+    outdated_reservations = []
+    discrepancy_rows = []
+    for reservation_id in changed_reservation_ids:
+        local_reservation = local_reservations[reservation_id]
+        remote_reservation = remote_reservations[reservation_id]
+
+        # Check for discrepancies and update if necessary
+        discrepancies = check_for_discrepancies(local_reservation, remote_reservation)
+        if discrepancies:
+            logger.log_warning(
+                f"Reservation {reservation_id} data is out of sync with Hostaway. Resolving discrepancies...",
+                logger="hostaway_data_sync",
+                reservation_id=reservation_id,
+                columns=[field for field, local_value, hostaway_value in discrepancies],
             )
-            if not isValid:
-                logger.log_error(
-                    f"Invalid reservation fetched from Hostaway API (id {reservation_id}): {msg}",
-                    logger="hostaway_data_sync",
+            outdated_reservations.append(remote_reservation)
+            if report_id is not None:
+                discrepancy_rows.extend(
+                    {
+                        "report_id": report_id,
+                        "reservation_id": reservation_id,
+                        "field": field,
+                        "local_value": __to_text(local_value),
+                        "hostaway_value": __to_text(hostaway_value),
+                    }
+                    for field, local_value, hostaway_value in discrepancies
                 )
-                continue
-            ingest_reservation(hostaway_reservation)
-        else:
-            # Check for discrepancies and update if necessary
-            discrepancies = check_for_discrepancies(
-                local_reservation, hostaway_reservation
+
+    if missing_reservations or outdated_reservations:
+        __write_reservations(
+            missing_reservations, outdated_reservations, discrepancy_rows
+        )
+
+    # Release the page's rows, they are not needed anymore
+    db_session.expunge_all()
+
+    return len(missing_reservations), len(outdated_reservations)
+
+
+def __write_reservations(missing_reservations, outdated_reservations, discrepancy_rows):
+    """
+    Creates and updates the reservations of a page with a single bulk upsert, and records its discrepancies.
+    If it fails, the reservations are written one by one, so a bad one doesn't hold up the page.
+    """
+    try:
+        with unit_of_work():
+            reservation_service.upsert_reservations(
+                missing_reservations + outdated_reservations
             )
-            if discrepancies:
-                logger.log_warning(
-                    f"Reservation {reservation_id} data is out of sync with Hostaway. Resolving discrepancies...",
-                    logger="hostaway_data_sync",
-                )
-                outdatedReservationCount += 1
-                notify_discrepancy(reservation_id, discrepancies)
-                update_local_reservation(hostaway_reservation)
+            __record_discrepancies(discrepancy_rows)
+        return
+
+    except Exception as e:
+        logger.log_warning(
+            f"Failed to write {len(missing_reservations) + len(outdated_reservations)} synced reservations in bulk: {e}. Retrying reservations individually...",
+            logger="hostaway_data_sync",
+        )
+
+    with unit_of_work():
+        for reservation_data in missing_reservations:
+            ingest_reservation(reservation_data)
+        for reservation_data in outdated_reservations:
+            update_local_reservation(reservation_data)
+        __record_discrepancies(discrepancy_rows)
+
+
+def __record_discrepancies(discrepancy_rows):
+    if discrepancy_rows:
+        db_session.execute(insert(models.SyncDiscrepancy), discrepancy_rows)
+
+
+def __to_text(value):
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
 
-    # Log the summary of the sync process
-    summary_msg = f"Synced {len(reservations)} reservations with Hostaway."
-    if missingReservationCount > 0:
-        summary_msg += f" Ingested {missingReservationCount} missing reservations."
-    if outdatedReservationCount > 0:
-        summary_msg += f" Updated {outdatedReservationCount} outdated reservations."
-    notifier.inform(summary_msg)
+
+def __prefetch(iterator):
+    """Iterates in a background thread, one item ahead of the consumer."""
+    items = Queue(maxsize=1)
+    stopped = Event()
+    done = object()
+
+    def put(item, error=None):
+        # Give up if the consumer went away, instead of blocking forever
+        while not stopped.is_set():
+            try:
+                items.put((item, error), timeout=1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(None, e)
+            return
+        put(done)
+
+    Thread(target=produce, daemon=True, name="reservation-sync-producer").start()
+
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stopped.set()
 
 
 def ingest_reservation(reservation_data):
     """Ingests a new reservation into the local database."""
     try:
-        reservation_service.create_reservation(reservation_data, notifySuccess=False)
+        with savepoint():
+            reservation_service.create_reservation(
+                reservation_data, notifySuccess=False
+            )
     except Exception as e:
         notifier.error(
             f"Failed to ingest missing reservation with ID {reservation_data['id']}: {str(e)}"
@@ -77,23 +540,20 @@ def ingest_reservation(reservation_data):
 
 
 def check_for_discrepancies(local_reservation, hostaway_reservation):
-    """Compares a local reservation with a Hostaway reservation and returns a list of discrepancies."""
+    """
+    Compares a local reservation row with a cleaned Hostaway reservation and returns a list of
+    (column, local_value, hostaway_value) discrepancies.
+    Only the columns present in the Hostaway reservation are compared.
+    """
     discrepancies = []
-    inspector = inspect(models.Reservation)
-    columns = {
-        column.name
-        for column in inspector.columns
-        if (column.name != "created_at" and column.name != "updated_at")
-    }
 
-    for column in columns:
-        local_value = getattr(local_reservation, column)
-        hostaway_value = hostaway_reservation.get(column)
+    for column, hostaway_value in hostaway_reservation.items():
+        if column in validator.MODEL_MANAGED_COLUMNS:
+            continue
 
-        if str(local_value) != str(hostaway_value):
-            discrepancies.append(
-                f"{column}: Local({local_value}) vs Hostaway({hostaway_value})"
-            )
+        local_value = local_reservation.get(column)
+        if local_value != hostaway_value:
+            discrepancies.append((column, local_value, hostaway_value))
 
     return discrepancies
 
@@ -101,18 +561,11 @@ def check_for_discrepancies(local_reservation, hostaway_reservation):
 def update_local_reservation(hostaway_reservation):
     """Updates the local reservation to match the Hostaway reservation."""
     try:
-        reservation_service.update_reservation(
-            hostaway_reservation, notifySuccess=False
-        )
+        with savepoint():
+            reservation_service.update_reservation(
+                hostaway_reservation, notifySuccess=False
+            )
     except Exception as e:
         notifier.error(
             f"Failed to update outdated reservation data with ID {hostaway_reservation['id']}: {str(e)}"
         )
-
-
-def notify_discrepancy(reservation_id, discrepancies):
-    """Sends a message to Slack with the list of discrepancies."""
-    message = f"Discrepancies found for reservation ID {reservation_id}:\n" + "\n".join(
-        discrepancies
-    )
-    slackbot.message_channel(message)
@@ -0,0 +1,117 @@
+from datetime import date, datetime
+
+from sqlalchemy import func, select
+
+from db import db_session
+import models
+
+# Every Nth revision of an entity stores the full previous row instead of a delta,
+# bounding the number of deltas applied when reconstructing a past state
+CHECKPOINT_INTERVAL = 20
+
+
+def serialize(instance):
+    """Serializes a model instance's columns into JSON-compatible revision data."""
+    return {
+        column.name: __serialize_value(getattr(instance, column.name))
+        for column in instance.__table__.columns
+    }
+
+
+def build_revision(instance, revision_model, revision_foreign_key, changed_columns):
+    """
+    Builds the revision saved before updating an instance.
+    Stores the previous values of the changed columns, or the full previous row every CHECKPOINT_INTERVAL revisions.
+    """
+    foreign_key = getattr(revision_model, revision_foreign_key)
+    revision_count = db_session.scalar(
+        select(func.count())
+        .select_from(revision_model)
+        .where(foreign_key == instance.id)
+    )
+    is_checkpoint = revision_count % CHECKPOINT_INTERVAL == 0
+
+    previous_data = serialize(instance)
+    if not is_checkpoint:
+        previous_data = {
+            name: previous_data[name]
+            for name in previous_data
+            if name in changed_columns
+        }
+
+    return revision_model(
+        **{
+            revision_foreign_key: instance.id,
+            "revision_data": previous_data,
+            "is_checkpoint": is_checkpoint,
+        }
+    )
+
+
+def get_reservation_state_at(reservation_id, timestamp):
+    """Returns the serialized state of a reservation at the given time, or None if it didn't exist yet."""
+    return get_state_at(
+        models.Reservation,
+        models.ReservationRevision,
+        "reservation_id",
+        reservation_id,
+        timestamp,
+    )
+
+
+def get_task_state_at(task_id, timestamp):
+    """Returns the serialized state of a task at the given time, or None if it didn't exist yet."""
+    return get_state_at(models.Task, models.TaskRevision, "task_id", task_id, timestamp)
+
+
+def get_state_at(model, revision_model, revision_foreign_key, entity_id, timestamp):
+    """
+    Reconstructs the serialized state of an entity at the given time.
+    Revisions hold the values an update replaced, so the state is rebuilt by starting from the
+    first checkpoint after the timestamp (or the current row) and undoing the later updates
+    back to the timestamp, newest first. At most CHECKPOINT_INTERVAL deltas are applied.
+    """
+    instance = db_session.get(model, entity_id)
+    if instance is None or instance.created_at > timestamp:
+        return None
+
+    foreign_key = getattr(revision_model, revision_foreign_key)
+    later_revisions = select(revision_model).where(
+        foreign_key == entity_id, revision_model.created_at > timestamp
+    )
+
+    checkpoint = db_session.scalars(
+        later_revisions.where(revision_model.is_checkpoint.is_(True))
+        .order_by(revision_model.created_at, revision_model.id)
+        .limit(1)
+    ).first()
+
+    if checkpoint is None:
+        state = serialize(instance)
+        deltas = db_session.scalars(
+            later_revisions.order_by(
+                revision_model.created_at.desc(), revision_model.id.desc()
+            )
+        )
+    else:
+        state = dict(checkpoint.revision_data)
+        deltas = db_session.scalars(
+            later_revisions.where(
+                (revision_model.created_at < checkpoint.created_at)
+                | (
+                    (revision_model.created_at == checkpoint.created_at)
+                    & (revision_model.id < checkpoint.id)
+                )
+            ).order_by(revision_model.created_at.desc(), revision_model.id.desc())
+        )
+
+    for revision in deltas:
+        state.update(revision.revision_data)
+
+    return state
+
+
+def __serialize_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
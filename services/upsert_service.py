@@ -0,0 +1,305 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+from sqlalchemy import Boolean, Date, DateTime, String, JSON
+from sqlalchemy import bindparam, case, cast, column, func, insert, literal_column
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+
+from db import db_session
+from utils import validator, content_hash
+from services import revision_service
+
+
+def upsert(model, objs, revision_model=None, revision_foreign_key=None):
+    """
+    Inserts or updates rows of the given model from Hostaway objects, keyed by id.
+    Rows whose incoming values match the stored ones are left untouched. If a revision model
+    is given, a revision of each updated row is written to it (see revision_service).
+    Runs in the current session transaction; the caller commits.
+    Returns a dict with created, updated and unchanged counts.
+    """
+    rows = __filter_rows(model, objs)
+    counts = {"created": 0, "updated": 0, "unchanged": 0}
+    if "content_hash" in model.__table__.c:
+        rows, counts["unchanged"] = __drop_unchanged_rows(model, rows)
+    if not rows:
+        return counts
+
+    if db_session.get_bind().dialect.name == "postgresql":
+        upsert_rows = __upsert_with_on_conflict
+    else:
+        upsert_rows = __upsert_with_orm
+
+    # A statement can only touch each row once: group rows sharing the same set of columns
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    for group in groups.values():
+        group_counts = upsert_rows(model, group, revision_model, revision_foreign_key)
+        for key in counts:
+            counts[key] += group_counts[key]
+
+    return counts
+
+
+def insert_missing(model, objs):
+    """Inserts the rows of the given model that don't exist yet, keyed by id. Existing rows are left untouched."""
+    rows = __filter_rows(model, objs)
+    if not rows:
+        return
+
+    if db_session.get_bind().dialect.name == "postgresql":
+        stmt = (
+            pg_insert(model.__table__)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["id"])
+        )
+        db_session.execute(stmt)
+        return
+
+    columns = model.__table__.columns
+    for row in rows:
+        if db_session.get(model, row["id"]) is None:
+            db_session.add(
+                model(
+                    **{
+                        key: __normalize(columns[key], value)
+                        for key, value in row.items()
+                    }
+                )
+            )
+    db_session.flush()
+
+
+def __filter_rows(model, objs):
+    """Keeps only model columns, and the last object for each id."""
+    valid_columns = __get_payload_columns(model)
+
+    rows = {}
+    for obj in objs:
+        rows.pop(obj["id"], None)  # Later objects win, in delivery order
+        rows[obj["id"]] = {
+            key: value for key, value in obj.items() if key in valid_columns
+        }
+
+    return list(rows.values())
+
+
+def __drop_unchanged_rows(model, rows):
+    """
+    Drops the rows whose content hash matches the stored one, reading only the (id, content_hash) index.
+    Returns the remaining rows and the number of rows dropped.
+    """
+    table = model.__table__
+    stored_hashes = dict(
+        db_session.execute(
+            select(table.c.id, table.c.content_hash).where(
+                table.c.id.in_([row["id"] for row in rows])
+            )
+        ).all()
+    )
+
+    changed_rows = [
+        row
+        for row in rows
+        if stored_hashes.get(row["id"]) is None
+        or stored_hashes[row["id"]] != content_hash.compute(table, row)
+    ]
+    return changed_rows, len(rows) - len(changed_rows)
+
+
+@lru_cache(maxsize=None)
+def __get_payload_columns(model):
+    """Returns the model columns that can be set from a Hostaway object."""
+    return frozenset(
+        column.name
+        for column in model.__table__.columns
+        if column.name not in validator.MODEL_MANAGED_COLUMNS
+    )
+
+
+def __upsert_with_on_conflict(model, rows, revision_model, revision_foreign_key):
+    """
+    Upserts rows with a single INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement.
+    The revisions are written by a data-modifying CTE of the same statement.
+    """
+    table = model.__table__
+    update_columns = [name for name in rows[0] if name != "id"]
+    if not update_columns:
+        insert_missing(model, rows)
+        return {"created": 0, "updated": 0, "unchanged": len(rows)}
+
+    # The hash of a partial row depends on the stored values it doesn't overwrite: it's computed
+    # from the merged row the statement returns
+    rehash = "content_hash" in table.c and not set(
+        content_hash.get_hashed_columns(table)
+    ) <= set(rows[0])
+    if "content_hash" in table.c and not rehash:
+        rows = [
+            {**row, "content_hash": content_hash.compute(table, row)} for row in rows
+        ]
+        update_columns.append("content_hash")
+
+    stmt = pg_insert(table).values(rows)
+    set_values = {name: stmt.excluded[name] for name in update_columns}
+    for name in ("updated_at", "updatedOn"):
+        if name in table.c and name not in set_values:
+            set_values[name] = func.now()
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_=set_values,
+        # Skip the update (and its revision) if nothing changed
+        where=tuple_(*[table.c[name] for name in update_columns]).is_distinct_from(
+            tuple_(*[stmt.excluded[name] for name in update_columns])
+        ),
+    ).returning(*table.c, literal_column("(xmax = 0)", type_=Boolean).label("created"))
+
+    if revision_model is None:
+        result = db_session.execute(stmt)
+    else:
+        # All CTEs see the same snapshot, so `previous` holds the rows as they were before the update
+        previous = (
+            select(table)
+            .where(table.c.id.in_([row["id"] for row in rows]))
+            .with_for_update()
+            .cte("previous")
+        )
+        upserted = stmt.cte("upserted")
+        revisions = insert(revision_model.__table__).from_select(
+            [revision_foreign_key, "revision_data", "is_checkpoint", "created_at"],
+            __select_revisions(
+                previous, upserted, revision_model, revision_foreign_key
+            ),
+        )
+        result = db_session.execute(
+            select(*upserted.c).add_cte(previous, revisions.cte("revisions"))
+        )
+
+    returned = result.all()
+    if rehash and returned:
+        __store_content_hashes(table, returned)
+
+    created = sum(1 for row in returned if row.created)
+    return {
+        "created": created,
+        "updated": len(returned) - created,
+        "unchanged": len(rows) - len(returned),
+    }
+
+
+def __store_content_hashes(table, rows):
+    """Stores the content hash of upserted rows, computed from their merged values."""
+    db_session.execute(
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values(content_hash=bindparam("row_content_hash")),
+        [
+            {
+                "row_id": row.id,
+                "row_content_hash": content_hash.compute(table, row._mapping),
+            }
+            for row in rows
+        ],
+    )
+
+
+def __select_revisions(previous, upserted, revision_model, revision_foreign_key):
+    """
+    Selects the revision rows for the updated rows of an upsert, computed in SQL:
+    the previous values of the changed columns, or the full previous row every CHECKPOINT_INTERVAL revisions.
+    """
+    revision_table = revision_model.__table__
+    previous_data = func.to_jsonb(literal_column("previous"), type_=JSONB)
+    upserted_data = func.to_jsonb(literal_column("upserted"), type_=JSONB)
+
+    previous_column = func.jsonb_each(previous_data).table_valued(
+        column("key", String), column("value", JSONB)
+    )
+    changed_data = (
+        select(func.jsonb_object_agg(previous_column.c.key, previous_column.c.value))
+        .where(
+            previous_column.c.value.is_distinct_from(
+                upserted_data[previous_column.c.key]
+            )
+        )
+        .scalar_subquery()
+    )
+
+    revision_count = (
+        select(func.count())
+        .select_from(revision_table)
+        .where(revision_table.c[revision_foreign_key] == previous.c.id)
+        .scalar_subquery()
+    )
+    is_checkpoint = revision_count % revision_service.CHECKPOINT_INTERVAL == 0
+
+    return (
+        select(
+            previous.c.id,
+            cast(
+                case(
+                    (is_checkpoint, previous_data),
+                    else_=func.coalesce(changed_data, func.jsonb_build_object()),
+                ),
+                JSON,
+            ),
+            is_checkpoint,
+            func.now(),
+        )
+        .select_from(previous.join(upserted, upserted.c.id == previous.c.id))
+        .where(upserted.c.created.is_(False))
+    )
+
+
+def __upsert_with_orm(model, rows, revision_model, revision_foreign_key):
+    """Portable fallback for databases without native upsert support: compares and writes rows through the ORM."""
+    counts = {"created": 0, "updated": 0, "unchanged": 0}
+    columns = model.__table__.columns
+
+    for row in rows:
+        row = {key: __normalize(columns[key], value) for key, value in row.items()}
+        instance = db_session.get(model, row["id"])
+        if instance is None:
+            db_session.add(model(**row))
+            counts["created"] += 1
+            continue
+
+        changes = {
+            key: value
+            for key, value in row.items()
+            if __normalize(columns[key], getattr(instance, key)) != value
+        }
+        if not changes:
+            counts["unchanged"] += 1
+            continue
+
+        if revision_model is not None:
+            changed_columns = set(changes) | {"updated_at", "updatedOn", "content_hash"}
+            db_session.add(
+                revision_service.build_revision(
+                    instance, revision_model, revision_foreign_key, changed_columns
+                )
+            )
+
+        for key, value in changes.items():
+            setattr(instance, key, value)
+        counts["updated"] += 1
+
+    db_session.flush()
+    return counts
+
+
+def __normalize(column, value):
+    """Converts a payload or attribute value to the Python type stored in the column."""
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime) and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Date) and isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(column.type, Boolean):
+        return bool(value)
+    return value
@@ -0,0 +1,119 @@
+import gzip
+import pytest
+import time
+from flask import Flask
+
+from blueprints.log_routes import log_routes_bp
+from utils import logger
+
+LOG_LINES = [
+    f"2026-10-18 {hour:02d}:00:00,000 - INFO - Line {hour}\n".encode()
+    for hour in range(24)
+]
+
+
+@pytest.fixture
+def client(tmp_path, mocker):
+    """Fixture providing a test client serving a log rotated once."""
+    mocker.patch("utils.logger.LOG_DIRECTORY", str(tmp_path))
+    (tmp_path / "general.log.1").write_bytes(b"".join(LOG_LINES[:12]))
+    (tmp_path / "general.log").write_bytes(b"".join(LOG_LINES[12:]))
+
+    app = Flask(__name__)
+    app.register_blueprint(log_routes_bp)
+    return app.test_client()
+
+
+def test_get_log_streams_all_segments(client):
+    response = client.get("/logs/general")
+
+    assert response.status_code == 200
+    assert response.data == b"".join(LOG_LINES)
+    assert response.headers["Content-Length"] == str(len(response.data))
+
+
+def test_get_log_tail(client):
+    response = client.get("/logs/general?tail=2")
+
+    assert response.data == LOG_LINES[22] + LOG_LINES[23]
+
+
+def test_get_log_time_range(client):
+    response = client.get(
+        "/logs/general?since=2026-10-18T11:00:00&until=2026-10-18T13:00:00&tail=2"
+    )
+
+    assert response.data == LOG_LINES[12] + LOG_LINES[13]
+
+
+def test_get_log_time_range_with_offsets(client, monkeypatch):
+    """Timestamps with an offset are compared in local time, the time the log lines are written in."""
+    monkeypatch.setenv("TZ", "UTC")
+    time.tzset()
+    try:
+        response = client.get(
+            "/logs/general?since=2026-10-18T13:00:00%2B02:00&until=2026-10-18T13:00:00Z"
+        )
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    assert response.status_code == 200
+    assert response.data == LOG_LINES[11] + LOG_LINES[12] + LOG_LINES[13]
+
+
+def test_get_log_range_request(client):
+    content = b"".join(LOG_LINES)
+
+    response = client.get("/logs/general", headers={"Range": "bytes=10-99"})
+    assert response.status_code == 206
+    assert response.data == content[10:100]
+    assert response.headers["Content-Range"] == f"bytes 10-99/{len(content)}"
+
+    response = client.get("/logs/general", headers={"Range": "bytes=-20"})
+    assert response.data == content[-20:]
+
+    response = client.get("/logs/general", headers={"Range": f"bytes={len(content)}-"})
+    assert response.status_code == 416
+
+
+def test_get_log_gzip(client):
+    response = client.get("/logs/general", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data) == b"".join(LOG_LINES)
+
+
+def test_get_log_errors(client):
+    assert client.get("/logs/missing").status_code == 404
+    assert client.get("/logs/general?tail=-1").status_code == 400
+    assert client.get("/logs/general?since=yesterday").status_code == 400
+
+
+def test_search_logs(client, tmp_path):
+    logger.setup_logging()
+    for reservation_id in (1, 2, 1):
+        logger.log_inform(
+            f"Reservation {reservation_id} updated", reservation_id=reservation_id
+        )
+    logger.log_warning("Reservation 1 out of sync", reservation_id=1)
+    logger.stop_logging()
+
+    response = client.get("/logs/search?reservation_id=1&limit=2")
+    assert response.status_code == 200
+    assert [event["message"] for event in response.json["events"]] == [
+        "Reservation 1 out of sync",
+        "Reservation 1 updated",
+    ]
+
+    response = client.get(
+        f"/logs/search?reservation_id=1&before={response.json['next_before']}"
+    )
+    assert [event["message"] for event in response.json["events"]] == [
+        "Reservation 1 updated"
+    ]
+    assert response.json["next_before"] is None
+
+    response = client.get("/logs/search?level=warning")
+    assert [event["reservation_id"] for event in response.json["events"]] == [1]
+    assert client.get("/logs/search?level=loud").status_code == 400
@@ -0,0 +1,48 @@
+from flask import Flask
+
+from blueprints.metrics_routes import metrics_routes_bp
+from handlers import hostaway_event_handler
+
+
+def get_sample(client, sample):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert (
+        response.headers["Content-Type"] == "text/plain; version=0.0.4; charset=utf-8"
+    )
+    [line] = [
+        line for line in response.text.splitlines() if line.startswith(f"{sample} ")
+    ]
+    return float(line.split()[1])
+
+
+def test_get_metrics(mocker):
+    mocker.patch("handlers.hostaway_event_handler.notifier")
+    app = Flask(__name__)
+    app.register_blueprint(metrics_routes_bp)
+    client = app.test_client()
+
+    invalid_events = get_sample(client, "hostaway_invalid_events_total")
+    hostaway_event_handler.handle_event({"object": "reservation"})
+
+    assert get_sample(client, "hostaway_invalid_events_total") == invalid_events + 1
+
+
+def test_job_queue_metrics_share_one_stats_query(mocker):
+    from utils import metrics
+
+    mocker.patch("workers.jobs.__queue_stats", None)
+    queue = mocker.patch("workers.jobs.hostaway_webhook_queue")
+    queue.stats.return_value = {
+        "ready": 3,
+        "in_flight": 1,
+        "dead": 0,
+        "lag_seconds": 12.5,
+        "oldest_age_seconds": 20.0,
+    }
+
+    rendered = metrics.render()
+
+    queue.stats.assert_called_once()
+    assert 'job_queue_entries{queue="hostaway_webhook",state="ready"} 3' in rendered
+    assert 'job_queue_lag_seconds{queue="hostaway_webhook"} 12.5' in rendered
@@ -0,0 +1,103 @@
+from flask import Flask
+
+from blueprints.profiling_routes import profiling_routes_bp
+from utils import profiler
+
+
+def create_client(token):
+    app = Flask(__name__)
+    app.config["ADMIN_TOKEN"] = token
+    app.register_blueprint(profiling_routes_bp)
+    return app.test_client()
+
+
+def test_admin_token():
+    assert create_client(None).post("/admin/profile").status_code == 403
+
+    client = create_client("secret")
+    assert client.post("/admin/profile").status_code == 401
+    response = client.post("/admin/profile", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
+
+
+def test_profile(mocker):
+    client = create_client("secret")
+    headers = {"Authorization": "Bearer secret"}
+    stacks = profiler.Counter({"worker;run (a.py:1);handle (b.py:2)": 3})
+    sample_stacks = mocker.patch(
+        "utils.profiler.sample_stacks", return_value=(stacks, 5, 0.002)
+    )
+
+    response = client.post("/admin/profile?seconds=1000&interval_ms=5", headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert ".folded" in response.headers["Content-Disposition"]
+    assert response.text == "worker;run (a.py:1);handle (b.py:2) 3\n"
+    sample_stacks.assert_called_with(profiler.MAX_PROFILE_SECONDS, 0.005, None)
+
+    response = client.post(
+        "/admin/profile?seconds=1&format=json&thread=worker", headers=headers
+    )
+    assert response.json["samples"] == 5
+    assert response.json["stacks"] == [
+        {"stack": ["worker", "run (a.py:1)", "handle (b.py:2)"], "count": 3}
+    ]
+    sample_stacks.assert_called_with(1, 0.01, "worker")
+
+    sample_stacks.side_effect = profiler.ProfilerBusyError("busy")
+    assert client.post("/admin/profile", headers=headers).status_code == 409
+
+
+def test_event_profile():
+    client = create_client("secret")
+    headers = {"Authorization": "Bearer secret"}
+    url = "/admin/profile/events/reservation.updated"
+
+    assert client.get(url, headers=headers).status_code == 404
+    response = client.post(f"{url}?count=1", headers=headers)
+    assert response.json["count"] == 1
+    with profiler.profile_event("reservation.updated"):
+        sorted(range(1000), reverse=True)
+
+    response = client.get(f"{url}?sort=tottime", headers=headers)
+    assert response.json["profiled"] == 1
+    assert "sorted" in response.json["stats"]
+    assert client.get(f"{url}?sort=bogus", headers=headers).status_code == 400
+
+    assert client.delete(url, headers=headers).status_code == 200
+    assert client.delete(url, headers=headers).status_code == 404
+
+
+def test_memory(mocker):
+    client = create_client("secret")
+    headers = {"Authorization": "Bearer secret"}
+
+    response = client.get("/admin/memory", headers=headers)
+    assert response.status_code == 200
+    assert response.json["tracemalloc"] == {"tracing": False}
+    assert {"process", "sessions", "queues"} <= set(response.json)
+    assert client.post("/admin/memory/snapshots", headers=headers).status_code == 409
+
+    assert client.post("/admin/memory/tracing", headers=headers).json["started"]
+    try:
+        snapshot = client.post("/admin/memory/snapshots", headers=headers).json
+        response = client.get("/admin/memory?limit=3", headers=headers)
+        assert len(response.json["tracemalloc"]["top_allocators"]) == 3
+
+        response = client.get(
+            f"/admin/memory/diff?from={snapshot['id']}&group_by=filename",
+            headers=headers,
+        )
+        assert response.json["from"] == snapshot["id"]
+        assert response.json["to"] is None
+        response = client.get("/admin/memory/diff?to=1000", headers=headers)
+        assert response.status_code == 404
+        response = client.get("/admin/memory/diff?group_by=bogus", headers=headers)
+        assert response.status_code == 400
+    finally:
+        assert (
+            client.delete("/admin/memory/tracing", headers=headers).status_code == 200
+        )
+    assert client.get("/admin/memory/snapshots", headers=headers).json == {
+        "snapshots": []
+    }
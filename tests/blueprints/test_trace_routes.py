@@ -0,0 +1,35 @@
+from flask import Flask
+
+from blueprints.hostaway_routes import hostaway_routes_bp
+from blueprints.trace_routes import trace_routes_bp
+from utils import tracing
+
+
+def test_webhook_trace(mocker):
+    tracing.clear()
+    job_queue = mocker.patch("workers.jobs.hostaway_webhook_queue")
+    app = Flask(__name__)
+    app.register_blueprint(hostaway_routes_bp)
+    app.register_blueprint(trace_routes_bp)
+    client = app.test_client()
+
+    response = client.post("/hostaway/webhook", json={"object": "task", "data": {}})
+    trace_id = response.json["trace_id"]
+    job_queue.put.assert_called_once_with(
+        {"object": "task", "data": {}}, trace_id=trace_id
+    )
+    with tracing.trace(trace_id, "process"):
+        with tracing.span("service"):
+            pass
+
+    [trace] = client.get("/traces").json["traces"]
+    assert trace["trace_id"] == trace_id
+    assert {"enqueue", "service"} <= set(trace["breakdown_ms"])
+
+    response = client.get(f"/traces/{trace_id}")
+    assert [segment["segment"] for segment in response.json["segments"]] == [
+        "receive",
+        "process",
+    ]
+    assert client.get("/traces/missing").status_code == 404
+    tracing.clear()
@@ -0,0 +1,28 @@
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from db import db, db_session, initialize
+
+
+@pytest.fixture
+def database_app(tmp_path):
+    """Fixture providing an app bound to a temporary SQLite database with savepoint support."""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'app.db'}"
+    initialize(app)
+
+    with app.app_context():
+
+        @event.listens_for(db.engine, "connect")
+        def do_connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(db.engine, "begin")
+        def do_begin(connection):
+            connection.exec_driver_sql("BEGIN")
+
+        db.create_all()
+        yield app
+        db_session.remove()
+        db.engine.dispose()
@@ -0,0 +1,97 @@
+import time
+import threading
+import pytest
+from flask import Flask
+
+from services import hydration_service
+
+
+@pytest.fixture(scope="module")
+def hydrator():
+    """Fixture starting the hydration thread once for the module."""
+    hydration_service.start(Flask(__name__))
+    return hydration_service
+
+
+@pytest.fixture
+def create_reservation(mocker):
+    return mocker.patch(
+        "services.hydration_service.reservation_service.create_reservation"
+    )
+
+
+def test_concurrent_requests_share_a_single_fetch(hydrator, create_reservation, mocker):
+    def get_reservation(reservation_id):
+        time.sleep(0.2)  # Keep the fetch in flight while the other callers arrive
+        return {"id": reservation_id}
+
+    get_reservation = mocker.patch(
+        "services.hydration_service.hostaway_client.get_reservation",
+        side_effect=get_reservation,
+    )
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(hydrator.hydrate(101)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [True] * 5
+    get_reservation.assert_called_once_with(101)
+    create_reservation.assert_called_once_with({"id": 101})
+
+
+def test_distinct_missing_reservations_are_fetched_together(
+    hydrator, create_reservation, mocker
+):
+    get_reservations = mocker.patch(
+        "services.hydration_service.hostaway_client.get_reservations",
+        return_value=[{"id": 201}, {"id": 202}, {"id": 999}],
+    )
+    mocker.patch(
+        "services.hydration_service.validator.validate_and_clean_hostaway_payload",
+        side_effect=lambda data, object_type: (True, "", data),
+    )
+    get_reservation = mocker.patch(
+        "services.hydration_service.hostaway_client.get_reservation",
+        return_value={"id": 203},
+    )
+
+    completed = threading.Event()
+    results = {}
+
+    def on_done(reservation_id):
+        def callback(success):
+            results[reservation_id] = success
+            if len(results) == 3:
+                completed.set()
+
+        return callback
+
+    for reservation_id in (201, 202, 203):
+        assert hydrator.request(reservation_id, on_done(reservation_id))
+
+    assert completed.wait(5)
+    assert results == {201: True, 202: True, 203: True}
+    get_reservations.assert_called_once()
+    get_reservation.assert_called_once_with(203)  # Not in the recent page
+    assert create_reservation.call_count == 3
+
+
+def test_failed_reservations_are_not_fetched_again(
+    hydrator, create_reservation, mocker
+):
+    get_reservation = mocker.patch(
+        "services.hydration_service.hostaway_client.get_reservation",
+        return_value=None,
+    )
+
+    assert hydrator.hydrate(301) is False
+    assert hydrator.hydrate(301) is False
+
+    get_reservation.assert_called_once_with(301)
+    create_reservation.assert_not_called()
@@ -0,0 +1,64 @@
+import pytest
+
+import models
+from db import db_session, unit_of_work, savepoint
+from services import reservation_index, reservation_service
+
+
+@pytest.fixture(autouse=True)
+def empty_index(mocker):
+    """Fixture giving each test an empty index and silencing Slack notifications."""
+    mocker.patch("services.reservation_service.notifier")
+    reservation_index.known_reservation_ids.clear()
+    yield
+    reservation_index.known_reservation_ids.clear()
+
+
+def reservation(reservation_id):
+    return {"id": reservation_id, "listingMapId": 100, "channelId": 2000}
+
+
+def test_warm_loads_stored_reservations(database_app):
+    for reservation_id in (1, 2, 3):
+        db_session.add(models.Reservation(**reservation(reservation_id)))
+    db_session.commit()
+
+    reservation_index.warm()
+
+    assert len(reservation_index.known_reservation_ids) == 3
+
+
+def test_created_reservations_are_indexed_on_commit(database_app):
+    reservation_service.create_reservation(reservation(1))
+
+    assert 1 in reservation_index.known_reservation_ids
+
+
+def test_known_reservation_does_not_query_the_database(database_app, mocker):
+    reservation_service.create_reservation(reservation(1))
+    get = mocker.spy(db_session, "get")
+
+    assert reservation_index.reservation_exists(1) is True
+    get.assert_not_called()
+
+
+def test_miss_falls_back_to_the_database(database_app):
+    db_session.add(models.Reservation(**reservation(1)))
+    db_session.commit()
+
+    assert reservation_index.reservation_exists(1) is True
+    assert reservation_index.reservation_exists(2) is False
+
+
+def test_rolled_back_savepoint_does_not_index(database_app):
+    with unit_of_work():
+        with savepoint():
+            reservation_service.create_reservation(reservation(1))
+        with pytest.raises(ValueError):
+            with savepoint():
+                reservation_service.create_reservation(reservation(2))
+                raise ValueError("Bad payload")
+
+    assert 1 in reservation_index.known_reservation_ids
+    assert 2 not in reservation_index.known_reservation_ids
+    assert db_session.get(models.Reservation, 2) is None
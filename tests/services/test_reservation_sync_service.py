@@ -0,0 +1,253 @@
+import pytest
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+import models
+from db import db_session
+from services import reservation_sync_service
+from utils import hostaway_client
+
+
+@pytest.fixture(autouse=True)
+def silence_notifications(mocker):
+    """Fixture silencing Slack notifications."""
+    mocker.patch("services.reservation_service.notifier")
+    notifier = mocker.patch("services.reservation_sync_service.notifier")
+    notifier.APP_STATIC_DOMAIN = "http://localhost:5000"
+    return notifier
+
+
+def reservation(reservation_id, guest_name="Jane Doe"):
+    return {
+        "id": reservation_id,
+        "listingMapId": 100,
+        "channelId": 2000,
+        "guestName": guest_name,
+    }
+
+
+def test_sync_applies_reservations_page_by_page(
+    database_app, silence_notifications, mocker
+):
+    db_session.add(models.Reservation(**reservation(2, guest_name="Old Name")))
+    db_session.commit()
+
+    pages = [(0, [reservation(1), reservation(2)], 2), (2, [reservation(3)], 3)]
+    mocker.patch(
+        "services.reservation_sync_service.hostaway_client.iter_reservation_pages",
+        return_value=iter(pages),
+    )
+    sync_page = mocker.spy(reservation_sync_service, "sync_reservation_page")
+
+    reservation_sync_service.sync_reservations_with_hostaway()
+
+    assert sync_page.call_count == 2  # One transaction per page
+    assert db_session.query(models.Reservation).count() == 3
+    assert db_session.get(models.Reservation, 2).guestName == "Jane Doe"
+    report = db_session.scalars(select(models.SyncReport)).one()
+    silence_notifications.inform.assert_called_with(
+        "Synced 3 reservations with Hostaway. Ingested 2 missing reservations. Updated 1 outdated reservations."
+        f" 1 discrepancy by field: guestName (1). Details: http://localhost:5000/sync/reports/{report.id}"
+    )
+
+
+def test_interrupted_sync_keeps_committed_pages(
+    database_app, silence_notifications, mocker
+):
+    def pages():
+        yield 0, [reservation(1)], 1
+        raise hostaway_client.ReservationListingError(1, "Read timed out")
+
+    mocker.patch(
+        "services.reservation_sync_service.hostaway_client.iter_reservation_pages",
+        return_value=pages(),
+    )
+
+    reservation_sync_service.sync_reservations_with_hostaway()
+
+    assert db_session.get(models.Reservation, 1) is not None
+    silence_notifications.error.assert_called_once()
+    assert "interrupted after 1 reservations" in str(
+        silence_notifications.error.call_args
+    )
+
+
+def test_sync_windows_cover_the_whole_portfolio():
+    windows = reservation_sync_service.get_sync_windows(
+        date(2026, 1, 18), history_months=3
+    )
+
+    assert [(window.key, window.filters) for window in windows] == [
+        ("upcoming", {"departureStartDate": "2026-01-17"}),
+        (
+            "arrivals:2026-01",
+            {"arrivalStartDate": "2026-01-01", "arrivalEndDate": "2026-01-31"},
+        ),
+        (
+            "arrivals:2025-12",
+            {"arrivalStartDate": "2025-12-01", "arrivalEndDate": "2025-12-31"},
+        ),
+        (
+            "arrivals:2025-11",
+            {"arrivalStartDate": "2025-11-01", "arrivalEndDate": "2025-11-30"},
+        ),
+        ("archive", {"arrivalEndDate": "2025-10-31"}),
+    ]
+
+
+def test_incremental_sync_rescans_windows_when_due(database_app, mocker):
+    iter_pages = mocker.patch(
+        "services.reservation_sync_service.hostaway_client.iter_reservation_pages",
+        side_effect=lambda offset, **filters: iter([(offset, [reservation(1)], 1)]),
+    )
+    now = datetime(2026, 1, 18, 12, 0)
+
+    assert reservation_sync_service.sync_reservations_incrementally(3, now) == 5
+    assert db_session.query(models.SyncCheckpoint).count() == 5
+
+    # Nothing is due an hour later, only the upcoming stays are after the hot interval
+    assert (
+        reservation_sync_service.sync_reservations_incrementally(
+            3, now + timedelta(hours=1)
+        )
+        == 0
+    )
+    iter_pages.reset_mock()
+    assert (
+        reservation_sync_service.sync_reservations_incrementally(
+            3, now + timedelta(hours=7)
+        )
+        == 1
+    )
+    iter_pages.assert_called_once_with(
+        offset=0, lane="background", departureStartDate="2026-01-17"
+    )
+
+
+def test_interrupted_window_resumes_from_its_checkpoint(database_app, mocker):
+    def pages(offset, **filters):
+        yield offset, [reservation(offset + 1)], offset + 1
+        if offset == 0 and "departureStartDate" in filters:
+            raise hostaway_client.ReservationListingError(1, "Read timed out")
+
+    iter_pages = mocker.patch(
+        "services.reservation_sync_service.hostaway_client.iter_reservation_pages",
+        side_effect=pages,
+    )
+    now = datetime(2026, 1, 18, 12, 0)
+
+    assert reservation_sync_service.sync_reservations_incrementally(0, now) == 1
+    assert db_session.get(models.SyncCheckpoint, "upcoming").next_offset == 1
+
+    iter_pages.reset_mock()
+    reservation_sync_service.sync_reservations_incrementally(
+        0, now + timedelta(minutes=15)
+    )
+
+    iter_pages.assert_called_once_with(
+        offset=1, lane="background", departureStartDate="2026-01-17"
+    )
+    checkpoint = db_session.get(models.SyncCheckpoint, "upcoming")
+    assert checkpoint.next_offset == 0
+    assert checkpoint.synced_at == now + timedelta(minutes=15)
+
+
+def test_sync_page_diffs_only_changed_rows_and_writes_in_bulk(database_app, mocker):
+    for reservation_id in (1, 2):
+        db_session.add(
+            models.Reservation(
+                **reservation(reservation_id), arrivalDate=date(2026, 1, 18)
+            )
+        )
+    db_session.commit()
+
+    check = mocker.spy(reservation_sync_service, "check_for_discrepancies")
+    upsert = mocker.spy(
+        reservation_sync_service.reservation_service, "upsert_reservations"
+    )
+    page = [
+        {**reservation(1), "arrivalDate": "2026-01-18"},  # Unchanged once parsed
+        {**reservation(2, guest_name="New Name"), "arrivalDate": "2026-01-18"},
+        reservation(3),
+    ]
+
+    assert reservation_sync_service.sync_reservation_page(page) == (1, 1)
+
+    check.assert_called_once()
+    upsert.assert_called_once()
+    assert [obj["id"] for obj in upsert.call_args.args[0]] == [3, 2]
+    assert db_session.get(models.Reservation, 2).guestName == "New Name"
+
+
+def test_sync_page_records_discrepancies_in_report(database_app):
+    db_session.add(
+        models.Reservation(
+            **reservation(1), status="new", arrivalDate=date(2026, 1, 18)
+        )
+    )
+    db_session.add(models.Reservation(**reservation(2), status="new"))
+    db_session.commit()
+    report_id = reservation_sync_service.start_report("full")
+
+    page = [
+        {**reservation(1), "status": "modified", "arrivalDate": "2026-01-19"},
+        {**reservation(2), "status": "cancelled"},
+    ]
+    reservation_sync_service.sync_reservation_page(page, report_id)
+    report = reservation_sync_service.finish_report(
+        report_id, {"synced": 2, "missing": 0, "outdated": 2}
+    )
+
+    assert report.field_counts == {"status": 2, "arrivalDate": 1}
+    details = reservation_sync_service.get_report_details(report_id, field="status")
+    assert details["outdated"] == 2
+    assert details["discrepancies"] == [
+        {
+            "reservation_id": 1,
+            "field": "status",
+            "local_value": "new",
+            "hostaway_value": "modified",
+        },
+        {
+            "reservation_id": 2,
+            "field": "status",
+            "local_value": "new",
+            "hostaway_value": "cancelled",
+        },
+    ]
+    assert reservation_sync_service.get_report_details(report_id + 1) is None
+
+
+def test_digest_summarizes_fields_and_links_to_report(mocker):
+    mocker.patch("services.reservation_sync_service.DIGEST_FIELDS", 2)
+    report = models.SyncReport(
+        id=7,
+        synced=500,
+        missing=0,
+        outdated=40,
+        field_counts={"status": 30, "guestName": 10, "arrivalDate": 5},
+    )
+
+    assert reservation_sync_service.get_digest(report) == (
+        "Synced 500 reservations with Hostaway. Updated 40 outdated reservations."
+        " 45 discrepancies by field: status (30), guestName (10) and 1 more fields."
+        " Details: http://localhost:5000/sync/reports/7"
+    )
+
+
+def test_start_report_deletes_expired_reports(database_app):
+    expired = models.SyncReport(
+        mode="full", started_at=datetime.now() - timedelta(days=31)
+    )
+    db_session.add(expired)
+    db_session.flush()
+    db_session.add(
+        models.SyncDiscrepancy(report_id=expired.id, reservation_id=1, field="status")
+    )
+    db_session.commit()
+
+    report_id = reservation_sync_service.start_report("incremental")
+
+    assert db_session.scalars(select(models.SyncReport.id)).all() == [report_id]
+    assert db_session.query(models.SyncDiscrepancy).count() == 0
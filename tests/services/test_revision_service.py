@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import models
+from db import db_session
+from services import reservation_service, revision_service
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture(autouse=True)
+def mock_notifier(mocker):
+    """Fixture silencing Slack notifications."""
+    mocker.patch("services.reservation_service.notifier")
+
+
+def reservation(status):
+    return {"id": 1, "listingMapId": 100, "channelId": 2000, "status": status}
+
+
+def apply_updates(statuses):
+    """Creates reservation 1 at START, then applies one update per status a minute apart."""
+    reservation_service.create_reservation(reservation("created"))
+    db_session.get(models.Reservation, 1).created_at = START
+    db_session.commit()
+
+    for status in statuses:
+        reservation_service.update_reservation(reservation(status))
+
+    # Spread the revisions out in time, one minute apart
+    revisions = (
+        db_session.query(models.ReservationRevision)
+        .order_by(models.ReservationRevision.id)
+        .all()
+    )
+    for minute, revision in enumerate(revisions, start=1):
+        revision.created_at = START + timedelta(minutes=minute)
+    db_session.commit()
+    return revisions
+
+
+def test_revisions_store_only_changed_columns(database_app, mocker):
+    mocker.patch.object(revision_service, "CHECKPOINT_INTERVAL", 3)
+    revisions = apply_updates(["a", "b", "c", "d"])
+
+    assert [revision.is_checkpoint for revision in revisions] == [
+        True,
+        False,
+        False,
+        True,
+    ]
+    assert revisions[0].revision_data["listingMapId"] == 100
+    assert revisions[1].revision_data["status"] == "a"
+    assert "listingMapId" not in revisions[1].revision_data
+
+
+def test_unchanged_update_writes_no_revision(database_app):
+    apply_updates(["a", "a", "a"])
+
+    assert db_session.query(models.ReservationRevision).count() == 1
+
+
+@pytest.mark.parametrize("interval", [1, 2, 3, 20])
+def test_get_state_at_reconstructs_every_version(database_app, mocker, interval):
+    mocker.patch.object(revision_service, "CHECKPOINT_INTERVAL", interval)
+    statuses = ["a", "b", "c", "d", "e"]
+    apply_updates(statuses)
+
+    history = ["created"] + statuses
+    for minute, expected_status in enumerate(history):
+        state = revision_service.get_reservation_state_at(
+            1, START + timedelta(minutes=minute, seconds=30)
+        )
+        assert state["status"] == expected_status
+        assert state["listingMapId"] == 100
+
+    assert (
+        revision_service.get_reservation_state_at(1, START - timedelta(seconds=1))
+        is None
+    )
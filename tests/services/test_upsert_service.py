@@ -0,0 +1,197 @@
+import pytest
+
+import models
+from db import db_session
+from services import upsert_service, reservation_service, message_service
+
+
+@pytest.fixture(autouse=True)
+def mock_notifier(mocker):
+    """Fixture silencing Slack notifications."""
+    mocker.patch("services.reservation_service.notifier")
+    mocker.patch("services.message_service.notifier")
+
+
+def reservation(reservation_id, **overrides):
+    reservation = {
+        "id": reservation_id,
+        "listingMapId": 100,
+        "channelId": 2000,
+        "status": "new",
+        "guestName": "Guest",
+        "arrivalDate": "2024-09-01",
+        "departureDate": "2024-09-05",
+        "unknownField": "ignored",
+    }
+    reservation.update(overrides)
+    return reservation
+
+
+def test_upsert_reports_created_updated_and_unchanged_counts(database_app):
+    counts = reservation_service.upsert_reservations([reservation(1), reservation(2)])
+    db_session.commit()
+    assert counts == {"created": 2, "updated": 0, "unchanged": 0}
+
+    counts = reservation_service.upsert_reservations(
+        [reservation(1), reservation(2, status="modified"), reservation(3)]
+    )
+    db_session.commit()
+    assert counts == {"created": 1, "updated": 1, "unchanged": 1}
+    assert db_session.get(models.Reservation, 2).status == "modified"
+
+
+def test_upsert_writes_revision_only_for_changed_rows(database_app):
+    reservation_service.create_reservation(reservation(1))
+    reservation_service.update_reservation(reservation(1))
+    assert db_session.query(models.ReservationRevision).count() == 0
+
+    reservation_service.update_reservation(reservation(1, guestName="New Guest"))
+    revisions = db_session.query(models.ReservationRevision).all()
+    assert len(revisions) == 1
+    assert revisions[0].revision_data["guestName"] == "Guest"
+    assert revisions[0].revision_data["arrivalDate"] == "2024-09-01"
+
+
+def test_upsert_keeps_last_object_per_id(database_app):
+    counts = reservation_service.upsert_reservations(
+        [reservation(1, status="first"), reservation(1, status="second")]
+    )
+    db_session.commit()
+
+    assert counts["created"] == 1
+    assert db_session.get(models.Reservation, 1).status == "second"
+
+
+def test_duplicate_reservation_creation_warns(database_app):
+    reservation_service.create_reservation(reservation(1))
+    reservation_service.create_reservation(reservation(1))
+
+    reservation_service.notifier.warn.assert_called_once_with(
+        "Duplicate reservation creation for Reservation ID: 1", reservation_id=1
+    )
+
+
+def test_duplicate_conversation_message_is_a_no_op(database_app):
+    reservation_service.create_reservation(reservation(1))
+    message = {
+        "id": 10,
+        "accountId": 1,
+        "reservationId": 1,
+        "conversationId": 5,
+        "body": "Hello",
+        "communicationType": "email",
+        "isIncoming": 1,
+    }
+
+    message_service.create_conversation_message(message)
+    message_service.create_conversation_message(message)
+
+    assert db_session.query(models.Conversation).count() == 1
+    assert db_session.query(models.ConversationMessage).count() == 1
+    message_service.notifier.warn.assert_called_once()
+
+
+def test_insert_missing_leaves_existing_rows_untouched(database_app):
+    reservation_service.create_reservation(reservation(1))
+    upsert_service.insert_missing(models.Conversation, [{"id": 5, "reservation_id": 1}])
+    upsert_service.insert_missing(models.Conversation, [{"id": 5, "reservation_id": 2}])
+    db_session.commit()
+
+    assert db_session.get(models.Conversation, 5).reservation_id == 1
+
+
+def test_upsert_skips_unchanged_rows_by_content_hash(database_app, mocker):
+    reservation_service.create_reservation(reservation(1))
+    get = mocker.spy(db_session, "get")
+
+    counts = reservation_service.upsert_reservations([reservation(1)])
+
+    assert counts == {"created": 0, "updated": 0, "unchanged": 1}
+    get.assert_not_called()  # The row itself was never loaded
+
+
+def test_upsert_maintains_content_hash(database_app):
+    from utils import content_hash
+
+    table = models.Reservation.__table__
+    reservation_service.create_reservation(reservation(1))
+    reservation_service.update_reservation(reservation(1, guestName="New Guest"))
+
+    stored = db_session.get(models.Reservation, 1)
+    assert stored.content_hash == content_hash.compute(
+        table, reservation(1, guestName="New Guest")
+    )
+
+
+def test_postgres_upsert_writes_revisions_in_one_statement(mocker):
+    """The PostgreSQL path, compiled for its dialect: one upsert whose CTEs lock and revise the previous rows."""
+    from types import SimpleNamespace
+
+    from sqlalchemy.dialects import postgresql
+
+    from utils import content_hash
+
+    table = models.Reservation.__table__
+    stored = {
+        **reservation(1, guestName="New Guest"),
+        "guestEmail": "guest@example.com",
+    }
+    del stored["unknownField"]
+    statements = []
+
+    def execute(statement, params=None):
+        statements.append((statement, params))
+        result = mocker.Mock()
+        # First the stored content hashes (none), then the upserted rows
+        result.all.return_value = (
+            [SimpleNamespace(id=1, created=False, _mapping=stored)]
+            if len(statements) > 1
+            else []
+        )
+        return result
+
+    session = mocker.patch("services.upsert_service.db_session")
+    session.get_bind.return_value.dialect.name = "postgresql"
+    session.execute.side_effect = execute
+
+    counts = reservation_service.upsert_reservations(
+        [reservation(1, guestName="New Guest")]
+    )
+
+    assert counts == {"created": 0, "updated": 1, "unchanged": 0}
+    upsert, hashes = statements[1:]
+    sql = " ".join(str(upsert[0].compile(dialect=postgresql.dialect())).split())
+    assert "ON CONFLICT (id) DO UPDATE SET" in sql
+    assert "IS DISTINCT FROM" in sql
+    assert "RETURNING" in sql
+    previous = sql[sql.index("previous AS (") : sql.index("upserted AS (")]
+    assert "FROM reservations" in previous and previous.rstrip(" ,").endswith(
+        "FOR UPDATE)"
+    )
+    assert (
+        "revisions AS (INSERT INTO reservation_revisions "
+        "(reservation_id, revision_data, is_checkpoint, created_at)" in sql
+    )
+    assert "jsonb_object_agg" in sql
+
+    # The payload is partial: its hash is computed from the merged row, once upserted
+    assert (
+        "content_hash"
+        not in sql[sql.index("INSERT INTO reservations") :].split("VALUES")[0]
+    )
+    assert str(hashes[0]).startswith("UPDATE reservations SET")
+    assert "content_hash=:row_content_hash" in str(hashes[0])
+    assert hashes[1] == [
+        {"row_id": 1, "row_content_hash": content_hash.compute(table, stored)}
+    ]
+
+
+def test_update_of_unknown_reservation_is_reported(database_app):
+    reservation_service.reservation_index.known_reservation_ids.clear()
+    reservation_service.update_reservation(reservation(1))
+
+    assert db_session.get(models.Reservation, 1) is None
+    reservation_service.notifier.error.assert_called_once_with(
+        "Reservation update received for non-existent reservation ID: 1",
+        reservation_id=1,
+    )
@@ -0,0 +1,34 @@
+from datetime import date
+
+import models
+from utils import content_hash
+
+TABLE = models.Reservation.__table__
+
+
+def test_hash_is_computed_from_typed_values():
+    stored = {"id": 1, "listingMapId": 100, "channelId": 2000}
+    stored["arrivalDate"] = date(2024, 9, 1)
+    payload = {"id": 1, "listingMapId": 100, "channelId": 2000}
+    payload["arrivalDate"] = "2024-09-01"
+
+    assert content_hash.compute(TABLE, stored) == content_hash.compute(TABLE, payload)
+
+
+def test_hash_ignores_key_and_managed_columns():
+    row = {"id": 1, "listingMapId": 100, "channelId": 2000}
+
+    assert content_hash.compute(TABLE, row) == content_hash.compute(
+        TABLE, {**row, "id": 2, "created_at": date(2024, 1, 1), "content_hash": "x"}
+    )
+
+
+def test_hash_changes_with_content():
+    row = {"id": 1, "listingMapId": 100, "channelId": 2000, "guestName": "Jane"}
+
+    assert content_hash.compute(TABLE, row) != content_hash.compute(
+        TABLE, {**row, "guestName": "John"}
+    )
+    assert content_hash.compute(TABLE, row) != content_hash.compute(
+        TABLE, {**row, "guestName": None}
+    )
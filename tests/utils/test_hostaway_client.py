@@ -1,4 +1,5 @@
 import pytest
+import requests
 import time
 from unittest.mock import MagicMock
 from utils.hostaway_client import (
@@ -6,84 +7,191 @@ from utils.hostaway_client import (
     get_reservations,
     hostaway_rate_limiter,
 )
+from utils.rate_limiter import RateLimiter
 
 
 @pytest.fixture(autouse=True)
-def reset_rate_limiter():
-    """Fixture to reset the rate limiter before each test."""
-    hostaway_rate_limiter.last_check = 0
-    yield
-    hostaway_rate_limiter.last_check = 0
+def rate_limiter(mocker):
+    """Fixture giving each test a fresh rate limiter, fast enough to observe throttling quickly."""
+    rate_limiter = RateLimiter(
+        rate_limit_per_second=10, capacity=2, lanes=hostaway_rate_limiter.lanes
+    )
+    mocker.patch("utils.hostaway_client.hostaway_rate_limiter", rate_limiter)
+    return rate_limiter
 
 
-def test_get_reservation_rate_limiting(mocker):
+def test_get_reservation_rate_limiting(mocker, rate_limiter):
     """Test that rate limiting is correctly applied when fetching a reservation."""
     mock_headers = mocker.patch("utils.hostaway_client.get_headers")
     mock_headers.return_value = "Bearer test-token"
 
-    mock_get = mocker.patch("utils.hostaway_client.requests.get")
+    mock_get = mocker.patch("utils.hostaway_client.http_transport.get")
     mock_response = MagicMock()
     mock_response.status_code = 200
     mock_response.json.return_value = {"result": {"id": 1, "name": "Test Reservation"}}
     mock_get.return_value = mock_response
 
     mock_validate = mocker.patch(
-        "utils.hostaway_client.validator.validate_hostaway_payload_against_model"
+        "utils.hostaway_client.validator.validate_and_clean_hostaway_payload"
     )
-    mock_validate.return_value = (True, None)
+    mock_validate.return_value = (True, None, {"id": 1})
 
-    # First call should succeed immediately
+    # Calls within the burst capacity should succeed immediately
+    start_time = time.monotonic()
+    get_reservation(1)
     get_reservation(1)
-    assert mock_get.call_count == 1, "First API call should be made immediately"
+    assert mock_get.call_count == 2, "Burst API calls should be made immediately"
+    assert time.monotonic() - start_time < 1 / rate_limiter.rate_limit
 
-    # Second call should be delayed by rate limiter
-    start_time = time.time()
+    # The next call should be delayed by rate limiter
+    start_time = time.monotonic()
     get_reservation(1)
-    end_time = time.time()
-    assert mock_get.call_count == 2, "Second API call should be made after delay"
+    end_time = time.monotonic()
+    assert mock_get.call_count == 3, "Third API call should be made after delay"
 
     # Check that the delay was at least the minimum required by the rate limiter
-    assert end_time - start_time >= (
-        1 / hostaway_rate_limiter.rate_limit
+    assert end_time - start_time >= 0.9 * (
+        1 / rate_limiter.rate_limit
     ), "Rate limiter did not enforce the correct delay"
 
 
-def test_get_reservations_rate_limiting(mocker):
+def test_get_reservations_rate_limiting(mocker, rate_limiter):
     """Test that rate limiting is correctly applied when fetching all reservations."""
     mock_headers = mocker.patch("utils.hostaway_client.get_headers")
     mock_headers.return_value = "Bearer test-token"
 
-    mock_get = mocker.patch("utils.hostaway_client.requests.get")
+    mock_get = mocker.patch("utils.hostaway_client.http_transport.get")
     mock_response = MagicMock()
     mock_response.status_code = 200
     mock_response.json.return_value = {"result": [{"id": i} for i in range(1, 16)]}
     mock_get.return_value = mock_response
 
-    # Call the function to fetch reservations
+    # Call the function to fetch reservations, using up the burst capacity
+    get_reservations(limit=5)
     get_reservations(limit=5)
-    assert mock_get.call_count == 1, "First API call should be made immediately"
+    assert mock_get.call_count == 2, "Burst API calls should be made immediately"
 
     # Make another API call and ensure rate limiting applies
-    start_time = time.time()
+    start_time = time.monotonic()
     get_reservations(limit=5)
-    end_time = time.time()
+    end_time = time.monotonic()
 
     assert (
-        mock_get.call_count == 2
-    ), "Second API call should be made after rate limiter delay"
-    assert end_time - start_time >= (
-        1 / hostaway_rate_limiter.rate_limit
+        mock_get.call_count == 3
+    ), "Third API call should be made after rate limiter delay"
+    assert end_time - start_time >= 0.9 * (
+        1 / rate_limiter.rate_limit
     ), "Rate limiter did not enforce the correct delay"
 
 
-def test_rate_limiter_behavior():
-    """Direct test for rate limiter behavior without making API calls."""
-    # First request should be allowed immediately
-    assert hostaway_rate_limiter.can_proceed() is True
+def test_hostaway_rate_limiter_allows_bursts_within_the_api_limit():
+    """Hostaway allows 15 requests per 10 seconds: a full burst, then nothing until the window moves."""
+    assert hostaway_rate_limiter.capacity == 15
+    assert hostaway_rate_limiter.window_limit == (15, 10)
+
+    rate_limiter = RateLimiter(
+        rate_limit_per_second=hostaway_rate_limiter.rate_limit,
+        capacity=hostaway_rate_limiter.capacity,
+        window_limit=hostaway_rate_limiter.window_limit,
+    )
+    assert all(rate_limiter.can_proceed() for _ in range(15))
+    assert rate_limiter.can_proceed() is False
+
+    # Tokens refill, but the window still holds 15 requests
+    rate_limiter.last_check -= 5
+    assert rate_limiter.can_proceed() is False
+
+
+def page_response(reservation_ids):
+    response = MagicMock()
+    response.json.return_value = {"result": [{"id": i} for i in reservation_ids]}
+    return response
+
+
+def test_iter_reservation_pages_streams_pages_and_retries_failed_page(
+    mocker, rate_limiter
+):
+    """Only the failed page is fetched again, and listing continues from its offset."""
+    import requests
+    from utils import hostaway_client
+
+    mocker.patch("utils.hostaway_client.get_headers", return_value={})
+    mocker.patch("utils.hostaway_client.HOSTAWAY_MAX_RESERVATION_LIST_SIZE", 2)
+    mock_get = mocker.patch(
+        "utils.hostaway_client.http_transport.get",
+        side_effect=[
+            page_response([1, 2]),
+            requests.exceptions.ConnectionError("Connection reset"),
+            page_response([3, 4]),
+            page_response([5]),
+        ],
+    )
+
+    pages = list(
+        hostaway_client.iter_reservation_pages(
+            backoff_factor=0,
+            lane=hostaway_client.BACKGROUND_LANE,
+            listingId=7,
+            order="",
+        )
+    )
+
+    assert pages == [
+        (0, [{"id": 1}, {"id": 2}], 2),
+        (2, [{"id": 3}, {"id": 4}], 4),
+        (4, [{"id": 5}], 5),
+    ]
+    offsets = [call.kwargs["params"]["offset"] for call in mock_get.call_args_list]
+    assert offsets == [0, 2, 2, 4]
+    assert rate_limiter.stats()["lanes"]["background"]["granted"] == 4
+    assert mock_get.call_args_list[0].kwargs["params"] == {
+        "listingId": 7,
+        "limit": 2,
+        "offset": 0,
+    }
+
+
+def test_iter_reservation_pages_raises_resumable_error(mocker):
+    import requests
+    from utils import hostaway_client
+
+    mocker.patch("utils.hostaway_client.get_headers", return_value={})
+    mocker.patch("utils.hostaway_client.HOSTAWAY_MAX_RESERVATION_LIST_SIZE", 2)
+    mocker.patch(
+        "utils.hostaway_client.http_transport.get",
+        side_effect=[page_response([1, 2])]
+        + [requests.exceptions.Timeout("Read timed out")] * 3,
+    )
+
+    pages = hostaway_client.iter_reservation_pages(backoff_factor=0)
+    assert next(pages)[2] == 2
+    with pytest.raises(hostaway_client.ReservationListingError) as error:
+        next(pages)
+
+    assert error.value.offset == 2
+
+
+def test_get_reservation_backs_off_through_rate_limiter_on_429(mocker, rate_limiter):
+    """A 429 pauses the shared rate limiter for its Retry-After instead of a fixed backoff."""
+    mocker.patch("utils.hostaway_client.get_headers", return_value={})
+    mocker.patch(
+        "utils.validator.validate_and_clean_hostaway_payload",
+        return_value=(True, None, {"id": 1}),
+    )
+    rate_limited = MagicMock(status_code=429, headers={"Retry-After": "0.2"})
+    rate_limited.raise_for_status.side_effect = requests.exceptions.HTTPError(
+        response=rate_limited
+    )
+    mocker.patch(
+        "utils.hostaway_client.http_transport.get",
+        side_effect=[rate_limited, MagicMock(status_code=200)],
+    )
+    sleep = mocker.patch("utils.hostaway_client.time.sleep")
 
-    # Second request should be blocked immediately after the first
-    assert hostaway_rate_limiter.can_proceed() is False
+    start_time = time.monotonic()
+    assert get_reservation(1, backoff_factor=10) == {"id": 1}
 
-    # Wait for enough time to pass and check again
-    time.sleep(1 / hostaway_rate_limiter.rate_limit)
-    assert hostaway_rate_limiter.can_proceed() is True
+    assert time.monotonic() - start_time >= 0.2
+    sleep.assert_not_called()
+    assert rate_limiter.stats()["rate_limited"] == 1
+    assert rate_limiter.rate == rate_limiter.rate_limit / 2
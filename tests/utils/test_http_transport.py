@@ -0,0 +1,109 @@
+import threading
+import pytest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils import http_transport
+from utils.http_transport import HttpTransport
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep connections alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.client_ports.add(self.client_address[1])
+        status = 503 if self.path == "/unavailable" else 200
+        body = b'{"result": []}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """Fixture providing a local HTTP server recording the connections it receives."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RecordingHandler)
+    server.client_ports = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server, path="/"):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_requests_reuse_pooled_connections(server):
+    transport = HttpTransport()
+
+    for _ in range(5):
+        assert transport.get(url(server)).json() == {"result": []}
+
+    assert len(server.client_ports) == 1
+    transport.close()
+
+
+def test_default_timeout_is_applied(mocker):
+    transport = HttpTransport(timeout=(1, 2))
+    send = mocker.patch.object(transport.session, "request")
+    send.return_value.status_code = 200
+
+    transport.get("https://api.hostaway.com/v1/reservations")
+    transport.get("https://api.hostaway.com/v1/reservations", timeout=10)
+
+    assert send.call_args_list[0].kwargs["timeout"] == (1, 2)
+    assert send.call_args_list[1].kwargs["timeout"] == 10
+
+
+def test_stats_count_requests_and_errors_per_host(server):
+    transport = HttpTransport(timeout=(0.5, 0.5))
+    host = f"127.0.0.1:{server.server_address[1]}"
+
+    transport.get(url(server))
+    transport.get(url(server, "/unavailable"))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        transport.get("http://127.0.0.1:9/")  # Nothing listens on the discard port
+
+    stats = transport.stats()
+    assert stats[host]["requests"] == 2
+    assert stats[host]["errors"] == 1
+    assert stats[host]["max_latency_ms"] >= stats[host]["average_latency_ms"] > 0
+    assert stats["127.0.0.1:9"]["requests"] == 1
+    assert stats["127.0.0.1:9"]["errors"] == 1
+    transport.close()
+
+
+def test_shared_transport_can_be_replaced(mocker):
+    fake_transport = mocker.Mock()
+    previous = http_transport.set_transport(fake_transport)
+    try:
+        http_transport.post("https://slack.com/api/chat.postMessage", json={})
+    finally:
+        http_transport.set_transport(previous)
+
+    fake_transport.post.assert_called_once_with(
+        "https://slack.com/api/chat.postMessage", json={}
+    )
+    assert http_transport.get_transport() is previous
+
+
+def test_get_retry_after_parses_seconds_and_dates(mocker):
+    response = mocker.Mock(headers={"Retry-After": "30"})
+    assert http_transport.get_retry_after(response) == 30
+
+    response.headers = {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    assert http_transport.get_retry_after(response) == 0  # Already passed
+
+    response.headers = {"Retry-After": "soon"}
+    assert http_transport.get_retry_after(response, default=5) == 5
+
+    response.headers = {}
+    assert http_transport.get_retry_after(response) is None
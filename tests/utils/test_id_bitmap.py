@@ -0,0 +1,48 @@
+import pytest
+
+from utils.id_bitmap import IdBitmap
+
+
+def test_add_and_contains():
+    bitmap = IdBitmap()
+    bitmap.add(0)
+    bitmap.add(12345678)
+
+    assert 0 in bitmap
+    assert 12345678 in bitmap
+    assert 12345677 not in bitmap
+    assert 99999999 not in bitmap
+    assert len(bitmap) == 2
+
+
+def test_update_counts_distinct_ids():
+    bitmap = IdBitmap()
+    bitmap.update([1, 2, 2, 3, 1])
+
+    assert len(bitmap) == 3
+
+
+def test_memory_grows_with_id_ranges_in_use():
+    bitmap = IdBitmap()
+    bitmap.update(range(40000000, 41000000))
+
+    assert len(bitmap) == 1000000
+    assert bitmap.memory_usage() <= 128 * 1024
+
+
+def test_invalid_ids():
+    bitmap = IdBitmap()
+
+    assert "1" not in bitmap
+    assert -1 not in bitmap
+    with pytest.raises(ValueError):
+        bitmap.add(-1)
+
+
+def test_clear():
+    bitmap = IdBitmap()
+    bitmap.add(1)
+    bitmap.clear()
+
+    assert 1 not in bitmap
+    assert len(bitmap) == 0
@@ -0,0 +1,119 @@
+import logging
+import time
+from datetime import datetime
+
+from utils import log_index, logger
+
+
+def make_record(message, level=logging.INFO, name="general", created=None, **fields):
+    record = logging.LogRecord(name, level, __file__, 0, message, None, None)
+    record.fields = fields
+    if created is not None:
+        record.created = created
+    return record
+
+
+def write_records(path, records):
+    handler = log_index.IndexHandler(str(path))
+    handler.setFormatter(logger.JsonFormatter())
+    for record in records:
+        handler.handle(record)
+    handler.close()
+
+
+def get_messages(events):
+    return [record.split('"message": "')[1].split('"')[0] for event, record in events]
+
+
+def test_search_by_field_level_and_text(tmp_path):
+    path = tmp_path / "index.db"
+    write_records(
+        path,
+        [
+            make_record("Reservation 1 created", reservation_id=1),
+            make_record("Reservation 2 created", reservation_id=2),
+            make_record(
+                "Reservation 1 out of sync",
+                logging.WARNING,
+                "hostaway",
+                reservation_id=1,
+            ),
+            make_record("Message received", reservation_id=1, conversation_id=7),
+        ],
+    )
+
+    assert get_messages(log_index.search(str(path), fields={"reservation_id": 1})) == [
+        "Message received",
+        "Reservation 1 out of sync",
+        "Reservation 1 created",
+    ]
+    assert get_messages(
+        log_index.search(
+            str(path), fields={"reservation_id": "1", "conversation_id": "7"}
+        )
+    ) == ["Message received"]
+    assert get_messages(log_index.search(str(path), level=logging.WARNING)) == [
+        "Reservation 1 out of sync"
+    ]
+    assert get_messages(log_index.search(str(path), logger="hostaway")) == [
+        "Reservation 1 out of sync"
+    ]
+    # Query syntax is searched as text rather than failing the query
+    assert get_messages(log_index.search(str(path), text='of "sync AND')) == []
+    assert get_messages(log_index.search(str(path), text="created")) == [
+        "Reservation 2 created",
+        "Reservation 1 created",
+    ]
+    assert log_index.search(str(tmp_path / "missing.db")) == []
+
+
+def test_search_time_range_and_paging(tmp_path):
+    path = tmp_path / "index.db"
+    start = datetime(2026, 10, 18).timestamp()
+    write_records(
+        path,
+        [
+            make_record(f"Event {hour}", created=start + hour * 3600)
+            for hour in range(24)
+        ],
+    )
+
+    events = log_index.search(
+        str(path),
+        since=datetime(2026, 10, 18, 10),
+        until=datetime(2026, 10, 18, 13),
+        limit=3,
+    )
+    assert get_messages(events) == ["Event 13", "Event 12", "Event 11"]
+    events = log_index.search(
+        str(path), since=datetime(2026, 10, 18, 10), before=events[-1][0]
+    )
+    assert get_messages(events) == ["Event 10"]
+
+
+def test_purge_deletes_expired_events(tmp_path):
+    path = tmp_path / "index.db"
+    write_records(
+        path,
+        [
+            make_record(
+                "Expired", created=time.time() - 2 * log_index.RETENTION_SECONDS
+            ),
+            make_record("Recent", reservation_id=1),
+        ],
+    )
+
+    assert get_messages(log_index.search(str(path))) == ["Recent"]
+    assert get_messages(log_index.search(str(path), text="expired")) == []
+
+
+def test_logging_writes_to_the_index(tmp_path, mocker):
+    mocker.patch("utils.logger.LOG_DIRECTORY", str(tmp_path))
+    logger.setup_logging()
+    logger.log_warning("Reservation 5 is out of sync", reservation_id=5)
+    logger.stop_logging()
+
+    [(event, record)] = log_index.search(
+        logger.get_index_path(), fields={"reservation_id": 5}
+    )
+    assert record == (tmp_path / "general.log").read_text().strip()
@@ -0,0 +1,89 @@
+import gzip
+import pytest
+from datetime import datetime
+
+from utils import log_reader
+
+
+@pytest.fixture
+def log_directory(tmp_path, mocker):
+    """Fixture providing a log directory with a log rotated twice: general.log.2, general.log.1, general.log."""
+    mocker.patch("utils.logger.LOG_DIRECTORY", str(tmp_path))
+    (tmp_path / "general.log.2").write_bytes(
+        b"2026-10-18 08:00:00,000 - INFO - one\n"
+        b"2026-10-18 08:30:00,000 - ERROR - two\nTraceback line\n"
+    )
+    (tmp_path / "general.log.1").write_bytes(
+        b"2026-10-18 09:00:00,000 - INFO - three\n"
+    )
+    (tmp_path / "general.log").write_bytes(b"2026-10-18 10:00:00,000 - INFO - four\n")
+    return tmp_path
+
+
+def content(log_directory):
+    return b"".join(
+        (log_directory / name).read_bytes()
+        for name in ("general.log.2", "general.log.1", "general.log")
+    )
+
+
+def test_segments_read_as_one_stream_oldest_first(log_directory):
+    with log_reader.open_log("general") as segments:
+        assert segments.size == len(content(log_directory))
+        assert b"".join(segments.iter_bytes(chunk_size=7)) == content(log_directory)
+        assert b"".join(segments.iter_bytes(30, 100)) == content(log_directory)[30:100]
+
+
+def test_tail_offset_spans_segments_without_reading_everything(log_directory):
+    with log_reader.open_log("general") as segments:
+        offset = segments.get_tail_offset(3, chunk_size=16)
+        assert b"".join(segments.iter_bytes(offset)) == (
+            b"Traceback line\n"
+            b"2026-10-18 09:00:00,000 - INFO - three\n"
+            b"2026-10-18 10:00:00,000 - INFO - four\n"
+        )
+        assert segments.get_tail_offset(100) == 0
+        assert segments.get_tail_offset(0) == segments.size
+
+
+def test_filter_lines_keeps_continuation_lines(log_directory):
+    with log_reader.open_log("general") as segments:
+        lines = list(
+            log_reader.filter_lines(
+                segments.iter_lines(),
+                since=datetime(2026, 10, 18, 8, 15),
+                until=datetime(2026, 10, 18, 9, 0),
+            )
+        )
+
+    assert lines == [
+        b"2026-10-18 08:30:00,000 - ERROR - two\n",
+        b"Traceback line\n",
+        b"2026-10-18 09:00:00,000 - INFO - three\n",
+    ]
+
+
+def test_rotation_while_reading_does_not_shift_content(log_directory):
+    expected = content(log_directory)
+    with log_reader.open_log("general") as segments:
+        # Rotate: every segment moves up, a new current file starts
+        (log_directory / "general.log.2").unlink()
+        (log_directory / "general.log.1").rename(log_directory / "general.log.2")
+        (log_directory / "general.log").rename(log_directory / "general.log.1")
+        (log_directory / "general.log").write_bytes(b"new\n")
+
+        assert b"".join(segments.iter_bytes()) == expected
+
+
+def test_compressed_segment_wins_over_an_uncompressed_one(log_directory):
+    """An uncompressed backup left by a rotation without compression doesn't shadow newer content."""
+    newer = b"2026-10-18 09:30:00,000 - INFO - compressed\n"
+    with gzip.open(log_directory / "general.log.1.gz", "wb") as segment:
+        segment.write(newer)
+
+    with log_reader.open_log("general") as segments:
+        assert b"".join(segments.iter_bytes()) == (
+            (log_directory / "general.log.2").read_bytes()
+            + newer
+            + (log_directory / "general.log").read_bytes()
+        )
@@ -0,0 +1,85 @@
+import gzip
+import json
+import logging
+import pytest
+
+from utils import logger, log_reader
+
+
+@pytest.fixture
+def log_directory(tmp_path, mocker):
+    """Fixture setting up logging into a temporary directory, with tiny log files."""
+    mocker.patch("utils.logger.LOG_DIRECTORY", str(tmp_path))
+    mocker.patch("utils.logger.LOG_MAX_BYTES", 100000)
+    mocker.patch("utils.logger.LOG_BACKUP_COUNT", 5)
+    yield tmp_path
+    logger.stop_logging()
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_warning_is_one_record_in_its_log_and_the_warnings_log(log_directory):
+    logger.setup_logging()
+    logger.log_warning("Reservation 5 is out of sync", reservation_id=5)
+    logger.log_warning("Rate limit hit", logger="slack", bypass_standard=True)
+    logger.log_error("Failed to send message", logger="slack")
+    logger.stop_logging()
+
+    [general] = read_records(log_directory / "general.log")
+    [warning] = read_records(log_directory / "warnings.log")
+    [error] = read_records(log_directory / "errors.log")
+    assert general == warning
+    assert general["level"] == "WARNING"
+    assert general["message"] == "Reservation 5 is out of sync"
+    assert general["reservation_id"] == 5
+    assert general["event_id"]
+    assert error["logger"] == "slack"
+    assert error["event_id"] != general["event_id"]
+    assert len(read_records(log_directory / "slack.log")) == 2
+
+
+def test_setup_leaves_other_loggers_records_untouched(log_directory, caplog):
+    """Only the application's records skip the caller lookup: third-party records keep theirs."""
+    logger.setup_logging()
+    logging.getLogger("werkzeug").warning("Request failed")
+    logger.stop_logging()
+
+    [record] = caplog.records
+    assert record.funcName == "test_setup_leaves_other_loggers_records_untouched"
+    assert record.threadName and record.process
+
+
+def test_timed_logs_duration(log_directory):
+    logger.setup_logging()
+    with logger.timed("Synced page", logger="hostaway_data_sync", reservations=500):
+        pass
+    logger.stop_logging()
+
+    [record] = read_records(log_directory / "hostaway_data_sync.log")
+    assert record["message"] == "Synced page"
+    assert record["reservations"] == 500
+    assert record["duration_ms"] >= 0
+    assert log_reader.get_timestamp(
+        (log_directory / "hostaway_data_sync.log").read_bytes()
+    )
+
+
+def test_rotated_segments_are_compressed(log_directory):
+    logger.setup_logging(max_bytes=1000, backup_count=3)
+    for index in range(40):
+        logger.log_inform(f"Event {index}")
+    logger.stop_logging()
+
+    assert (log_directory / "general.log.1.gz").exists()
+    assert not (log_directory / "general.log.1").exists()
+    with gzip.open(log_directory / "general.log.1.gz", "rt") as segment:
+        assert json.loads(segment.readline())["message"].startswith("Event")
+
+    # The log reader streams through the compressed segments
+    with log_reader.open_log("general") as segments:
+        lines = list(segments.iter_lines())
+        assert json.loads(lines[-1])["message"] == "Event 39"
+        tail = b"".join(segments.iter_bytes(segments.get_tail_offset(len(lines))))
+        assert tail == b"".join(lines)
@@ -0,0 +1,88 @@
+import threading
+from queue import Queue
+
+import pytest
+
+import models
+from db import db_session
+from utils import memory
+
+
+@pytest.fixture
+def tracing():
+    """Fixture tracing allocations for the test, and stopping once it's done."""
+    memory.start_tracing()
+    yield
+    memory.stop_tracing()
+
+
+def allocate(count):
+    return [f"reservation {index}" * 10 for index in range(count)]
+
+
+def test_snapshot_diff(tracing):
+    first = memory.take_snapshot()
+    retained = allocate(10000)
+    second = memory.take_snapshot()
+
+    assert [snapshot["id"] for snapshot in memory.get_snapshots()] == [
+        first["id"],
+        second["id"],
+    ]
+    memory_diff = memory.diff(first["id"], second["id"], limit=5)
+    assert memory_diff["size_diff_bytes"] > 1000000
+    top = memory_diff["allocators"][0]
+    assert top["location"].endswith(
+        f"test_memory.py:{allocate.__code__.co_firstlineno + 1}"
+    )
+    assert top["count_diff"] >= 10000
+
+    allocators = memory.get_top_allocators(limit=3, group_by="traceback")
+    assert any("test_memory.py" in allocator["location"] for allocator in allocators)
+    assert "traceback" in allocators[0]
+    assert memory.diff(first["id"], 1000) is None
+    del retained
+
+
+def test_snapshots_are_capped(tracing):
+    for _ in range(memory.MAX_SNAPSHOTS + 2):
+        memory.take_snapshot()
+
+    assert len(memory.get_snapshots()) == memory.MAX_SNAPSHOTS
+
+
+def test_snapshot_requires_tracing():
+    memory.stop_tracing()
+    with pytest.raises(memory.TracingNotStartedError):
+        memory.take_snapshot()
+    assert memory.get_tracing_stats() == {"tracing": False}
+
+
+def test_session_stats(database_app):
+    for reservation_id in (1, 2, 3):
+        db_session.add(
+            models.Reservation(id=reservation_id, listingMapId=100, channelId=2000)
+        )
+    db_session.commit()
+    # The identity map holds its objects weakly, as long as they're used
+    reservations = db_session.query(models.Reservation).all()
+
+    [stats] = [
+        stats
+        for stats in memory.get_session_stats()
+        if stats["thread"] == threading.current_thread().name
+    ]
+    assert stats["identity_map"] == 3
+    assert stats["classes"] == {"Reservation": 3}
+    del reservations
+
+
+def test_queue_footprints():
+    queue = Queue()
+    memory.register_queue("test", lambda: [queue, Queue()])
+    for index in range(10):
+        queue.put({"object": "reservation", "data": {"id": index}})
+
+    footprint = memory.get_queue_footprints()["test"]
+    assert footprint["items"] == 10
+    assert 10 * 200 < footprint["bytes"] < 10 * 2000
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from utils import metrics
+
+
+@pytest.fixture
+def registry():
+    return metrics.Registry()
+
+
+def test_counter_adds_up_threads(registry):
+    counter = registry.register(
+        metrics.Counter("events_total", "Events.", labels=("kind",))
+    )
+
+    def count():
+        for _ in range(1000):
+            counter.inc("a")
+        counter.inc("b", amount=5)
+
+    threads = [threading.Thread(target=count) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert registry.render() == (
+        "# HELP events_total Events.\n"
+        "# TYPE events_total counter\n"
+        'events_total{kind="a"} 4000\n'
+        'events_total{kind="b"} 20\n'
+    )
+
+
+def test_shards_of_finished_threads_are_retired(registry):
+    counter = registry.register(metrics.Counter("events_total", "Events."))
+    histogram = registry.register(
+        metrics.Histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+    )
+
+    def observe():
+        counter.inc()
+        histogram.observe(0.5)
+
+    for _ in range(500):
+        thread = threading.Thread(target=observe)
+        thread.start()
+        thread.join()
+
+    # Retired as new threads start, even without a collection
+    assert len(counter._shards) <= 1
+    assert len(histogram._shards) <= 1
+    assert counter.collect() == [("", {}, 500)]
+    assert histogram.collect()[-1] == ("_count", {}, 500)
+    assert counter._shards == [] and histogram._shards == []
+
+    observe()  # The counters stay monotonic once retired threads are merged
+    assert counter.collect() == [("", {}, 501)]
+
+
+def test_histogram_buckets(registry):
+    histogram = registry.register(
+        metrics.Histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+    )
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_gauges_and_callbacks(registry):
+    gauge = registry.register(metrics.Gauge("depth", "Depth.", labels=("queue",)))
+    gauge.set(3, 'say "hi"')
+    gauge.dec('say "hi"')
+    registry.register(metrics.Gauge("lag_seconds", "Lag.", callback=lambda: 1.5))
+    registry.register(metrics.Gauge("broken", "Broken.", callback=lambda: 1 / 0))
+
+    assert registry.render().splitlines() == [
+        "# HELP depth Depth.",
+        "# TYPE depth gauge",
+        'depth{queue="say \\"hi\\""} 2',
+        "# HELP lag_seconds Lag.",
+        "# TYPE lag_seconds gauge",
+        "lag_seconds 1.5",
+    ]
+    with pytest.raises(ValueError):
+        registry.register(metrics.Gauge("depth", "Depth."))
+    with pytest.raises(ValueError):
+        gauge.set(1)
@@ -0,0 +1,144 @@
+import time
+import threading
+import pytest
+from queue import Empty
+from sqlalchemy import create_engine
+
+import models
+from utils.persistent_queue import PersistentQueue
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Fixture providing a SQLite engine with the job_queue table."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    models.QueuedJob.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def job_queue(engine):
+    job_queue = PersistentQueue("test", visibility_timeout=60, poll_interval=0.05)
+    job_queue.bind(engine)
+    return job_queue
+
+
+def test_put_and_get_preserve_order(job_queue):
+    """Payloads are delivered in the order they were enqueued."""
+    for i in range(3):
+        job_queue.put({"id": i})
+
+    received = []
+    for _ in range(3):
+        received.append(job_queue.get()["id"])
+        job_queue.task_done()
+
+    assert received == [0, 1, 2]
+    assert job_queue.qsize() == 0
+
+
+def test_claimed_entries_carry_their_trace_id(job_queue):
+    job_queue.put({"id": 1}, trace_id="3f2a9c")
+    job_queue.put({"id": 2})
+
+    [traced, untraced] = job_queue.get_batch(2)
+    assert traced.trace_id == "3f2a9c"
+    assert untraced.trace_id is None
+
+
+def test_payloads_survive_a_new_queue_instance(engine, job_queue):
+    """Pending payloads are still available after a restart."""
+    job_queue.put({"id": 1})
+
+    restarted_queue = PersistentQueue("test")
+    restarted_queue.bind(engine)
+
+    assert restarted_queue.get(block=False) == {"id": 1}
+
+
+def test_unacknowledged_payload_is_redelivered_after_visibility_timeout(engine):
+    job_queue = PersistentQueue("test", visibility_timeout=0.2, poll_interval=0.05)
+    job_queue.bind(engine)
+    job_queue.put({"id": 1})
+
+    assert job_queue.get(block=False) == {"id": 1}
+    with pytest.raises(Empty):
+        job_queue.get(block=False)
+
+    time.sleep(0.3)
+    assert job_queue.get(block=False) == {"id": 1}
+
+
+def test_extended_lease_delays_redelivery(engine):
+    job_queue = PersistentQueue("test", visibility_timeout=0.2, poll_interval=0.05)
+    job_queue.bind(engine)
+    job_queue.put({"id": 1})
+
+    [item] = job_queue.get_batch(1, block=False)
+    time.sleep(0.15)
+    job_queue.extend_lease([item.id])
+    time.sleep(0.15)
+    with pytest.raises(Empty):
+        job_queue.get_batch(1, block=False)
+
+    time.sleep(0.1)
+    [redelivered] = job_queue.get_batch(1, block=False)
+    assert redelivered.attempts == 2
+
+
+def test_dead_entries_are_not_redelivered(engine):
+    job_queue = PersistentQueue("test", visibility_timeout=0, max_attempts=2)
+    job_queue.bind(engine)
+    job_queue.put({"id": 1})
+
+    job_queue.get(block=False)
+    job_queue.get(block=False)
+    with pytest.raises(Empty):
+        job_queue.get(block=False)
+
+    assert job_queue.stats()["dead"] == 1
+
+
+def test_get_batch_and_ack(job_queue):
+    for i in range(5):
+        job_queue.put({"id": i})
+
+    batch = job_queue.get_batch(3)
+    assert [item.payload["id"] for item in batch] == [0, 1, 2]
+    assert job_queue.stats()["in_flight"] == 3
+
+    job_queue.ack([item.id for item in batch])
+    stats = job_queue.stats()
+    assert stats["in_flight"] == 0
+    assert stats["ready"] == 2
+
+
+def test_stats_report_lag(job_queue):
+    job_queue.put({"id": 1})
+    time.sleep(0.1)
+
+    assert job_queue.stats()["lag_seconds"] >= 0.1
+
+
+def test_none_is_delivered_as_sentinel(job_queue):
+    """A None put is handed to a blocked consumer without being persisted."""
+    received = []
+    consumer = threading.Thread(target=lambda: received.append(job_queue.get()))
+    consumer.start()
+
+    job_queue.put(None)
+    consumer.join(timeout=2)
+
+    assert received == [None]
+    assert job_queue.qsize() == 0
+
+
+def test_get_times_out_when_empty(job_queue):
+    with pytest.raises(Empty):
+        job_queue.get(timeout=0.1)
+
+
+def test_unbound_queue_raises():
+    with pytest.raises(RuntimeError):
+        PersistentQueue("unbound").put({"id": 1})
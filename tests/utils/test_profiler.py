@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from utils import profiler
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+
+def test_sample_stacks():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_loop, args=(stop,), name="busy worker")
+    thread.start()
+    try:
+        stacks, samples, _ = profiler.sample_stacks(0.2, 0.005, thread_filter="busy")
+    finally:
+        stop.set()
+        thread.join()
+
+    assert samples > 10
+    assert stacks
+    for stack in stacks:
+        frames = stack.split(";")
+        assert frames[0] == "busy worker"
+        assert any(frame.startswith("busy_loop (") for frame in frames)
+    assert sum(stacks.values()) <= samples
+
+    text = profiler.format_collapsed(stacks)
+    assert text.splitlines()[0].rsplit(" ", 1)[1] == str(stacks.most_common(1)[0][1])
+
+
+def test_sample_stacks_busy():
+    started = threading.Event()
+    thread = threading.Thread(
+        target=lambda: (started.set(), profiler.sample_stacks(0.3))
+    )
+    thread.start()
+    started.wait()
+    try:
+        with pytest.raises(profiler.ProfilerBusyError):
+            for _ in range(50):
+                profiler.sample_stacks(0.01)
+    finally:
+        thread.join()
+
+
+def handle(count):
+    return sorted(range(count), reverse=True)
+
+
+def test_profile_event():
+    profiler.arm_event_profile("task.created", 2)
+    for _ in range(3):
+        with profiler.profile_event("task.created"):
+            handle(1000)
+        with profiler.profile_event("task.updated"):
+            pass
+
+    event_profile = profiler.get_event_profile("task.created", sort="tottime")
+    assert event_profile["profiled"] == 2
+    assert event_profile["remaining"] == 0
+    assert "handle" in event_profile["stats"]
+    assert profiler.get_event_profile("task.updated") is None
+
+    assert profiler.disarm_event_profile("task.created")
+    assert not profiler.disarm_event_profile("task.created")
+    assert profiler.get_event_profile("task.created") is None
+
+
+def test_profile_event_error():
+    profiler.arm_event_profile("task.created", 1)
+    with pytest.raises(ValueError):
+        with profiler.profile_event("task.created"):
+            raise ValueError("failed")
+
+    assert profiler.get_event_profile("task.created")["profiled"] == 1
+    profiler.disarm_event_profile("task.created")
@@ -1,7 +1,8 @@
 import time
+import threading
 import pytest
 
-from utils.rate_limiter import RateLimiter
+from utils.rate_limiter import RateLimiter, Lane
 
 
 def test_rate_limiter_allows_initial_requests():
@@ -53,3 +54,183 @@ def test_rate_limiter_wait_until_can_proceed():
     assert (
         rate_limiter.can_proceed() is True
     ), "Rate limiter should allow proceeding after waiting."
+
+
+def test_rate_limiter_allows_bursts_up_to_capacity():
+    rate_limiter = RateLimiter(rate_limit_per_second=1, capacity=3)
+    assert [rate_limiter.can_proceed() for _ in range(4)] == [True, True, True, False]
+
+
+def test_rate_limiter_window_limit_caps_requests_per_window():
+    rate_limiter = RateLimiter(
+        rate_limit_per_second=10, capacity=3, window_limit=(3, 1)
+    )
+    assert all(rate_limiter.can_proceed() for _ in range(3))
+
+    start_time = time.monotonic()
+    rate_limiter.wait_until_can_proceed()
+    # The bucket refills in 0.1 seconds, but the window only frees up after a second
+    assert time.monotonic() - start_time >= 0.95
+
+
+def test_rate_limiter_waits_exactly_until_refill():
+    rate_limiter = RateLimiter(rate_limit_per_second=20)
+    assert rate_limiter.can_proceed() is True
+
+    start_time = time.monotonic()
+    rate_limiter.wait_until_can_proceed()
+    waited = time.monotonic() - start_time
+
+    # One token takes 50 ms to refill, no coarse polling on top
+    assert 0.045 <= waited < 0.09
+
+
+def test_rate_limiter_serves_waiting_threads_in_order():
+    rate_limiter = RateLimiter(rate_limit_per_second=20)
+    assert rate_limiter.can_proceed() is True
+    served = []
+
+    def wait(index):
+        rate_limiter.wait_until_can_proceed()
+        served.append(index)
+
+    threads = []
+    for index in range(5):
+        thread = threading.Thread(target=wait, args=(index,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.005)  # Queue the threads in a known order
+    for thread in threads:
+        thread.join(5)
+
+    assert served == [0, 1, 2, 3, 4]
+
+
+def test_rate_limiter_wait_times_out():
+    rate_limiter = RateLimiter(rate_limit_per_second=1)
+    assert rate_limiter.can_proceed() is True
+    assert rate_limiter.wait_until_can_proceed(timeout=0.05) is False
+    assert rate_limiter.stats()["waiting"] == 0
+
+
+def test_rate_limiter_stats():
+    rate_limiter = RateLimiter(rate_limit_per_second=20, capacity=2)
+    rate_limiter.can_proceed()
+    rate_limiter.can_proceed()
+    rate_limiter.wait_until_can_proceed()
+
+    stats = rate_limiter.stats()
+    assert stats["granted"] == 3
+    assert stats["waits"] == 1
+    assert stats["max_wait_ms"] >= stats["average_wait_ms"] >= 40
+
+
+def serve_in_threads(rate_limiter, lanes):
+    """Queues a waiting thread per lane, in order, and returns the lanes in the order they were served."""
+    served = []
+
+    def wait(lane):
+        rate_limiter.wait_until_can_proceed(lane=lane)
+        served.append(lane)
+
+    threads = []
+    for lane in lanes:
+        thread = threading.Thread(target=wait, args=(lane,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.005)  # Queue the threads in a known order
+    for thread in threads:
+        thread.join(5)
+    return served
+
+
+def test_rate_limiter_serves_higher_priority_lane_first():
+    rate_limiter = RateLimiter(
+        rate_limit_per_second=20,
+        lanes=(Lane("interactive", 0.0), Lane("background", 0.0)),
+    )
+    assert rate_limiter.can_proceed(lane="background") is True
+
+    served = serve_in_threads(rate_limiter, ["background", "background", "interactive"])
+
+    # The interactive thread arrived last but gets the next token
+    assert served == ["interactive", "background", "background"]
+
+
+def test_rate_limiter_guarantees_lane_minimum_share():
+    rate_limiter = RateLimiter(
+        rate_limit_per_second=20,
+        capacity=4,
+        lanes=(Lane("interactive", 0.0), Lane("background", 0.2)),
+    )
+    # Interactive calls used the whole recent budget
+    assert all(rate_limiter.can_proceed(lane="interactive") for _ in range(4))
+
+    served = serve_in_threads(rate_limiter, ["interactive", "background"])
+
+    assert served == ["background", "interactive"]
+
+
+def test_rate_limiter_reports_lane_stats():
+    rate_limiter = RateLimiter(
+        rate_limit_per_second=20,
+        lanes=(Lane("interactive", 0.5), Lane("background", 0.2)),
+    )
+    rate_limiter.can_proceed()
+    rate_limiter.wait_until_can_proceed(lane="background")
+
+    stats = rate_limiter.stats()
+    assert stats["granted"] == 2
+    assert stats["lanes"]["interactive"]["granted"] == 1
+    assert stats["lanes"]["interactive"]["waits"] == 0
+    assert stats["lanes"]["background"]["waits"] == 1
+    assert stats["lanes"]["background"]["average_wait_ms"] >= 40
+    assert stats["lanes"]["background"]["min_share"] == 0.2
+
+
+def test_rate_limiter_rejects_unknown_lane():
+    rate_limiter = RateLimiter(rate_limit_per_second=1)
+    with pytest.raises(ValueError):
+        rate_limiter.can_proceed(lane="background")
+
+
+def test_rate_limiter_pauses_and_slows_down_when_rate_limited():
+    rate_limiter = RateLimiter(rate_limit_per_second=20, capacity=5)
+    rate_limiter.on_rate_limited(retry_after=0.1)
+    rate_limiter.on_rate_limited(retry_after=0.1)  # Same pause, no further slowdown
+
+    assert rate_limiter.can_proceed() is False
+    start_time = time.monotonic()
+    rate_limiter.wait_until_can_proceed()
+
+    # The pause, then a token at the lowered rate (no burst from the emptied bucket)
+    assert time.monotonic() - start_time >= 0.1 + 1 / 10 * 0.9
+    stats = rate_limiter.stats()
+    assert stats["rate"] == 10
+    assert stats["rate_limited"] == 2
+
+
+def test_rate_limiter_never_slows_down_below_minimum_rate():
+    rate_limiter = RateLimiter(rate_limit_per_second=10)
+    for _ in range(10):
+        rate_limiter.on_rate_limited()
+
+    assert rate_limiter.rate == rate_limiter.min_rate == 1
+
+
+def test_rate_limiter_probes_back_up_to_configured_rate(mocker):
+    rate_limiter = RateLimiter(rate_limit_per_second=10)
+    rate_limiter.on_rate_limited()
+    assert rate_limiter.rate == 5
+
+    # No probing right after being rate limited
+    rate_limiter.on_success()
+    assert rate_limiter.rate == 5
+
+    mocker.patch("utils.rate_limiter.PROBE_COOLDOWN_SECONDS", 0)
+    rate_limiter.on_success()
+    assert rate_limiter.rate == pytest.approx(5.2)
+
+    for _ in range(100):
+        rate_limiter.on_success()
+    assert rate_limiter.rate == 10
@@ -0,0 +1,94 @@
+import time
+from threading import Event
+
+from utils import slack_outbox
+from utils.slack_outbox import SlackOutbox
+
+
+def test_messages_within_window_are_coalesced_per_channel(mocker):
+    send = mocker.Mock()
+    outbox = SlackOutbox(send=send, coalesce_window=0.1)
+
+    outbox.post("Reservation 1 created")
+    outbox.post("Speak reply", channel_id="C123")
+    outbox.post("Error issued, see 'Errors' log for details\n")
+    outbox.post("Error issued, see 'Errors' log for details\n")
+    outbox.post("Reservation 2 created")
+    assert outbox.flush(timeout=5)
+
+    assert send.call_args_list == [
+        mocker.call(
+            "Reservation 1 created\n"
+            "Error issued, see 'Errors' log for details (x2)\n"
+            "Reservation 2 created",
+            channel_id=None,
+        ),
+        mocker.call("Speak reply", channel_id="C123"),
+    ]
+    assert outbox.stats() == {
+        "queued": 5,
+        "dropped": 0,
+        "sent_posts": 2,
+        "failed_posts": 0,
+        "backlog": 0,
+    }
+
+
+def test_post_does_not_block_on_slow_sends():
+    release = Event()
+    outbox = SlackOutbox(
+        send=lambda text, channel_id: release.wait(5), coalesce_window=0
+    )
+
+    start_time = time.monotonic()
+    for index in range(50):
+        assert outbox.post(f"Message {index}")
+    assert time.monotonic() - start_time < 0.5
+
+    release.set()
+    assert outbox.flush(timeout=5)
+
+
+def test_post_drops_messages_when_backlog_is_full(mocker):
+    release = Event()
+    outbox = SlackOutbox(
+        send=lambda text, channel_id: release.wait(5),
+        coalesce_window=0,
+        max_queued_messages=2,
+    )
+    mock_log_warning = mocker.patch("utils.logger.log_warning")
+
+    outbox.post("First")  # Picked up by the sender, which then blocks
+    time.sleep(0.05)
+    assert outbox.post("Second")
+    assert outbox.post("Third")
+    assert not outbox.post("Fourth")
+
+    mock_log_warning.assert_called_once()
+    release.set()
+    assert outbox.flush(timeout=5)
+    assert outbox.stats()["dropped"] == 1
+
+
+def test_send_failures_do_not_stop_the_sender(mocker):
+    send = mocker.Mock(side_effect=[RuntimeError("Slack down"), None])
+    mocker.patch("utils.logger.log_error")
+    outbox = SlackOutbox(send=send, coalesce_window=0)
+
+    outbox.post("First")
+    assert outbox.flush(timeout=5)
+    outbox.post("Second")
+    assert outbox.flush(timeout=5)
+
+    assert send.call_count == 2
+    assert outbox.stats()["failed_posts"] == 1
+
+
+def test_get_posts_splits_long_batches(mocker):
+    mocker.patch("utils.slack_outbox.MAX_MESSAGE_LENGTH", 10)
+
+    posts = slack_outbox.get_posts(
+        [(None, "12345"), (None, "6789"), (None, "abcdefghijklmno")]
+    )
+
+    assert posts == [(None, "12345\n6789"), (None, "abcdefghij")]
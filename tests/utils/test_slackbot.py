@@ -1,4 +1,5 @@
 import os
+import time
 import pytest
 from unittest.mock import MagicMock
 from utils import slackbot
@@ -20,7 +21,7 @@ def setup_env_vars():
 
 def test_message_channel_successful_send(mocker):
     """Test successful message sending to Slack channel."""
-    mock_post = mocker.patch("requests.post")
+    mock_post = mocker.patch("utils.slackbot.http_transport.post")
     mock_response = MagicMock()
     mock_response.status_code = 200
     mock_response.json.return_value = {"ok": True}
@@ -66,7 +67,7 @@ def test_message_channel_missing_channel_id(mocker):
 
 def test_message_channel_rate_limit_handling(mocker):
     """Test handling of Slack rate limit (HTTP 429)."""
-    mock_post = mocker.patch("requests.post")
+    mock_post = mocker.patch("utils.slackbot.http_transport.post")
     mock_response = MagicMock()
     mock_response.status_code = 429
     mock_response.headers = {"Retry-After": "1"}
@@ -74,10 +75,16 @@ def test_message_channel_rate_limit_handling(mocker):
 
     mock_log_warning = mocker.patch("utils.logger.log_warning")
     mock_log_error = mocker.patch("utils.logger.log_error")
+    mock_rate_limiter = mocker.patch.object(slackbot, "slack_rate_limiter")
 
     # Call the function and check behavior
     slackbot.message_channel("Hello, Slack!")
 
+    # Every rate-limited response pauses the shared rate limiter for its Retry-After
+    assert mock_post.call_count == 4
+    assert mock_rate_limiter.wait_until_can_proceed.call_count == 4
+    mock_rate_limiter.on_rate_limited.assert_called_with(1.0)
+
     # Assert warnings and retries
     assert mock_log_warning.call_count == 3  # 3 retries
     mock_log_warning.assert_called_with(
@@ -99,7 +106,7 @@ def test_message_channel_rate_limiter(mocker):
         slackbot.slack_rate_limiter, "wait_until_can_proceed"
     )
 
-    mock_post = mocker.patch("requests.post")
+    mock_post = mocker.patch("utils.slackbot.http_transport.post")
     mock_response = MagicMock()
     mock_response.status_code = 200
     mock_response.json.return_value = {"ok": True}
@@ -109,3 +116,27 @@ def test_message_channel_rate_limiter(mocker):
 
     # Ensure rate limiter wait is called before sending message
     mock_wait_until_can_proceed.assert_called_once()
+
+
+def test_message_channel_retries_after_rate_limit(mocker):
+    """A rate-limited message is sent again once the pause is over, without recursing."""
+    rate_limited = MagicMock(status_code=429, headers={"Retry-After": "0.1"})
+    sent = MagicMock(status_code=200)
+    sent.json.return_value = {"ok": True}
+    mock_post = mocker.patch(
+        "utils.slackbot.http_transport.post", side_effect=[rate_limited, sent]
+    )
+    mocker.patch.object(
+        slackbot, "slack_rate_limiter", slackbot.RateLimiter(rate_limit_per_second=100)
+    )
+    mock_log_inform = mocker.patch("utils.logger.log_inform")
+
+    start_time = time.monotonic()
+    slackbot.message_channel("Hello, Slack!")
+
+    assert time.monotonic() - start_time >= 0.1
+    assert mock_post.call_count == 2
+    mock_log_inform.assert_called_once_with(
+        "Message sent to Slack channel test-channel-id", logger="slack"
+    )
+    assert slackbot.slack_rate_limiter.stats()["rate"] == 50
@@ -0,0 +1,76 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+import models
+from db import db_session, commit
+from utils import tracing
+
+
+@pytest.fixture(autouse=True)
+def recent_traces():
+    tracing.clear()
+    yield
+    tracing.clear()
+
+
+def test_breakdown_counts_self_time():
+    with tracing.span("ignored"):
+        pass  # No trace: nothing recorded
+
+    with tracing.trace("t1", "process") as segment:
+        with tracing.span("service"):
+            time.sleep(0.02)
+            with tracing.span("http", host="api.hostaway.com"):
+                time.sleep(0.03)
+
+    assert [span[0] for span in segment.spans] == ["http", "service"]
+    assert segment.breakdown["http"] >= 0.03
+    assert 0.02 <= segment.breakdown["service"] < 0.03
+    assert sum(segment.breakdown.values()) == pytest.approx(segment.duration)
+    assert tracing.get_trace_id() is None
+
+
+def test_segments_of_a_trace_are_grouped():
+    with tracing.trace("slow", "receive"):
+        pass
+    queued_at = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+        milliseconds=50
+    )
+    with pytest.raises(ValueError):
+        with tracing.trace("slow", "process", queued_at=queued_at, reservation_id=5):
+            assert tracing.get_trace_id() == "slow"
+            raise ValueError("Invalid payload")
+    with tracing.trace(None, "process"):
+        pass
+
+    [slowest, fastest] = tracing.get_slowest_traces()
+    assert slowest["trace_id"] == "slow"
+    assert slowest["breakdown_ms"]["queue_wait"] >= 50
+    assert slowest["duration_ms"] >= 50
+    assert "segments" not in slowest
+    assert tracing.get_slowest_traces(min_duration_ms=50) == [slowest]
+
+    trace = tracing.get_trace("slow")
+    assert [segment["segment"] for segment in trace["segments"]] == [
+        "receive",
+        "process",
+    ]
+    assert trace["segments"][1]["error"] == "Invalid payload"
+    assert trace["segments"][1]["reservation_id"] == 5
+    assert tracing.get_trace("missing") is None
+
+
+def test_database_spans(database_app):
+    with tracing.trace("t1", "process") as segment:
+        db_session.add(models.Task(id=1))
+        commit()
+        db_session.execute(select(models.Task)).all()
+
+    names = [(span[0], span[3].get("statement")) for span in segment.spans]
+    assert ("db", "INSERT") in names
+    assert ("db", "SELECT") in names
+    assert ("commit", None) in names
+    assert segment.breakdown["db"] > 0
@@ -0,0 +1,141 @@
+from datetime import date, datetime
+
+from utils import validator
+
+
+def reservation_payload(**overrides):
+    payload = {
+        "id": 1,
+        "listingMapId": 100,
+        "channelId": 2000,
+        "guestName": "Guest",
+        "arrivalDate": "2024-09-01",
+        "departureDate": None,
+        "unknownField": "dropped",
+    }
+    payload.update(overrides)
+    return payload
+
+
+def test_validate_and_clean_converts_and_filters_in_one_pass():
+    isValid, msg, cleaned = validator.validate_and_clean_hostaway_payload(
+        reservation_payload(), "reservation"
+    )
+
+    assert isValid is True
+    assert cleaned == {
+        "id": 1,
+        "listingMapId": 100,
+        "channelId": 2000,
+        "guestName": "Guest",
+        "arrivalDate": date(2024, 9, 1),
+        "departureDate": None,
+    }
+
+
+def test_validate_and_clean_converts_booleans_and_datetimes():
+    message = {
+        "id": 1,
+        "accountId": 1,
+        "conversationId": 2,
+        "body": "Hello",
+        "communicationType": "email",
+        "isIncoming": 0,
+        "insertedOn": "2024-09-01 10:00:00",
+        "updatedOn": "2024-09-01 10:00:00",
+    }
+
+    isValid, msg, cleaned = validator.validate_and_clean_hostaway_payload(
+        message, "conversationMessage"
+    )
+
+    assert isValid is True
+    assert cleaned["isIncoming"] is False
+    assert cleaned["insertedOn"] == datetime(2024, 9, 1, 10, 0)
+
+
+def test_missing_required_field():
+    payload = reservation_payload()
+    del payload["channelId"]
+
+    assert validator.validate_hostaway_payload_against_model(
+        payload, "reservation"
+    ) == (False, "Missing required field: channelId")
+
+
+def test_incorrect_types():
+    assert validator.validate_hostaway_payload_against_model(
+        reservation_payload(listingMapId="100"), "reservation"
+    ) == (
+        False,
+        "Incorrect type for reservation field listingMapId: expected int, got str",
+    )
+    assert validator.validate_hostaway_payload_against_model(
+        reservation_payload(arrivalDate="tomorrow"), "reservation"
+    ) == (
+        False,
+        "Incorrect type for reservation field arrivalDate: expected date, got str",
+    )
+
+
+def test_invalid_object_type():
+    assert validator.validate_hostaway_payload_against_model({}, "listing") == (
+        False,
+        "Invalid object type: listing",
+    )
+
+
+def test_webhook_payload_is_cleaned_into_a_copy(mocker):
+    mocker.patch.object(validator, "HOSTAWAY_ACCOUNT_ID", "42")
+    payload = {
+        "object": "reservation",
+        "event": "reservation.created",
+        "accountId": 42,
+        "data": reservation_payload(),
+    }
+
+    isValid, msg, cleaned_payload = validator.validate_hostaway_webhook_payload(payload)
+
+    assert (isValid, msg) == (True, "Valid payload")
+    assert "unknownField" not in cleaned_payload["data"]
+    assert cleaned_payload["event"] == "reservation.created"
+    # The payload stays as received, e.g. for logging
+    assert payload["data"] == reservation_payload()
+
+
+def test_null_required_field():
+    assert validator.validate_hostaway_payload_against_model(
+        reservation_payload(channelId=None), "reservation"
+    ) == (False, "Null value for required field: channelId")
+
+    message = {
+        "id": 1,
+        "accountId": None,
+        "conversationId": 2,
+        "body": "Hello",
+        "communicationType": "email",
+        "insertedOn": "2024-09-01 10:00:00",
+        "updatedOn": "2024-09-01 10:00:00",
+    }
+    assert validator.validate_hostaway_payload_against_model(
+        message, "conversationMessage"
+    ) == (False, "Null value for required field: accountId")
+
+
+def test_null_defaulted_field_falls_back_to_its_default():
+    message = {
+        "id": 1,
+        "accountId": 1,
+        "conversationId": 2,
+        "body": "Hello",
+        "communicationType": "email",
+        "insertedOn": None,
+        "updatedOn": "2024-09-01 10:00:00",
+    }
+
+    isValid, msg, cleaned = validator.validate_and_clean_hostaway_payload(
+        message, "conversationMessage"
+    )
+
+    assert isValid is True
+    assert "insertedOn" not in cleaned
@@ -0,0 +1,385 @@
+import time
+import threading
+import pytest
+from queue import Queue
+from flask import Flask
+from sqlalchemy import create_engine
+
+import models
+from db import db_session
+from services import task_service, message_service, reservation_service
+from utils.persistent_queue import PersistentQueue, QueuedItem
+from workers import hostaway_webhook_processor
+
+
+@pytest.fixture
+def job_queue(tmp_path, mocker):
+    """Fixture replacing the Hostaway webhook queue with one stored in a temporary SQLite file."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    models.QueuedJob.__table__.create(engine)
+    job_queue = PersistentQueue("hostaway_webhook", poll_interval=0.05)
+    job_queue.bind(engine)
+    mocker.patch("workers.jobs.hostaway_webhook_queue", job_queue)
+    yield job_queue
+    engine.dispose()
+
+
+@pytest.fixture
+def short_lease_queue(tmp_path, mocker):
+    """Fixture replacing the Hostaway webhook queue with one whose claimed payloads expire after 0.3 s."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    models.QueuedJob.__table__.create(engine)
+    job_queue = PersistentQueue(
+        "hostaway_webhook", visibility_timeout=0.3, poll_interval=0.05
+    )
+    job_queue.bind(engine)
+    mocker.patch("workers.jobs.hostaway_webhook_queue", job_queue)
+    yield job_queue
+    engine.dispose()
+
+
+@pytest.fixture
+def app(mocker):
+    mocker.patch("workers.hostaway_webhook_processor.reservation_index.warm")
+    mocker.patch(
+        "workers.hostaway_webhook_processor.reservation_index.reservation_exists",
+        return_value=True,
+    )
+    app = Flask(__name__)
+    app.config["HOSTAWAY_WEBHOOK_WORKER_COUNT"] = 4
+    return app
+
+
+def reservation_event(reservation_id, sequence):
+    return {
+        "object": "reservation",
+        "event": "reservation.updated",
+        "data": {"id": reservation_id, "sequence": sequence},
+    }
+
+
+def test_get_entity_key():
+    assert hostaway_webhook_processor.get_entity_key(
+        {"object": "task", "data": {"id": 7}}
+    ) == ("task", 7)
+    assert hostaway_webhook_processor.get_entity_key(
+        {"object": "conversationMessage", "data": {"id": 1, "reservationId": 9}}
+    ) == ("reservation", 9)
+    assert hostaway_webhook_processor.get_entity_key({"data": "test"}) is None
+
+
+def test_pool_keeps_per_entity_order_and_processes_entities_concurrently(
+    app, job_queue, mocker
+):
+    """A slow entity must not stall others, and each entity's events stay ordered."""
+    processed = []
+    lock = threading.Lock()
+
+    def handle_event(payload):
+        if payload["data"]["id"] == slow_reservation_id:
+            time.sleep(0.5)  # Simulate a slow Hostaway fetch
+        with lock:
+            processed.append((payload["data"]["id"], payload["data"]["sequence"]))
+
+    mocker.patch(
+        "workers.hostaway_webhook_processor.hostaway_event_handler.handle_event",
+        side_effect=handle_event,
+    )
+
+    # Pick three reservations owned by different workers
+    reservation_ids, partitions = [], set()
+    for reservation_id in range(1, 100):
+        partition = hostaway_webhook_processor.get_partition(
+            reservation_event(reservation_id, 0), 4
+        )
+        if partition not in partitions:
+            partitions.add(partition)
+            reservation_ids.append(reservation_id)
+        if len(reservation_ids) == 3:
+            break
+    slow_reservation_id = reservation_ids[0]
+
+    for sequence in range(3):
+        for reservation_id in reservation_ids:
+            job_queue.put(reservation_event(reservation_id, sequence))
+
+    hostaway_webhook_processor.start_worker(app)
+    try:
+        deadline = time.monotonic() + 5
+        while len(processed) < 9 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        hostaway_webhook_processor.stop_worker(timeout=5)
+
+    for reservation_id in reservation_ids:
+        sequences = [seq for rid, seq in processed if rid == reservation_id]
+        assert sequences == [0, 1, 2]
+
+    # The other reservations finished while the slow one was still being processed
+    assert processed[-1][0] == slow_reservation_id
+    assert job_queue.qsize() == 0
+
+
+def test_stop_worker_drains_dispatched_payloads(app, job_queue, mocker):
+    handle_event = mocker.patch(
+        "workers.hostaway_webhook_processor.hostaway_event_handler.handle_event"
+    )
+
+    threads = hostaway_webhook_processor.start_worker(app)
+    for sequence in range(5):
+        job_queue.put(reservation_event(1, sequence))
+    time.sleep(0.2)
+    hostaway_webhook_processor.stop_worker(timeout=5)
+
+    assert handle_event.call_count == 5
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def task_event(task_id):
+    return {
+        "object": "task",
+        "event": "task.created",
+        "data": {"id": task_id, "title": f"Task {task_id}"},
+    }
+
+
+def test_process_batch_isolates_failing_payloads(database_app, mocker):
+    """A payload failing inside a batch is rolled back without affecting the rest."""
+
+    def handle_event(payload):
+        task_service.create_task(payload["data"], notifySuccess=False)
+        if payload["data"]["id"] == 2:
+            raise ValueError("Bad payload")
+
+    mocker.patch(
+        "workers.hostaway_webhook_processor.hostaway_event_handler.handle_event",
+        side_effect=handle_event,
+    )
+    mock_error = mocker.patch("workers.hostaway_webhook_processor.notifier.error")
+
+    items = [QueuedItem(i, task_event(i), 1, None) for i in (1, 2, 3)]
+    hostaway_webhook_processor.process_batch(items)
+
+    assert sorted(task.id for task in db_session.query(models.Task)) == [1, 3]
+    mock_error.assert_called_once()
+
+
+def test_batch_notifications_are_sent_once_committed(database_app, mocker):
+    """Notifications go out after the batch commits, once, even when the batch is retried."""
+    mocker.patch("workers.hostaway_webhook_processor.notifier")
+    inform = mocker.patch("services.task_service.notifier.inform")
+
+    def handle_event(payload):
+        task_service.create_task(payload["data"])
+        if payload["data"]["id"] == 2:
+            raise ValueError("Bad payload")
+
+    mocker.patch(
+        "workers.hostaway_webhook_processor.hostaway_event_handler.handle_event",
+        side_effect=handle_event,
+    )
+
+    # A payload rolled back in its savepoint sends nothing
+    items = [QueuedItem(i, task_event(i), 1, None) for i in (1, 2, 3)]
+    hostaway_webhook_processor.process_batch(items)
+    assert [call.args[0] for call in inform.call_args_list] == [
+        "Task created with ID: 1",
+        "Task created with ID: 3",
+    ]
+
+    # The batch commit fails once: nothing is sent for it, then once per retried payload
+    inform.reset_mock()
+    commit = db_session.commit
+    failures = [RuntimeError("Commit failed")]
+
+    def fail_once():
+        if failures:
+            raise failures.pop()
+        commit()
+
+    mocker.patch.object(db_session, "commit", side_effect=fail_once)
+    items = [QueuedItem(i, task_event(i), 1, None) for i in (4, 5)]
+    hostaway_webhook_processor.process_batch(items)
+    assert [call.args[0] for call in inform.call_args_list] == [
+        "Task created with ID: 4",
+        "Task created with ID: 5",
+    ]
+
+
+def test_failed_payload_does_not_poison_the_session(database_app, mocker):
+    """A payload failing at commit is rolled back, and the worker's next payload goes through."""
+    mocker.patch("services.message_service.notifier")
+    mocker.patch("services.reservation_service.notifier")
+    mocker.patch("services.reservation_service.reservation_index")
+    mock_error = mocker.patch("workers.hostaway_webhook_processor.notifier.error")
+
+    def handle_event(payload):
+        if payload["object"] == "conversationMessage":
+            message_service.create_conversation_message(payload["data"])
+        else:
+            reservation_service.create_reservation(payload["data"])
+
+    mocker.patch(
+        "workers.hostaway_webhook_processor.hostaway_event_handler.handle_event",
+        side_effect=handle_event,
+    )
+
+    # accountId is NOT NULL: the commit fails with an IntegrityError
+    message = {
+        "object": "conversationMessage",
+        "event": "message.received",
+        "data": {"id": 10, "accountId": None, "reservationId": 1, "conversationId": 5},
+    }
+    created = {
+        "object": "reservation",
+        "event": "reservation.created",
+        "data": {"id": 1, "listingMapId": 100, "channelId": 2000},
+    }
+    hostaway_webhook_processor.process_item(QueuedItem(1, message, 1, None))
+    hostaway_webhook_processor.process_item(QueuedItem(2, created, 1, None))
+
+    mock_error.assert_called_once()
+    assert db_session.get(models.Reservation, 1) is not None
+
+
+def test_worker_commits_micro_batches(database_app, mocker):
+    mocker.patch("workers.jobs.hostaway_webhook_queue", visibility_timeout=300)
+    process_batch = mocker.spy(hostaway_webhook_processor, "process_batch")
+
+    partition_queue = Queue()
+    for i in range(1, 6):
+        partition_queue.put(QueuedItem(i, task_event(i), 1, None))
+    partition_queue.put(None)
+
+    mocker.patch(
+        "workers.hostaway_webhook_processor.hostaway_event_handler.handle_event",
+        side_effect=lambda payload: task_service.create_task(
+            payload["data"], notifySuccess=False
+        ),
+    )
+    hostaway_webhook_processor.worker(
+        database_app, partition_queue, batch_size=10, batch_wait=0.05
+    )
+
+    assert process_batch.call_count == 1
+    assert db_session.query(models.Task).count() == 5
+
+
+def message_event(reservation_id, message_id):
+    return {
+        "object": "conversationMessage",
+        "event": "message.received",
+        "data": {"id": message_id, "reservationId": reservation_id},
+    }
+
+
+def test_worker_parks_payloads_for_missing_reservations(app, mocker):
+    """Payloads waiting for a reservation fetch don't block the partition, and resume in order."""
+    mocker.patch("workers.jobs.hostaway_webhook_queue", visibility_timeout=300)
+    hydrated = set()
+    mocker.patch(
+        "workers.hostaway_webhook_processor.reservation_index.reservation_exists",
+        side_effect=lambda reservation_id: reservation_id in hydrated,
+    )
+    hydration_callbacks = []
+    request = mocker.patch(
+        "workers.hostaway_webhook_processor.hydration_service.request",
+        side_effect=lambda reservation_id, on_done: hydration_callbacks.append(on_done)
+        or True,
+    )
+    processed = []
+    mocker.patch(
+        "workers.hostaway_webhook_processor.hostaway_event_handler.handle_event",
+        side_effect=lambda payload: processed.append(payload["data"]["id"]),
+    )
+
+    partition_queue = Queue()
+    thread = threading.Thread(
+        target=hostaway_webhook_processor.worker, args=(app, partition_queue)
+    )
+    thread.start()
+
+    partition_queue.put(QueuedItem(1, message_event(5, "m1"), 1, None))
+    partition_queue.put(QueuedItem(2, task_event(7), 1, None))
+    partition_queue.put(QueuedItem(3, message_event(5, "m2"), 1, None))
+    partition_queue.join()
+
+    # The task went through while both messages wait for reservation 5
+    assert processed == [7]
+    request.assert_called_once()
+
+    hydrated.add(5)
+    hydration_callbacks[0](True)
+    partition_queue.put(None)
+    thread.join(5)
+
+    assert processed == [7, "m1", "m2"]
+
+
+def test_parked_payloads_are_not_redelivered(app, short_lease_queue, mocker):
+    """Payloads parked for longer than the visibility timeout keep their lease, and are processed once."""
+    job_queue = short_lease_queue
+
+    hydrated = set()
+    mocker.patch(
+        "workers.hostaway_webhook_processor.reservation_index.reservation_exists",
+        side_effect=lambda reservation_id: reservation_id in hydrated,
+    )
+    hydration_callbacks = []
+    mocker.patch(
+        "workers.hostaway_webhook_processor.hydration_service.request",
+        side_effect=lambda reservation_id, on_done: hydration_callbacks.append(on_done)
+        or True,
+    )
+    processed = []
+    mocker.patch(
+        "workers.hostaway_webhook_processor.hostaway_event_handler.handle_event",
+        side_effect=lambda payload: processed.append(payload["data"]["id"]),
+    )
+
+    job_queue.put(message_event(5, "m1"))
+    hostaway_webhook_processor.start_worker(app)
+    try:
+        time.sleep(1)  # Parked for several visibility timeouts
+        assert job_queue.stats()["in_flight"] == 1
+
+        hydrated.add(5)
+        hydration_callbacks[0](True)
+        deadline = time.monotonic() + 5
+        while job_queue.qsize() and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        hostaway_webhook_processor.stop_worker(timeout=5)
+
+    assert processed == ["m1"]
+    assert job_queue.qsize() == 0
+
+
+def test_buffered_payloads_are_not_redelivered(app, short_lease_queue, mocker):
+    """Payloads waiting behind a slow partition for longer than the visibility timeout are processed once, in order."""
+    mocker.patch("workers.hostaway_webhook_processor.PARTITION_QUEUE_SIZE", 2)
+    app.config["HOSTAWAY_WEBHOOK_WORKER_COUNT"] = 1
+    processed = []
+
+    def handle_event(payload):
+        if payload["data"]["sequence"] == 0:
+            time.sleep(1)  # Several visibility timeouts, with the partition queue full
+        processed.append(payload["data"]["sequence"])
+
+    mocker.patch(
+        "workers.hostaway_webhook_processor.hostaway_event_handler.handle_event",
+        side_effect=handle_event,
+    )
+
+    for sequence in range(6):
+        short_lease_queue.put(reservation_event(1, sequence))
+    hostaway_webhook_processor.start_worker(app)
+    try:
+        deadline = time.monotonic() + 5
+        while short_lease_queue.qsize() and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        hostaway_webhook_processor.stop_worker(timeout=5)
+
+    assert processed == [0, 1, 2, 3, 4, 5]
+    assert short_lease_queue.stats()["dead"] == 0
@@ -0,0 +1,51 @@
+import hashlib
+import json
+from datetime import date, datetime
+from functools import lru_cache
+
+from sqlalchemy import event
+
+# Columns left out of the content hash: the key and validator.MODEL_MANAGED_COLUMNS
+# (which can't be imported here without an import cycle through models)
+UNHASHED_COLUMNS = {"id", "created_at", "updated_at", "content_hash"}
+
+
+def compute(table, values):
+    """
+    Returns the content hash of a row of the table, from a mapping of column values.
+    Values must be typed like the stored ones (cleaned Hostaway payloads are); missing columns count as None.
+    """
+    canonical = json.dumps(
+        [values.get(name) for name in get_hashed_columns(table)],
+        default=__serialize_value,
+        separators=(",", ":"),
+    )
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def get_hashed_columns(table):
+    """Returns the names of the table's columns covered by the content hash, in table order."""
+    return tuple(
+        column.name for column in table.columns if column.name not in UNHASHED_COLUMNS
+    )
+
+
+def track_content_hash(model):
+    """Keeps the model's content_hash column up to date on every ORM insert and update."""
+
+    @event.listens_for(model, "before_insert")
+    @event.listens_for(model, "before_update")
+    def update_content_hash(mapper, connection, target):
+        table = model.__table__
+        target.content_hash = compute(
+            table, {name: getattr(target, name) for name in get_hashed_columns(table)}
+        )
+
+    return model
+
+
+def __serialize_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Unhashable value of type {type(value).__name__}")
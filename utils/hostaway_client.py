@@ -2,8 +2,8 @@ import os
 import time
 import requests
 
-from utils import logger, validator
-from utils.rate_limiter import RateLimiter
+from utils import logger, validator, http_transport
+from utils.rate_limiter import RateLimiter, Lane
 
 # Hostaway API credentials and base URL
 HOSTAWAY_API_KEY = os.getenv("HOSTAWAY_API_ACCESS_TOKEN")
@@ -11,8 +11,22 @@ HOSTAWAY_BASE_URL = os.getenv("HOSTAWAY_API_BASE_URL")
 
 HOSTAWAY_MAX_RESERVATION_LIST_SIZE = 500
 
-# Hostaway's rate limit: 15 requests per 10 seconds = 1.5 requests per second
-hostaway_rate_limiter = RateLimiter(rate_limit_per_second=1.5)
+# Pause after a 429 without a Retry-After header: Hostaway's rate limit window
+HOSTAWAY_DEFAULT_RETRY_AFTER = 10
+
+# Webhook-driven fetches go first; syncs and backfills get the leftover budget, but never less than a fifth of it
+INTERACTIVE_LANE = "interactive"
+BACKGROUND_LANE = "background"
+
+# Hostaway's rate limit: 15 requests per 10 seconds, usable in bursts.
+# This is the ceiling: the limiter slows down on 429 responses and probes back up to it.
+hostaway_rate_limiter = RateLimiter(
+    rate_limit_per_second=1.5,
+    capacity=15,
+    window_limit=(15, 10),
+    lanes=(Lane(INTERACTIVE_LANE, 0.5), Lane(BACKGROUND_LANE, 0.2)),
+    name="hostaway",
+)
 
 
 def get_headers():
@@ -27,33 +41,34 @@ def get_headers():
     return {"Authorization": f"Bearer {HOSTAWAY_API_KEY}", "Cache-control": "no-cache"}
 
 
-def get_reservation(reservation_id, retries=3, backoff_factor=1):
-    """Fetches a reservation from the Hostaway Public API with retry logic."""
+def get_reservation(reservation_id, retries=3, backoff_factor=1, lane=INTERACTIVE_LANE):
+    """Fetches a reservation from the Hostaway Public API with retry logic, in the given rate limiter lane."""
     headers = get_headers()
     if headers is None:
         return None
 
     for attempt in range(retries):
         try:
-            hostaway_rate_limiter.wait_until_can_proceed()
-            response = requests.get(
-                f"{HOSTAWAY_BASE_URL}/reservations/{reservation_id}", headers=headers
+            response = __get(
+                f"{HOSTAWAY_BASE_URL}/reservations/{reservation_id}",
+                lane,
+                headers=headers,
             )
-            response.raise_for_status()
-            reservation = response.json()["result"]
-            isValid, msg = validator.validate_hostaway_payload_against_model(
-                reservation, "reservation"
+            isValid, msg, reservation = validator.validate_and_clean_hostaway_payload(
+                response.json()["result"], "reservation"
             )
             if not isValid:
                 logger.log_error(
                     "Invalid reservation fetched from Hostaway API: " + msg,
                     logger="hostaway",
+                    reservation_id=reservation_id,
                 )
                 return None
 
             logger.log_inform(
                 f"Reservation {reservation_id} fetched from Hostaway API",
                 logger="hostaway",
+                reservation_id=reservation_id,
             )
             return reservation
 
@@ -61,78 +76,170 @@ def get_reservation(reservation_id, retries=3, backoff_factor=1):
             logger.log_error(
                 f"Attempt {attempt + 1} of {retries}: Error fetching reservation {reservation_id} from Hostaway API: {e}",
                 logger="hostaway",
+                reservation_id=reservation_id,
                 bypass_standard=True,
             )
 
             if attempt < retries - 1:  # Check if we have retries left
-                time.sleep(backoff_factor * (2**attempt))  # Exponential backoff
+                if not __is_rate_limited(e):  # The rate limiter already paused for 429s
+                    time.sleep(backoff_factor * (2**attempt))  # Exponential backoff
             else:
                 return None
 
 
-def get_reservations(
-    limit=1000,
+def __get(url, lane, **kwargs):
+    """
+    Sends a GET request to the Hostaway API once the rate limiter allows it, reporting the outcome back to it.
+    Raises requests.exceptions.HTTPError for error responses, including 429s.
+    """
+    hostaway_rate_limiter.wait_until_can_proceed(lane=lane)
+    response = http_transport.get(url, **kwargs)
+    if response.status_code == 429:
+        retry_after = http_transport.get_retry_after(
+            response, default=HOSTAWAY_DEFAULT_RETRY_AFTER
+        )
+        logger.log_warning(
+            f"Hostaway rate limit hit, pausing requests for {retry_after} seconds",
+            logger="hostaway",
+            bypass_standard=True,
+        )
+        hostaway_rate_limiter.on_rate_limited(retry_after)
+    else:
+        hostaway_rate_limiter.on_success()
+    response.raise_for_status()
+    return response
+
+
+def __is_rate_limited(error):
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code == 429
+
+
+class ReservationListingError(Exception):
+    """Raised when a page of reservations can't be fetched. Listing can resume from offset."""
+
+    def __init__(self, offset, error):
+        super().__init__(f"Failed to fetch reservations at offset {offset}: {error}")
+        self.offset = offset
+
+
+def iter_reservation_pages(
+    page_size=HOSTAWAY_MAX_RESERVATION_LIST_SIZE,
     offset=0,
-    order="",
-    channelId="",
-    listingId="",
-    arrivalStartDate="",
-    arrivalEndDate="",
-    departureStartDate="",
-    departureEndDate="",
-    hasUnreadConversationMessages="",
     retries=3,
     backoff_factor=1,
+    lane=INTERACTIVE_LANE,
+    **filters,
 ):
-    """Fetches all reservations from the Hostaway Public API. Matching the given parameters."""
+    """
+    Yields (offset, reservations, next_offset) for each page of reservations from the Hostaway Public API,
+    matching the given filters (order, channelId, listingId, arrivalStartDate, arrivalEndDate,
+    departureStartDate, departureEndDate, hasUnreadConversationMessages).
+    Pages are fetched lazily and retried individually; after a failure, the listing can be resumed
+    by passing the offset of the ReservationListingError raised.
+    Bulk listings should pass lane=BACKGROUND_LANE so they don't hold up webhook-driven fetches.
+    """
     headers = get_headers()
     if headers is None:
-        return None
+        raise ReservationListingError(offset, "missing Hostaway access token")
+
+    page_size = min(page_size, HOSTAWAY_MAX_RESERVATION_LIST_SIZE)
+    params = {name: value for name, value in filters.items() if value not in ("", None)}
+
+    while True:
+        reservations = __fetch_reservation_page(
+            headers,
+            {**params, "limit": page_size, "offset": offset},
+            retries,
+            backoff_factor,
+            lane,
+        )
+        yield offset, reservations, offset + len(reservations)
+
+        if len(reservations) < page_size:
+            return
+        offset += len(reservations)
+
 
+def iter_reservations(**kwargs):
+    """Yields reservations from the Hostaway Public API one by one, fetching pages as needed. See iter_reservation_pages."""
+    for offset, reservations, next_offset in iter_reservation_pages(**kwargs):
+        yield from reservations
+
+
+def __fetch_reservation_page(headers, params, retries, backoff_factor, lane):
+    """Fetches a single page of reservations, retrying with exponential backoff."""
     for attempt in range(retries):
         try:
-            hostaway_rate_limiter.wait_until_can_proceed()
-            response = requests.get(
-                f"{HOSTAWAY_BASE_URL}/reservations?limit={limit}&offset={offset}&order={order}&channelId={channelId}&listingId={listingId}&arrivalStartDate={arrivalStartDate}&arrivalEndDate={arrivalEndDate}&departureStartDate={departureStartDate}&departureEndDate={departureEndDate}&hasUnreadConversationMessages={hasUnreadConversationMessages}",
+            response = __get(
+                f"{HOSTAWAY_BASE_URL}/reservations",
+                lane,
                 headers=headers,
+                params=params,
             )
-            response.raise_for_status()
-
-            resultingArray = response.json().get("result", [])
-
-            # Paginate if necessary (Hostaway max response size is 500)
-            lengthOfResponseArray = len(resultingArray)
-            while (
-                limit > HOSTAWAY_MAX_RESERVATION_LIST_SIZE
-                and lengthOfResponseArray == HOSTAWAY_MAX_RESERVATION_LIST_SIZE
-            ):
-                offset += HOSTAWAY_MAX_RESERVATION_LIST_SIZE
-
-                hostaway_rate_limiter.wait_until_can_proceed()
-                next_response = requests.get(
-                    f"{HOSTAWAY_BASE_URL}/reservations?limit={limit}&offset={offset}&order={order}&channelId={channelId}&listingId={listingId}&arrivalStartDate={arrivalStartDate}&arrivalEndDate={arrivalEndDate}&departureStartDate={departureStartDate}&departureEndDate={departureEndDate}&hasUnreadConversationMessages={hasUnreadConversationMessages}",
-                    headers=headers,
-                )
-                next_response.raise_for_status()
-                next_resultingArray = next_response.json().get("result", [])
-                resultingArray.extend(next_resultingArray)
-                lengthOfResponseArray = len(next_resultingArray)
-
-            logger.log_inform(
-                f"List of {len(resultingArray)} reservations fetched from Hostaway API",
-                logger="hostaway",
-            )
-
-            return resultingArray
+            return response.json().get("result", [])
 
         except requests.exceptions.RequestException as e:
             logger.log_error(
-                f"Attempt {attempt + 1} of {retries}: Error fetching all reservations from Hostaway API: {e}",
+                f"Attempt {attempt + 1} of {retries}: Error fetching reservations at offset {params['offset']} from Hostaway API: {e}",
                 logger="hostaway",
                 bypass_standard=True,
             )
 
             if attempt < retries - 1:  # Check if we have retries left
-                time.sleep(backoff_factor * (2**attempt))  # Exponential backoff
+                if not __is_rate_limited(e):  # The rate limiter already paused for 429s
+                    time.sleep(backoff_factor * (2**attempt))  # Exponential backoff
             else:
-                return None
+                raise ReservationListingError(params["offset"], e)
+
+
+def get_reservations(
+    limit=1000,
+    offset=0,
+    order="",
+    channelId="",
+    listingId="",
+    arrivalStartDate="",
+    arrivalEndDate="",
+    departureStartDate="",
+    departureEndDate="",
+    hasUnreadConversationMessages="",
+    retries=3,
+    backoff_factor=1,
+    lane=INTERACTIVE_LANE,
+):
+    """
+    Fetches reservations from the Hostaway Public API matching the given parameters, as a list.
+    A limit above Hostaway's maximum page size fetches every matching reservation.
+    Prefer iter_reservation_pages for large listings, which doesn't hold them all in memory.
+    """
+    pages = iter_reservation_pages(
+        page_size=limit,
+        offset=offset,
+        retries=retries,
+        backoff_factor=backoff_factor,
+        lane=lane,
+        order=order,
+        channelId=channelId,
+        listingId=listingId,
+        arrivalStartDate=arrivalStartDate,
+        arrivalEndDate=arrivalEndDate,
+        departureStartDate=departureStartDate,
+        departureEndDate=departureEndDate,
+        hasUnreadConversationMessages=hasUnreadConversationMessages,
+    )
+
+    resultingArray = []
+    try:
+        for page_offset, reservations, next_offset in pages:
+            resultingArray.extend(reservations)
+            if limit <= HOSTAWAY_MAX_RESERVATION_LIST_SIZE:
+                break  # A single page was requested
+    except ReservationListingError:
+        return None
+
+    logger.log_inform(
+        f"List of {len(resultingArray)} reservations fetched from Hostaway API",
+        logger="hostaway",
+    )
+    return resultingArray
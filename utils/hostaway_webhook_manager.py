@@ -1,7 +1,7 @@
 import os
 import requests
 
-from utils import logger, notifier
+from utils import logger, notifier, http_transport
 
 # Load environment variables
 HOSTAWAY_API_KEY = os.getenv("HOSTAWAY_API_ACCESS_TOKEN")
@@ -46,7 +46,7 @@ def register_unified_webhook():
     }
 
     try:
-        response = requests.post(
+        response = http_transport.post(
             HOSTAWAY_WEBHOOK_API_URL,
             headers=get_headers(post=True),
             json=data,
@@ -76,7 +76,7 @@ def deregister_unified_webhook(webhook_id=None):
         poppedFromList = True
 
     try:
-        response = requests.delete(
+        response = http_transport.delete(
             f"{HOSTAWAY_WEBHOOK_API_URL}/{webhook_id}",
             headers=get_headers(),
         )
@@ -104,7 +104,7 @@ def deregister_all_unified_webhooks():
     global REGISTERED_WEBHOOK_IDS
     for webhook_id in REGISTERED_WEBHOOK_IDS:
         try:
-            response = requests.delete(
+            response = http_transport.delete(
                 f"{HOSTAWAY_WEBHOOK_API_URL}/{webhook_id}",
                 headers=get_headers(),
             )
@@ -122,7 +122,7 @@ def deregister_all_unified_webhooks():
 def get_all_unified_webhooks():
     """Get all unified webhooks registered with Hostaway."""
     try:
-        response = requests.get(
+        response = http_transport.get(
             HOSTAWAY_WEBHOOK_API_URL,
             headers=get_headers(),
         )
@@ -138,7 +138,7 @@ def get_all_unified_webhooks():
 def read_unified_webhook(webhook_id):
     """Get a specific unified webhook object registered with Hostaway."""
     try:
-        response = requests.get(
+        response = http_transport.get(
             f"{HOSTAWAY_WEBHOOK_API_URL}/{webhook_id}",
             headers=get_headers(),
         )
@@ -154,7 +154,7 @@ def read_unified_webhook(webhook_id):
 def update_unified_webhook(webhook_id, data):
     """Update a specific unified webhook object registered with Hostaway."""
     try:
-        response = requests.put(
+        response = http_transport.put(
             f"{HOSTAWAY_WEBHOOK_API_URL}/{webhook_id}", headers=get_headers(), json=data
         )
         response.raise_for_status()
@@ -0,0 +1,168 @@
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import metrics, tracing
+
+# Default (connect, read) timeouts in seconds, used when a call doesn't pass its own
+DEFAULT_TIMEOUT = (5, 30)
+
+# Hosts with a cached connection pool, and connections kept alive per host
+POOL_HOSTS = 10
+POOL_SIZE_PER_HOST = 10
+
+REQUEST_SECONDS = metrics.histogram(
+    "http_client_request_seconds",
+    "Latency of outbound HTTP requests (Hostaway and Slack APIs), by host and outcome.",
+    labels=("host", "outcome"),
+)
+
+
+class HttpTransport:
+    """
+    HTTP client shared by the Hostaway and Slack integrations.
+    Keeps connections alive in per-host pools, applies default timeouts and keeps
+    per-host latency and error counters.
+    Raises the same exceptions as requests.
+    """
+
+    def __init__(
+        self,
+        timeout=DEFAULT_TIMEOUT,
+        pool_hosts=POOL_HOSTS,
+        pool_size_per_host=POOL_SIZE_PER_HOST,
+    ):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_hosts, pool_maxsize=pool_size_per_host
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.__lock = Lock()
+        self.__host_stats = {}
+
+    def request(self, method, url, **kwargs):
+        """Sends a request through the pooled session, recording its latency and outcome."""
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.monotonic()
+        try:
+            with tracing.span("http", method=method, host=urlsplit(url).netloc):
+                response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self.__record(url, time.monotonic() - start, "error")
+            raise
+
+        self.__record(url, time.monotonic() - start, f"{response.status_code // 100}xx")
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def stats(self):
+        """
+        Returns the counters of each host contacted:
+        {host: {requests, errors, average_latency_ms, max_latency_ms}}.
+        Errors are connection failures, timeouts and 5xx responses.
+        """
+        with self.__lock:
+            return {
+                host: {
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "average_latency_ms": round(
+                        stats["total_latency"] / stats["requests"] * 1000, 2
+                    ),
+                    "max_latency_ms": round(stats["max_latency"] * 1000, 2),
+                }
+                for host, stats in self.__host_stats.items()
+            }
+
+    def close(self):
+        """Closes the pooled connections."""
+        self.session.close()
+
+    def __record(self, url, latency, outcome):
+        host = urlsplit(url).netloc
+        error = outcome in ("error", "5xx")
+        REQUEST_SECONDS.observe(latency, host, outcome)
+        with self.__lock:
+            stats = self.__host_stats.setdefault(
+                host,
+                {"requests": 0, "errors": 0, "total_latency": 0.0, "max_latency": 0.0},
+            )
+            stats["requests"] += 1
+            stats["errors"] += int(error)
+            stats["total_latency"] += latency
+            stats["max_latency"] = max(stats["max_latency"], latency)
+
+
+def get_retry_after(response, default=None):
+    """
+    Returns the seconds to wait before retrying, from the response's Retry-After header
+    (a number of seconds or an HTTP date), or default if it has none or can't be parsed.
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return default
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+# Transport used by the module-level helpers below; replace it with set_transport (e.g. in tests)
+__transport = HttpTransport()
+
+
+def get_transport():
+    return __transport
+
+
+def set_transport(transport):
+    """Replaces the shared transport, returning the previous one."""
+    global __transport
+    previous, __transport = __transport, transport
+    return previous
+
+
+def get(url, **kwargs):
+    return __transport.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return __transport.post(url, **kwargs)
+
+
+def put(url, **kwargs):
+    return __transport.put(url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return __transport.delete(url, **kwargs)
+
+
+def stats():
+    return __transport.stats()
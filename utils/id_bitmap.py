@@ -0,0 +1,61 @@
+from threading import Lock
+
+# Ids are tracked in chunks of 2^16 bits (8 KiB), allocated only where ids exist
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+class IdBitmap:
+    """
+    Compact set of non-negative integer ids, one bit per id.
+    Memory grows with the number of 65,536-id ranges in use, so millions of
+    clustered ids (like Hostaway reservation ids) fit in a few megabytes.
+    Lookups are lock-free; additions are serialized.
+    """
+
+    def __init__(self):
+        self.chunks = {}
+        self.count = 0
+        self.lock = Lock()
+
+    def add(self, id):
+        with self.lock:
+            self.__add(id)
+
+    def update(self, ids):
+        with self.lock:
+            for id in ids:
+                self.__add(id)
+
+    def clear(self):
+        with self.lock:
+            self.chunks = {}
+            self.count = 0
+
+    def __contains__(self, id):
+        if not isinstance(id, int) or id < 0:
+            return False
+        chunk = self.chunks.get(id >> CHUNK_BITS)
+        if chunk is None:
+            return False
+        offset = id & CHUNK_MASK
+        return bool(chunk[offset >> 3] & (1 << (offset & 7)))
+
+    def __len__(self):
+        return self.count
+
+    def memory_usage(self):
+        """Returns the number of bytes used by the bitmap chunks."""
+        return len(self.chunks) * ((CHUNK_MASK + 1) >> 3)
+
+    def __add(self, id):
+        if not isinstance(id, int) or id < 0:
+            raise ValueError(f"IdBitmap only stores non-negative integers, got {id!r}")
+        chunk = self.chunks.get(id >> CHUNK_BITS)
+        if chunk is None:
+            chunk = self.chunks[id >> CHUNK_BITS] = bytearray((CHUNK_MASK + 1) >> 3)
+        offset = id & CHUNK_MASK
+        bit = 1 << (offset & 7)
+        if not chunk[offset >> 3] & bit:
+            chunk[offset >> 3] |= bit
+            self.count += 1
@@ -0,0 +1,196 @@
+import logging
+import os
+import sqlite3
+import time
+
+# Record fields indexed for exact lookups, e.g. every event logged with reservation_id=12345
+INDEXED_FIELDS = ("reservation_id", "task_id", "conversation_id", "trace_id")
+
+# Records written in a single transaction at most; smaller batches are committed once the queue is drained
+MAX_BATCH_SIZE = 500
+
+# Indexed events are kept for this long, and purged at most once per interval
+RETENTION_SECONDS = 30 * 24 * 3600
+PURGE_INTERVAL_SECONDS = 3600
+
+MAX_SEARCH_RESULTS = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_events (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    level INTEGER NOT NULL,
+    logger TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_log_events_created ON log_events (created);
+CREATE TABLE IF NOT EXISTS log_event_keys (
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    event INTEGER NOT NULL,
+    PRIMARY KEY (name, value, event)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS log_messages USING fts5 (message);
+"""
+
+
+class IndexHandler(logging.Handler):
+    """
+    Writes log records into a SQLite index: their JSON record, level and logger, the values of their
+    INDEXED_FIELDS and their message, full-text indexed. Meant to run on the logging queue listener:
+    records are committed in batches, once the queue is drained or MAX_BATCH_SIZE records are pending.
+    """
+
+    def __init__(self, path, queue=None):
+        super().__init__()
+        self.path = path
+        self.queue = queue
+        self.__connection = None
+        self.__pending = 0
+        self.__last_purge = 0
+
+    def emit(self, record):
+        try:
+            if self.__connection is None:
+                self.__connection = connect(self.path)
+            event = self.__connection.execute(
+                "INSERT INTO log_events (created, level, logger, record) VALUES (?, ?, ?, ?)",
+                (record.created, record.levelno, record.name, self.format(record)),
+            ).lastrowid
+            self.__connection.execute(
+                "INSERT INTO log_messages (rowid, message) VALUES (?, ?)",
+                (event, record.getMessage()),
+            )
+            fields = getattr(record, "fields", {})
+            for name in INDEXED_FIELDS:
+                if fields.get(name) is not None:
+                    self.__connection.execute(
+                        "INSERT OR IGNORE INTO log_event_keys (name, value, event) VALUES (?, ?, ?)",
+                        (name, str(fields[name]), event),
+                    )
+            self.__pending += 1
+            if (
+                self.__pending >= MAX_BATCH_SIZE
+                or self.queue is None
+                or self.queue.empty()
+            ):
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        if self.__connection is None or not self.__pending:
+            return
+        if time.time() - self.__last_purge >= PURGE_INTERVAL_SECONDS:
+            purge(self.__connection, time.time() - RETENTION_SECONDS)
+            self.__last_purge = time.time()
+        self.__connection.commit()
+        self.__pending = 0
+
+    def close(self):
+        try:
+            self.flush()
+            if self.__connection is not None:
+                self.__connection.close()
+                self.__connection = None
+        finally:
+            super().close()
+
+
+def connect(path):
+    """Opens the index, creating it if needed. The listener writes while requests search it (WAL mode)."""
+    # The listener thread writes, but the handler is closed from the thread stopping it
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def purge(connection, before):
+    """Deletes the events logged before the given time. Event ids grow with time, so this deletes an id range."""
+    last_event = connection.execute(
+        "SELECT max(id) FROM log_events WHERE created < ?", (before,)
+    ).fetchone()[0]
+    if last_event is None:
+        return
+    connection.execute("DELETE FROM log_events WHERE id <= ?", (last_event,))
+    connection.execute("DELETE FROM log_messages WHERE rowid <= ?", (last_event,))
+    connection.execute("DELETE FROM log_event_keys WHERE event <= ?", (last_event,))
+
+
+def search(
+    path,
+    fields=None,
+    level=None,
+    logger=None,
+    since=None,
+    until=None,
+    text=None,
+    before=None,
+    limit=100,
+):
+    """
+    Returns the indexed events matching every given criterion as [(id, record)], newest first:
+    fields maps INDEXED_FIELDS to their value, level is the lowest level, since and until are datetimes
+    (inclusive), text is a phrase searched in messages and before an event id to page from.
+    Records are the JSON lines written to the log files, as text.
+    """
+    if not os.path.exists(path):
+        return []
+
+    joins = []
+    conditions = []
+    parameters = []
+    for index, (name, value) in enumerate((fields or {}).items()):
+        joins.append(
+            f"JOIN log_event_keys k{index} ON k{index}.event = e.id "
+            f"AND k{index}.name = ? AND k{index}.value = ?"
+        )
+        parameters += [name, str(value)]
+    if level is not None:
+        conditions.append("e.level >= ?")
+        parameters.append(level)
+    if logger is not None:
+        conditions.append("e.logger = ?")
+        parameters.append(logger)
+    # Time ranges are looked up as the range of event ids they span, which pages in id order without
+    # sorting the range. The created times themselves ("+" keeps them off the index) trim its bounds,
+    # where events logged from different threads may be a few milliseconds out of order.
+    if since is not None:
+        conditions.append(
+            "e.id >= (SELECT id FROM log_events WHERE created >= ? ORDER BY created LIMIT 1) "
+            "AND +e.created >= ?"
+        )
+        parameters += [since.timestamp()] * 2
+    if until is not None:
+        conditions.append(
+            "e.id <= (SELECT id FROM log_events WHERE created <= ? ORDER BY created DESC LIMIT 1) "
+            "AND +e.created <= ?"
+        )
+        parameters += [until.timestamp()] * 2
+    if text:
+        # Searched as a phrase, so user input can't be mistaken for FTS query syntax
+        conditions.append(
+            "e.id IN (SELECT rowid FROM log_messages WHERE log_messages MATCH ?)"
+        )
+        parameters.append('"' + text.replace('"', '""') + '"')
+    if before is not None:
+        conditions.append("e.id < ?")
+        parameters.append(before)
+
+    query = " ".join(
+        [
+            "SELECT e.id, e.record FROM log_events e",
+            *joins,
+            "WHERE " + " AND ".join(conditions) if conditions else "",
+            "ORDER BY e.id DESC LIMIT ?",
+        ]
+    )
+    parameters.append(min(limit, MAX_SEARCH_RESULTS))
+
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(query, parameters).fetchall()
+    finally:
+        connection.close()
@@ -0,0 +1,185 @@
+import gzip
+import os
+import struct
+from collections import deque
+from datetime import datetime
+
+from utils import logger
+
+CHUNK_SIZE = 64 * 1024
+
+# Log lines start with their asctime, e.g. "2026-10-18 09:37:17,412 - INFO - ...",
+# or are JSON records starting with it, e.g. {"time": "2026-10-18 09:37:17,412", ...}
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+TIMESTAMP_LENGTH = 23
+JSON_TIMESTAMP_PREFIX = b'{"time": "'
+
+
+class LogSegments:
+    """
+    A log and its rotated segments, read as a single byte stream from the oldest segment to the current file.
+    The files are opened up front, so a rotation while reading doesn't shift or skip any content.
+    Gzip-compressed segments are decompressed on the fly.
+    Reads are chunked: nothing is loaded in memory as a whole.
+    """
+
+    def __init__(self, segments):
+        """segments: for each segment, oldest first, the paths it may be found at, in order of preference."""
+        self.__files = []
+        self.__opened_files = []
+        for paths in segments:
+            for path in paths:
+                try:
+                    file = open(path, "rb")
+                except FileNotFoundError:
+                    continue
+                self.__opened_files.append(file)
+                self.__files.append(self.__open_segment(file, path.endswith(".gz")))
+                break
+        self.size = sum(size for file, size, compressed in self.__files)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def exists(self):
+        return bool(self.__files)
+
+    def close(self):
+        for file, size, compressed in self.__files:
+            file.close()
+        for file in self.__opened_files:
+            file.close()
+
+    def iter_bytes(self, start=0, end=None, chunk_size=CHUNK_SIZE):
+        """Yields the bytes from start to end (exclusive, default: the end of the stream) in chunks."""
+        end = self.size if end is None else min(end, self.size)
+        segment_start = 0
+        for file, size, compressed in self.__files:
+            segment_end = segment_start + size
+            if segment_start < end and segment_end > start:
+                file.seek(max(start - segment_start, 0))
+                remaining = min(end, segment_end) - max(start, segment_start)
+                while remaining > 0:
+                    chunk = file.read(min(chunk_size, remaining))
+                    if not chunk:
+                        break  # Truncated since it was opened
+                    remaining -= len(chunk)
+                    yield chunk
+            segment_start = segment_end
+
+    def iter_lines(self, start=0):
+        """Yields the lines of the stream from start, as bytes including their line break."""
+        pending = b""
+        for chunk in self.iter_bytes(start):
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                yield line + b"\n"
+        if pending:
+            yield pending
+
+    def get_tail_offset(self, lines, chunk_size=CHUNK_SIZE):
+        """
+        Returns the offset where the last given number of lines start, reading backwards from the end.
+        Compressed segments can't be read backwards, they are scanned forwards once instead.
+        """
+        if lines <= 0:
+            return self.size
+
+        # A final line break ends the last line, it doesn't start a new one
+        end = self.size
+        if end and b"".join(self.iter_bytes(end - 1, end)) == b"\n":
+            end -= 1
+
+        line_breaks = 0
+        segment_end = self.size
+        for file, size, compressed in reversed(self.__files):
+            segment_start = segment_end - size
+            end = min(end, segment_end)
+            if compressed:
+                # Keep the positions of the last line breaks still needed, and count them all
+                positions = deque(maxlen=lines - line_breaks)
+                offset = segment_start
+                for chunk in self.iter_bytes(segment_start, end, chunk_size):
+                    index = chunk.find(b"\n")
+                    while index >= 0:
+                        positions.append(offset + index)
+                        line_breaks += 1
+                        index = chunk.find(b"\n", index + 1)
+                    offset += len(chunk)
+                if line_breaks >= lines:
+                    return positions[0] + 1
+            else:
+                while end > segment_start:
+                    start = max(end - chunk_size, segment_start)
+                    chunk = b"".join(self.iter_bytes(start, end))
+                    index = len(chunk)
+                    while True:
+                        index = chunk.rfind(b"\n", 0, index)
+                        if index < 0:
+                            break
+                        line_breaks += 1
+                        if line_breaks == lines:
+                            return start + index + 1
+                    end = start
+            end = segment_start
+            segment_end = segment_start
+        return 0
+
+    @staticmethod
+    def __open_segment(file, compressed):
+        """Returns (readable file, uncompressed size, compressed) for an opened segment file."""
+        if not compressed:
+            return file, os.fstat(file.fileno()).st_size, False
+
+        # The gzip trailer ends with the uncompressed size (modulo 4 GiB, far above the rotation size)
+        file.seek(-4, os.SEEK_END)
+        size = struct.unpack("<I", file.read(4))[0]
+        file.seek(0)
+        return gzip.GzipFile(fileobj=file, mode="rb"), size, True
+
+
+def open_log(log_type):
+    """
+    Opens the log of the given type with its rotated segments, oldest first.
+    A segment still being compressed is read from its uncompressed copy. The compressed segment wins
+    over an uncompressed one: it's only renamed into place once complete, and an uncompressed backup
+    left by a rotation without compression is older, and never rotated again.
+    """
+    path = os.path.join(logger.LOG_DIRECTORY, f"{log_type}.log")
+    rotated_segments = [
+        (f"{path}.{index}.gz", f"{path}.{index}")
+        for index in range(logger.LOG_BACKUP_COUNT, 0, -1)
+    ]
+    return LogSegments(rotated_segments + [(path,)])
+
+
+def filter_lines(lines, since=None, until=None):
+    """
+    Yields the lines logged between since and until (inclusive, either can be None).
+    Lines without a timestamp, i.e. continuations of multi-line messages, follow the line they continue.
+    """
+    included = False
+    for line in lines:
+        timestamp = get_timestamp(line)
+        if timestamp is not None:
+            included = (since is None or timestamp >= since) and (
+                until is None or timestamp <= until
+            )
+        if included:
+            yield line
+
+
+def get_timestamp(line):
+    """Returns the time a log line was logged at, or None if it doesn't start with a timestamp."""
+    if line.startswith(JSON_TIMESTAMP_PREFIX):
+        line = line[len(JSON_TIMESTAMP_PREFIX) :]
+    try:
+        return datetime.strptime(
+            line[:TIMESTAMP_LENGTH].decode("ascii"), TIMESTAMP_FORMAT
+        )
+    except (UnicodeDecodeError, ValueError):
+        return None
@@ -1,63 +1,261 @@
 import os
 
+import atexit
+import gzip
+import itertools
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import secrets
+import shutil
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+from threading import Thread
+
+from utils import log_index
 
 APP_STATIC_DOMAIN = os.getenv("APP_STATIC_DOMAIN", "http://localhost:5000")
 
+# Log files are rotated at LOG_MAX_BYTES into LOG_BACKUP_COUNT gzip-compressed segments:
+# <name>.log.1.gz (newest) to <name>.log.5.gz. setup_logging can configure both.
+LOG_DIRECTORY = "logs"
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Every record is also written to this SQLite index, for /logs/search (see utils/log_index.py)
+LOG_INDEX_FILE = "index.db"
+
+# Loggers, each written to its own file, and the lowest level they record
+LOGGERS = {
+    "general": logging.INFO,
+    "hostaway": logging.INFO,
+    "hostaway_data_sync": logging.INFO,
+    "slack": logging.INFO,
+    "tracing": logging.INFO,
+}
 
-def setup_logging():
-    """Initializes the logging system."""
+# Standard logs collecting the warnings and errors of every logger: (lowest level, level excluded from)
+STANDARD_LOGS = {
+    "warnings": (logging.WARNING, logging.ERROR),
+    "errors": (logging.ERROR, None),
+}
 
-    # Standard loggers
-    __initialize_logger("general", level=logging.INFO)
-    __initialize_logger("errors", level=logging.ERROR)
-    __initialize_logger("warnings", level=logging.WARNING)
+# Event ids: unique per process run, cheap to generate on the logging thread
+__event_id_prefix = secrets.token_hex(4)
+__event_counter = itertools.count(1)
 
-    # Hostaway loggers
-    __initialize_logger("hostaway", level=logging.INFO)
-    __initialize_logger("hostaway_data_sync", level=logging.INFO)
+__listener = None
 
-    # Slack loggers
-    __initialize_logger("slack", level=logging.INFO)
 
+def setup_logging(max_bytes=None, backup_count=None):
+    """
+    Initializes the logging system. Log calls only put their record on a queue; a single
+    background listener formats them as JSON lines and writes them to the log files and the log index.
+    """
+    global __listener, LOG_MAX_BYTES, LOG_BACKUP_COUNT
+    if __listener is not None:
+        return
 
-def log_inform(message, logger="general"):
-    logging.getLogger(logger).info(message)
+    LOG_MAX_BYTES = max_bytes or LOG_MAX_BYTES
+    LOG_BACKUP_COUNT = backup_count or LOG_BACKUP_COUNT
 
+    queue = SimpleQueue()
+    handlers = [log_index.IndexHandler(get_index_path(), queue)]
+    handlers[0].setFormatter(JsonFormatter())
+    for name, level in LOGGERS.items():
+        handler = __create_file_handler(name, level)
+        handler.addFilter(logging.Filter(name))
+        handlers.append(handler)
 
-def log_warning(message, logger="general", bypass_standard=False):
-    if bypass_standard:
-        logging.getLogger(logger).warning(message)
-    else:
-        logging.getLogger(logger).info(
-            f"Warning issued, see 'Warnings' log for details: {APP_STATIC_DOMAIN}/logs/warnings"
+    for name, (level, excluded_level) in STANDARD_LOGS.items():
+        handler = __create_file_handler(name, level)
+        handler.addFilter(
+            lambda record, excluded_level=excluded_level: not getattr(
+                record, "bypass_standard", False
+            )
+            and (excluded_level is None or record.levelno < excluded_level)
         )
-        logging.getLogger("warnings").warning(message)
+        handlers.append(handler)
+
+    __listener = QueueListener(queue, *handlers, respect_handler_level=True)
+    __listener.start()
+    atexit.register(stop_logging)
+
+    queue_handler = StructuredQueueHandler(queue)
+    for name, level in LOGGERS.items():
+        logging.getLogger(name).addHandler(queue_handler)
+        logging.getLogger(name).setLevel(level)
+
+
+def stop_logging():
+    """Writes the queued records and stops the background listener."""
+    global __listener
+    if __listener is None:
+        return
+
+    for name in LOGGERS:
+        for handler in logging.getLogger(name).handlers[:]:
+            if isinstance(handler, StructuredQueueHandler):
+                logging.getLogger(name).removeHandler(handler)
+    __listener.stop()
+    for handler in __listener.handlers:
+        handler.close()
+    __listener = None
+
 
+def get_index_path():
+    return os.path.join(LOG_DIRECTORY, LOG_INDEX_FILE)
 
-def log_error(message, logger="general", bypass_standard=False):
-    if bypass_standard:
-        logging.getLogger(logger).error(message)
-    else:
-        logging.getLogger(logger).info(
-            f"Error issued, see 'Errors' log for details: {APP_STATIC_DOMAIN}/logs/errors"
+
+def log_inform(message, logger="general", **fields):
+    __log(logger, logging.INFO, message, fields)
+
+
+def log_warning(message, logger="general", bypass_standard=False, **fields):
+    """Logs a warning, also written to the 'warnings' log unless bypass_standard."""
+    __log(logger, logging.WARNING, message, fields, bypass_standard)
+
+
+def log_error(message, logger="general", bypass_standard=False, **fields):
+    """Logs an error, also written to the 'errors' log unless bypass_standard."""
+    __log(logger, logging.ERROR, message, fields, bypass_standard)
+
+
+@contextmanager
+def timed(message, logger="general", **fields):
+    """Logs the message with the duration of the block, in milliseconds, once it's done."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        __log(
+            logger,
+            logging.INFO,
+            message,
+            {**fields, "duration_ms": round((time.perf_counter() - start) * 1000, 3)},
         )
-        logging.getLogger("errors").error(message)
 
 
-def __initialize_logger(logger_reference, fname=None, level=logging.INFO):
-    """Initializes a new logger with the specified name and level."""
+def new_event_id():
+    return f"{__event_id_prefix}-{next(__event_counter)}"
 
-    if fname is None:
-        fname = logger_reference
 
-    log_handler = RotatingFileHandler(
-        f"logs/{fname}.log", maxBytes=100000, backupCount=5
+def __log(logger, level, message, fields, bypass_standard=False):
+    log = logging.getLogger(logger)
+    if not log.isEnabledFor(level):
+        return
+
+    # The record is made here rather than by Logger.log, which walks the stack for the caller's
+    # source location on every call: the JSON lines don't include it
+    record = log.makeRecord(
+        logger,
+        level,
+        "(unknown file)",
+        0,
+        message,
+        None,
+        None,
+        extra={
+            "event_id": new_event_id(),
+            "fields": fields,
+            "bypass_standard": bypass_standard,
+        },
     )
-    log_handler.setLevel(level)
-    log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-    log_handler.setFormatter(log_formatter)
+    log.handle(record)
+
 
-    logging.getLogger(logger_reference).addHandler(log_handler)
-    logging.getLogger(logger_reference).setLevel(level)
+class StructuredQueueHandler(QueueHandler):
+    """
+    Puts records on the logging queue with their message and exception rendered, and an event id.
+    Records are prepared in place rather than copied: the rendered text is all other handlers need too.
+    """
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        if not hasattr(record, "event_id"):
+            record.event_id = new_event_id()
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as JSON lines, starting with their time so they sort and filter as text.
+    The line is kept on the record: every log it's written to (and the log index) shares it.
+    """
+
+    def format(self, record):
+        line = getattr(record, "json_line", None)
+        if line is None:
+            line = record.json_line = self.__format_json(record)
+        return line
+
+    def __format_json(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "event_id": getattr(record, "event_id", None),
+            "message": record.getMessage(),
+        }
+        for name, value in getattr(record, "fields", {}).items():
+            entry.setdefault(name, value)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler whose rotated segments are gzip-compressed by a background thread."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.namer = lambda name: f"{name}.gz"
+        self.__compression_thread = None
+
+    def doRollover(self):
+        # Segments are renamed on rollover, the previous one must be fully compressed by then
+        self.wait_for_compression()
+        super().doRollover()
+
+    def rotate(self, source, dest):
+        # The segment stays readable uncompressed (without .gz) until its compressed copy is complete
+        uncompressed = dest[: -len(".gz")]
+        os.rename(source, uncompressed)
+        self.__compression_thread = Thread(
+            target=self.__compress, args=(uncompressed, dest), daemon=True
+        )
+        self.__compression_thread.start()
+
+    def wait_for_compression(self):
+        if self.__compression_thread is not None:
+            self.__compression_thread.join()
+
+    def close(self):
+        self.wait_for_compression()
+        super().close()
+
+    @staticmethod
+    def __compress(source, dest):
+        with open(source, "rb") as source_file, gzip.open(
+            f"{dest}.tmp", "wb"
+        ) as dest_file:
+            shutil.copyfileobj(source_file, dest_file)
+        os.replace(f"{dest}.tmp", dest)
+        os.remove(source)
+
+
+def __create_file_handler(name, level):
+    handler = CompressingRotatingFileHandler(
+        os.path.join(LOG_DIRECTORY, f"{name}.log"),
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+    )
+    handler.setLevel(level)
+    handler.setFormatter(JsonFormatter())
+    return handler
@@ -0,0 +1,307 @@
+import gc
+import itertools
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict, deque
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.orm import session as orm_session
+
+from utils import metrics
+
+# Frames kept per allocation traceback. The allocating line is enough to group by line or file; more
+# frames tell its callers apart (group_by="traceback"), but slow every allocation down further
+DEFAULT_TRACEBACK_FRAMES = 1
+
+# Snapshots kept for diffs, oldest dropped first; each holds a trace of every allocated block
+MAX_SNAPSHOTS = 5
+
+# Queued items sized per queue at most; the footprint of longer queues is extrapolated from them
+MAX_SIZED_ITEMS = 1000
+
+# Nesting levels of containers followed when sizing a queued item
+MAX_SIZE_DEPTH = 8
+
+GROUP_BY = ("lineno", "filename", "traceback")
+
+# Allocations made by tracemalloc and the import system, which aren't the application's.
+# They're left out of the statistics rather than filtered out of snapshots: filtering walks every
+# trace in Python, and takes seconds on a heap of millions of blocks.
+__IGNORED_FILES = {
+    tracemalloc.__file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<unknown>",
+}
+
+
+class TracingNotStartedError(Exception):
+    """Raised when a snapshot is requested while tracemalloc isn't tracing allocations."""
+
+
+__lock = threading.Lock()
+__snapshots = OrderedDict()  # snapshot id -> (taken at, traced bytes, snapshot)
+__snapshot_ids = itertools.count(1)
+
+# Queue name -> callback returning the in-memory queue, or a list of them (see register_queue)
+__queues = {}
+
+
+def start_tracing(frames=DEFAULT_TRACEBACK_FRAMES):
+    """Starts tracing allocations with tracemalloc. Returns False if it was already tracing."""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    return True
+
+
+def stop_tracing():
+    """Stops tracing allocations, which frees the traces, and discards the snapshots."""
+    tracemalloc.stop()
+    with __lock:
+        __snapshots.clear()
+
+
+def take_snapshot():
+    """Takes a snapshot of the traced allocations, kept for diffs. Returns its summary."""
+    snapshot = __take_snapshot()
+    taken_at = time.time()
+    traced_bytes = tracemalloc.get_traced_memory()[0]
+    with __lock:
+        snapshot_id = next(__snapshot_ids)
+        __snapshots[snapshot_id] = (taken_at, traced_bytes, snapshot)
+        while len(__snapshots) > MAX_SNAPSHOTS:
+            __snapshots.popitem(last=False)
+    return __get_snapshot_summary(snapshot_id, taken_at, traced_bytes)
+
+
+def get_snapshots():
+    with __lock:
+        snapshots = list(__snapshots.items())
+    return [
+        __get_snapshot_summary(snapshot_id, taken_at, traced_bytes)
+        for snapshot_id, (taken_at, traced_bytes, _) in snapshots
+    ]
+
+
+def get_top_allocators(limit=20, group_by="lineno"):
+    """Returns the limit locations holding the most traced memory now, largest first."""
+    statistics = __get_statistics(__take_snapshot().statistics(group_by))
+    return [__get_statistic(statistic, group_by) for statistic in statistics[:limit]]
+
+
+def diff(from_id=None, to_id=None, limit=20, group_by="lineno"):
+    """
+    Returns the limit locations whose traced memory grew the most (or shrank the most, sorted by
+    absolute difference) between two snapshots: from_id defaults to the oldest kept snapshot, and
+    to_id to a new one, taken now. Returns None if a snapshot isn't kept.
+    """
+    with __lock:
+        if from_id is None and __snapshots:
+            from_id = next(iter(__snapshots))
+        old = __snapshots.get(from_id)
+        new = __snapshots.get(to_id) if to_id is not None else None
+    if old is None or (to_id is not None and new is None):
+        return None
+
+    new_snapshot = new[2] if new is not None else __take_snapshot()
+    statistics = __get_statistics(new_snapshot.compare_to(old[2], group_by))
+    return {
+        "from": from_id,
+        "to": to_id,
+        "size_diff_bytes": sum(statistic.size_diff for statistic in statistics),
+        "allocators": [
+            {
+                **__get_statistic(statistic, group_by),
+                "size_diff_bytes": statistic.size_diff,
+                "count_diff": statistic.count_diff,
+            }
+            for statistic in statistics[:limit]
+        ],
+    }
+
+
+def instrument_sessions(session_factory):
+    """Records the thread each session of the factory was first used on, reported with its identity map."""
+
+    @event.listens_for(session_factory, "after_transaction_create")
+    def after_transaction_create(session, transaction):
+        if "thread" not in session.info:
+            session.info["thread"] = threading.current_thread().name
+
+
+def get_session_stats():
+    """
+    Returns the open ORM sessions, largest identity map first: the objects they hold, by class,
+    and those pending insertion or deletion. Identity maps hold their objects weakly, except the
+    modified ones: a map that keeps growing points at objects kept alive elsewhere, or never flushed.
+    """
+    sessions = []
+    for session in list(orm_session._sessions.values()):
+        # Read from another thread: copy the keys in one step rather than iterate over the live map
+        identity_keys = list(session.identity_map.keys())
+        classes = Counter(key[0].__name__ for key in identity_keys)
+        sessions.append(
+            {
+                "thread": session.info.get("thread"),
+                "identity_map": len(identity_keys),
+                "new": len(session.new),
+                "deleted": len(session.deleted),
+                "in_transaction": session.in_transaction(),
+                "classes": dict(classes.most_common()),
+            }
+        )
+    sessions.sort(key=lambda stats: stats["identity_map"], reverse=True)
+    return sessions
+
+
+def register_queue(name, get_queues):
+    """Reports the memory footprint of an in-memory queue, returned by get_queues (or a list of them)."""
+    __queues[name] = get_queues
+
+
+def get_queue_footprints():
+    """Returns the items of every registered queue, and their estimated size in bytes."""
+    footprints = {}
+    for name, get_queues in list(__queues.items()):
+        queues = get_queues()
+        if not isinstance(queues, (list, tuple)):
+            queues = [queues]
+
+        items = 0
+        sized_items = []
+        for queue in queues:
+            items += queue.qsize()
+            sized_items += __get_items(queue)
+        if sized_items:
+            # Items shared by several queued entries (e.g. the same request form) are counted once
+            size = __get_size(sized_items) - sys.getsizeof(sized_items)
+            size = round(size * max(items, len(sized_items)) / len(sized_items))
+        else:
+            size = 0
+        footprints[name] = {"items": items, "bytes": size}
+    return footprints
+
+
+def get_process_stats():
+    """Returns the resident memory of the process, its peak, and the garbage collector's state."""
+    return {
+        "rss_bytes": get_rss(),
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "threads": threading.active_count(),
+        "gc_counts": gc.get_count(),
+        "gc_uncollectable": len(gc.garbage),
+    }
+
+
+def get_tracing_stats():
+    if not tracemalloc.is_tracing():
+        return {"tracing": False}
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "frames": tracemalloc.get_traceback_limit(),
+        "traced_bytes": current,
+        "peak_traced_bytes": peak,
+        "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+    }
+
+
+def get_rss():
+    """Returns the resident memory of the process in bytes, or None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def __take_snapshot():
+    if not tracemalloc.is_tracing():
+        raise TracingNotStartedError("Allocations aren't traced, start tracing first")
+    return tracemalloc.take_snapshot()
+
+
+def __get_statistics(statistics):
+    return [
+        statistic
+        for statistic in statistics
+        if statistic.traceback[-1].filename not in __IGNORED_FILES
+    ]
+
+
+def __get_snapshot_summary(snapshot_id, taken_at, traced_bytes):
+    return {
+        "id": snapshot_id,
+        "taken_at": datetime.fromtimestamp(taken_at, timezone.utc)
+        .isoformat(timespec="seconds")
+        .replace("+00:00", "Z"),
+        "traced_bytes": traced_bytes,
+    }
+
+
+def __get_statistic(statistic, group_by):
+    frame = statistic.traceback[-1]
+    entry = {
+        "location": (
+            frame.filename
+            if group_by == "filename"
+            else f"{frame.filename}:{frame.lineno}"
+        ),
+        "size_bytes": statistic.size,
+        "count": statistic.count,
+    }
+    if group_by == "traceback":
+        # Most recent call first
+        entry["traceback"] = [
+            f"{frame.filename}:{frame.lineno}"
+            for frame in reversed(statistic.traceback)
+        ]
+    return entry
+
+
+def __get_items(queue):
+    """Returns up to MAX_SIZED_ITEMS items of a queue.Queue, copied under its lock (other queues: none)."""
+    mutex = getattr(queue, "mutex", None)
+    items = getattr(queue, "queue", None)
+    if mutex is None or items is None:
+        return []
+    with mutex:
+        return list(itertools.islice(items, MAX_SIZED_ITEMS))
+
+
+def __get_size(root):
+    """Returns the size of an object and the containers it holds, each object counted once."""
+    seen = set()
+    size = 0
+    pending = [(root, 0)]
+    while pending:
+        obj, depth = pending.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if depth >= MAX_SIZE_DEPTH:
+            continue
+        if isinstance(obj, dict):
+            pending.extend((item, depth + 1) for pair in obj.items() for item in pair)
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            pending.extend((item, depth + 1) for item in obj)
+    return size
+
+
+metrics.gauge(
+    "process_resident_memory_bytes",
+    "Resident memory of the process.",
+    callback=lambda: get_rss() or 0,
+)
+metrics.gauge(
+    "orm_session_identity_map_objects",
+    "Objects held in the identity maps of the open ORM sessions.",
+    callback=lambda: sum(stats["identity_map"] for stats in get_session_stats()),
+)
@@ -0,0 +1,260 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a fast database write to a slow API call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Metric:
+    """
+    A metric and its labelled series. Series are updated without a shared lock: each thread updates
+    its own shard of the values, and the shards are added up when the metric is collected.
+    The shards of finished threads are added to retired totals, so short-lived threads don't pile up.
+    A metric defined with a callback has no series of its own; the callback returns them when
+    collected, as a value or {label values tuple: value}.
+    """
+
+    type = None
+
+    def __init__(self, name, help, labels=(), callback=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._shards = []  # (thread, its values)
+        self._retired = {}  # label values -> values of the finished threads
+        self._local = threading.local()
+
+    def collect(self):
+        """Returns the metric's samples: [(suffix, {label: value}, value)]."""
+        if self.callback is not None:
+            values = self.callback()
+            if not isinstance(values, dict):
+                values = {(): values}
+        else:
+            values = self._get_totals()
+        return [
+            ("", dict(zip(self.labels, label_values)), value)
+            for label_values, value in sorted(values.items())
+        ]
+
+    def _check_labels(self, label_values):
+        if len(label_values) != len(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}")
+
+    def _get_shard(self, label_values):
+        """Returns this thread's values of the series, creating them on first use."""
+        self._check_labels(label_values)
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._retire_shards()
+                self._shards.append((threading.current_thread(), shard))
+        values = shard.get(label_values)
+        if values is None:
+            # Dict writes are atomic, collect() may read a series it hasn't seen yet
+            values = shard[label_values] = self._new_values()
+        return values
+
+    def _get_totals(self):
+        # Metrics without labels report their single series from the start, at zero
+        totals = {} if self.labels else {(): self._new_values()}
+        with self._lock:
+            self._retire_shards()
+            self._add_shard(totals, self._retired)
+            shards = [shard for thread, shard in self._shards]
+        for shard in shards:
+            self._add_shard(totals, shard)
+        return {
+            label_values: self._get_value(total)
+            for label_values, total in totals.items()
+        }
+
+    def _retire_shards(self):
+        """Adds the shards of finished threads to the retired totals. Called under the lock."""
+        live_shards = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live_shards.append((thread, shard))
+            else:
+                self._add_shard(self._retired, shard)
+        self._shards = live_shards
+
+    def _add_shard(self, totals, shard):
+        for label_values, values in list(shard.items()):
+            total = totals.setdefault(label_values, self._new_values())
+            for index, value in enumerate(values):
+                total[index] += value
+
+    def _new_values(self):
+        return [0]
+
+    def _get_value(self, values):
+        return values[0]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *label_values, amount=1):
+        self._get_shard(label_values)[0] += amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down. Set values are shared by all threads, under the metric's lock."""
+
+    type = "gauge"
+
+    def __init__(self, name, help, labels=(), callback=None):
+        super().__init__(name, help, labels, callback)
+        self.__values = {}
+
+    def set(self, value, *label_values):
+        self._check_labels(label_values)
+        with self._lock:
+            self.__values[label_values] = value
+
+    def inc(self, *label_values, amount=1):
+        self._check_labels(label_values)
+        with self._lock:
+            self.__values[label_values] = self.__values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def _get_totals(self):
+        with self._lock:
+            return dict(self.__values)
+
+
+class Histogram(Metric):
+    """Observations counted in cumulative buckets (upper bounds, in seconds for latencies), with their sum."""
+
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def observe(self, value, *label_values):
+        values = self._get_shard(label_values)
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        """Observes the duration of the block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def collect(self):
+        samples = []
+        for label_values, values in sorted(self._get_totals().items()):
+            labels = dict(zip(self.labels, label_values))
+            count = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), values):
+                count += bucket_count
+                samples.append(("_bucket", {**labels, "le": bound}, count))
+            samples.append(("_sum", labels, values[-1]))
+            samples.append(("_count", labels, count))
+        return samples
+
+    def _new_values(self):
+        # Per bucket, then +Inf, then the sum of the observations
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def _get_value(self, values):
+        return values
+
+
+class Registry:
+    """The metrics of the process, exposed in the Prometheus text format."""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__metrics = {}
+
+    def register(self, metric):
+        with self.__lock:
+            if metric.name in self.__metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self.__metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self.__metrics.get(name)
+
+    def render(self):
+        """Returns the metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.collect()
+            except Exception:
+                continue  # A failing callback doesn't take the other metrics down
+            lines.append(f"# HELP {metric.name} {self.__escape_help(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in samples:
+                lines.append(
+                    f"{metric.name}{suffix}{self.__format_labels(labels)} {self.__format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def __escape_help(text):
+        return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+    @classmethod
+    def __format_labels(cls, labels):
+        if not labels:
+            return ""
+        pairs = ",".join(
+            f'{name}="{cls.__escape_label(cls.__format_value(value))}"'
+            for name, value in labels.items()
+        )
+        return "{" + pairs + "}"
+
+    @staticmethod
+    def __escape_label(value):
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    @staticmethod
+    def __format_value(value):
+        if value is None:
+            return "NaN"
+        if isinstance(value, float):
+            if math.isinf(value):
+                return "+Inf" if value > 0 else "-Inf"
+            return repr(value)
+        return str(value)
+
+
+# Registry used by the module-level helpers below
+registry = Registry()
+
+
+def counter(name, help, labels=(), callback=None):
+    return registry.register(Counter(name, help, labels, callback))
+
+
+def gauge(name, help, labels=(), callback=None):
+    return registry.register(Gauge(name, help, labels, callback))
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    return registry.register(Histogram(name, help, labels, buckets))
+
+
+def render():
+    return registry.render()
@@ -1,34 +1,34 @@
 import os
 
-from utils import logger, slackbot
+from utils import logger, slack_outbox
 
 APP_STATIC_DOMAIN = os.getenv("APP_STATIC_DOMAIN", "http://localhost:5000")
 
 
-def inform(message, logger_name="general"):
+def inform(message, logger_name="general", **fields):
     """
-    Sends an information message to the specified logger and to Slack.
-    Default logger name is "general".
+    Sends an information message to the specified logger and queues it for Slack.
+    Default logger name is "general". Fields (e.g. reservation_id) are logged with the message.
     """
-    logger.log_inform(message, logger_name)
-    slackbot.message_channel(message)
+    logger.log_inform(message, logger_name, **fields)
+    slack_outbox.post(message)
 
 
-def warn(message):
+def warn(message, **fields):
     """
-    Sends a warning message to the warning log and to Slack.
+    Sends a warning message to the warning log and queues a pointer to it for Slack.
     """
-    logger.log_warning(message)
-    slackbot.message_channel(
+    logger.log_warning(message, **fields)
+    slack_outbox.post(
         f"Warning issued, see 'Warnings' log for details: {APP_STATIC_DOMAIN}/logs/warnings\n"
     )
 
 
-def error(message):
+def error(message, **fields):
     """
-    Sends an error message to the error log and to Slack.
+    Sends an error message to the error log and queues a pointer to it for Slack.
     """
-    logger.log_error(message)
-    slackbot.message_channel(
+    logger.log_error(message, **fields)
+    slack_outbox.post(
         f"Error issued, see 'Errors' log for details: {APP_STATIC_DOMAIN}/logs/errors\n"
     )
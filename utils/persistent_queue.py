@@ -0,0 +1,261 @@
+import time
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from queue import Empty
+
+from sqlalchemy import event, select, update, delete, insert, func, case
+
+import models
+
+# A claimed queue entry: the row id is needed to acknowledge it once processed
+QueuedItem = namedtuple(
+    "QueuedItem",
+    ["id", "payload", "attempts", "enqueued_at", "trace_id"],
+    defaults=(None,),
+)
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class PersistentQueue:
+    """
+    Durable job queue stored in the `job_queue` table.
+
+    Mirrors the parts of `queue.Queue` used by the workers (put/get/task_done) so it
+    can replace an in-memory queue without changing producers or consumers.
+    Entries are claimed with `SELECT ... FOR UPDATE SKIP LOCKED` on Postgres (a single
+    atomic UPDATE on SQLite, which runs in WAL mode) and stay invisible to other
+    consumers for `visibility_timeout` seconds. Entries that are not acknowledged
+    within that window are redelivered, until `max_attempts` is reached.
+
+    A `None` put is never persisted: it is delivered to the next local `get()` as the
+    worker shutdown sentinel, leaving any pending entries in storage for the next run.
+    """
+
+    def __init__(self, name, visibility_timeout=300, max_attempts=5, poll_interval=0.5):
+        self.name = name
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._engine = None
+        self._sentinels = 0
+        self._not_empty = threading.Condition()
+        self._local = threading.local()  # Entries claimed by get(), per thread
+
+    def bind(self, engine):
+        """Binds the queue to the SQLAlchemy engine holding the `job_queue` table."""
+        if engine.dialect.name == "sqlite":
+            self._enable_sqlite_wal(engine)
+        self._engine = engine
+
+    def put(self, payload, trace_id=None):
+        """
+        Persists a payload at the tail of the queue. `None` enqueues a shutdown sentinel.
+        The trace id, if any, is returned with the claimed entry.
+        """
+        if payload is None:
+            with self._not_empty:
+                self._sentinels += 1
+                self._not_empty.notify()
+            return
+
+        now = _utcnow()
+        table = models.QueuedJob.__table__
+        with self.__get_engine().begin() as connection:
+            connection.execute(
+                insert(table).values(
+                    queue_name=self.name,
+                    payload=payload,
+                    attempts=0,
+                    enqueued_at=now,
+                    available_at=now,
+                    trace_id=trace_id,
+                )
+            )
+
+        with self._not_empty:
+            self._not_empty.notify()
+
+    def get(self, block=True, timeout=None):
+        """
+        Claims the oldest available payload and returns it.
+        The entry is acknowledged by the next `task_done()` call from the same thread.
+        Raises `queue.Empty` if nothing is available (non-blocking or timed out).
+        """
+        items = self.get_batch(1, block=block, timeout=timeout)
+        item = items[0]
+        self._local.claimed = [] if item is None else [item.id]
+        return None if item is None else item.payload
+
+    def get_batch(self, max_items, block=True, timeout=None):
+        """
+        Claims up to `max_items` available entries and returns them as `QueuedItem`s
+        in enqueue order. Blocks until at least one entry (or a sentinel) is available.
+        A pending sentinel is returned as a trailing `None` item.
+        Claimed entries must be acknowledged with `ack()`.
+        Raises `queue.Empty` if nothing is available (non-blocking or timed out).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            items = self.__claim(max_items)
+            with self._not_empty:
+                if self._sentinels and len(items) < max_items:
+                    self._sentinels -= 1
+                    items.append(None)
+                if items:
+                    return items
+
+                if not block:
+                    raise Empty
+                wait_time = self.poll_interval
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Empty
+                    wait_time = min(wait_time, remaining)
+
+                # Local puts wake us up immediately, other processes are picked up by polling
+                self._not_empty.wait(wait_time)
+
+    def task_done(self):
+        """Acknowledges the entry most recently returned by `get()` on this thread."""
+        claimed = getattr(self._local, "claimed", [])
+        self._local.claimed = []
+        self.ack(claimed)
+
+    def ack(self, item_ids):
+        """Removes processed entries from the queue."""
+        item_ids = [item_id for item_id in item_ids if item_id is not None]
+        if not item_ids:
+            return
+
+        table = models.QueuedJob.__table__
+        with self.__get_engine().begin() as connection:
+            connection.execute(delete(table).where(table.c.id.in_(item_ids)))
+
+    def extend_lease(self, item_ids):
+        """
+        Keeps claimed entries invisible to other consumers for another `visibility_timeout` seconds,
+        for entries held longer than that before being acknowledged.
+        """
+        item_ids = [item_id for item_id in item_ids if item_id is not None]
+        if not item_ids:
+            return
+
+        table = models.QueuedJob.__table__
+        with self.__get_engine().begin() as connection:
+            connection.execute(
+                update(table)
+                .where(table.c.id.in_(item_ids))
+                .values(
+                    available_at=_utcnow() + timedelta(seconds=self.visibility_timeout)
+                )
+            )
+
+    def qsize(self):
+        """Returns the number of live entries (ready and in flight)."""
+        stats = self.stats()
+        return stats["ready"] + stats["in_flight"]
+
+    def stats(self):
+        """
+        Returns queue depth and lag statistics:
+        ready, in_flight and dead entry counts, and the age in seconds of the oldest
+        ready entry (`lag_seconds`) and of the oldest live entry (`oldest_age_seconds`).
+        """
+        now = _utcnow()
+        table = models.QueuedJob.__table__
+        live = table.c.attempts < self.max_attempts
+        ready = live & (table.c.available_at <= now)
+        in_flight = live & (table.c.available_at > now)
+
+        query = select(
+            func.sum(case((ready, 1), else_=0)),
+            func.sum(case((in_flight, 1), else_=0)),
+            func.sum(case((~live, 1), else_=0)),
+            func.min(case((ready, table.c.enqueued_at), else_=None)),
+            func.min(case((live, table.c.enqueued_at), else_=None)),
+        ).where(table.c.queue_name == self.name)
+
+        with self.__get_engine().connect() as connection:
+            row = connection.execute(query).one()
+
+        return {
+            "ready": row[0] or 0,
+            "in_flight": row[1] or 0,
+            "dead": row[2] or 0,
+            "lag_seconds": self._age_seconds(row[3], now),
+            "oldest_age_seconds": self._age_seconds(row[4], now),
+        }
+
+    def __claim(self, max_items):
+        """Atomically leases up to `max_items` available entries to the caller."""
+        now = _utcnow()
+        table = models.QueuedJob.__table__
+
+        candidates = (
+            select(table.c.id)
+            .where(
+                table.c.queue_name == self.name,
+                table.c.available_at <= now,
+                table.c.attempts < self.max_attempts,
+            )
+            .order_by(table.c.id)
+            .limit(max_items)
+            .with_for_update(skip_locked=True)
+        )
+        claim = (
+            update(table)
+            .where(table.c.id.in_(candidates.scalar_subquery()))
+            .values(
+                available_at=now + timedelta(seconds=self.visibility_timeout),
+                attempts=table.c.attempts + 1,
+            )
+            .returning(
+                table.c.id,
+                table.c.payload,
+                table.c.attempts,
+                table.c.enqueued_at,
+                table.c.trace_id,
+            )
+        )
+
+        with self.__get_engine().begin() as connection:
+            rows = connection.execute(claim).all()
+
+        return sorted((QueuedItem(*row) for row in rows), key=lambda item: item.id)
+
+    def __get_engine(self):
+        if self._engine is None:
+            raise RuntimeError(
+                f"Persistent queue '{self.name}' is not bound to a database engine"
+            )
+        return self._engine
+
+    @staticmethod
+    def _age_seconds(timestamp, now):
+        if timestamp is None:
+            return 0.0
+        if isinstance(
+            timestamp, str
+        ):  # Aggregates over SQLite DATETIME come back as text
+            timestamp = datetime.fromisoformat(timestamp)
+        return max((now - timestamp).total_seconds(), 0.0)
+
+    @staticmethod
+    def _enable_sqlite_wal(engine):
+        """Switches a SQLite database to WAL mode so producers and consumers don't block each other."""
+
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.close()
+
+        event.listen(engine, "connect", set_sqlite_pragmas)
+        engine.dispose()  # Make sure pooled connections pick up the pragmas
@@ -0,0 +1,196 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+# Sampling profiler: time between two samples of every thread's stack, and longest run allowed
+DEFAULT_SAMPLE_INTERVAL_SECONDS = 0.01
+MIN_SAMPLE_INTERVAL_SECONDS = 0.001
+MAX_PROFILE_SECONDS = 120
+
+# Frames kept per sampled stack, from the thread's entry point
+MAX_STACK_DEPTH = 200
+
+# Events profiled per event type at most, once armed
+MAX_PROFILED_EVENTS = 1000
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a sampling profile is requested while another one is running."""
+
+
+# Only one sampling profile runs at a time
+__sampling_lock = threading.Lock()
+
+# Frame labels per code object, e.g. "handle_event (handlers/hostaway_event_handler.py:11)"
+__frame_labels = {}
+
+# Per-event cProfile: event type -> {"remaining", "profiled", "stats"}
+__event_profiles_lock = threading.Lock()
+__event_profiles = {}
+
+
+def sample_stacks(
+    seconds, interval=DEFAULT_SAMPLE_INTERVAL_SECONDS, thread_filter=None
+):
+    """
+    Samples the stack of every thread (except the calling one) each interval, for the given seconds.
+    Returns (Counter of collapsed stacks, number of samples, seconds spent sampling). A collapsed stack
+    is "thread name;outermost frame;...;innermost frame", the input format of flame graph tools.
+    thread_filter keeps the threads whose name contains it. Raises ProfilerBusyError if a profile is running.
+    """
+    if not __sampling_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+
+    try:
+        own_thread_id = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        sampling_time = 0.0
+        deadline = time.monotonic() + seconds
+        next_sample = time.monotonic()
+        while next_sample < deadline:
+            sample_start = time.perf_counter()
+            thread_names = {
+                thread.ident: thread.name for thread in threading.enumerate()
+            }
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread_id:
+                    continue
+                thread_name = thread_names.get(thread_id, f"thread-{thread_id}")
+                if thread_filter and thread_filter not in thread_name:
+                    continue
+                stacks[__collapse(thread_name, frame)] += 1
+            samples += 1
+            sampling_time += time.perf_counter() - sample_start
+
+            # Sample on a fixed schedule; a late sample doesn't shift the next ones
+            next_sample += interval
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_sample = time.monotonic()
+        return stacks, samples, sampling_time
+    finally:
+        __sampling_lock.release()
+
+
+def format_collapsed(stacks):
+    """Formats collapsed stacks as text, one "stack count" line each (e.g. for flamegraph.pl or speedscope)."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def arm_event_profile(event_type, count):
+    """Profiles the next count events of the type with cProfile, adding their statistics up."""
+    with __event_profiles_lock:
+        __event_profiles[event_type] = {
+            "remaining": min(count, MAX_PROFILED_EVENTS),
+            "profiled": 0,
+            "stats": None,
+        }
+
+
+def disarm_event_profile(event_type):
+    """Stops profiling the event type and discards its statistics. Returns False if it wasn't armed."""
+    with __event_profiles_lock:
+        return __event_profiles.pop(event_type, None) is not None
+
+
+def profile_event(event_type):
+    """
+    Returns a context manager profiling the block with cProfile if profiling is armed for the event type.
+    Only the calling thread is profiled: other events are unaffected.
+    """
+    # Fast path, on every event: nothing armed for this event type
+    if event_type not in __event_profiles:
+        return nullcontext()
+    return __profile_event(event_type)
+
+
+@contextmanager
+def __profile_event(event_type):
+    with __event_profiles_lock:
+        event_profile = __event_profiles.get(event_type)
+        if event_profile is None or event_profile["remaining"] <= 0:
+            event_profile = None
+        else:
+            event_profile["remaining"] -= 1
+    if event_profile is None:
+        yield
+        return
+
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is active on this thread (e.g. the event is nested in a profiled one)
+        yield
+        return
+    try:
+        yield
+    finally:
+        profile.disable()
+        with __event_profiles_lock:
+            if event_profile["stats"] is None:
+                event_profile["stats"] = pstats.Stats(profile)
+            else:
+                event_profile["stats"].add(profile)
+            event_profile["profiled"] += 1
+
+
+def get_event_profile(event_type, sort="cumulative", limit=40):
+    """
+    Returns the profiled and remaining event counts, and the statistics of the profiled events
+    as text (the limit functions with the highest sort key), or None if the event type isn't armed.
+    """
+    with __event_profiles_lock:
+        event_profile = __event_profiles.get(event_type)
+        if event_profile is None:
+            return None
+
+        text = ""
+        if event_profile["stats"] is not None:
+            stream = io.StringIO()
+            event_profile["stats"].stream = stream
+            event_profile["stats"].sort_stats(sort).print_stats(limit)
+            text = stream.getvalue()
+        return {
+            "event_type": event_type,
+            "profiled": event_profile["profiled"],
+            "remaining": event_profile["remaining"],
+            "stats": text,
+        }
+
+
+def __collapse(thread_name, frame):
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(__get_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(thread_name.replace(";", ":"))
+    return ";".join(reversed(labels))
+
+
+def __get_frame_label(code):
+    label = __frame_labels.get(code)
+    if label is None:
+        label = __frame_labels[code] = (
+            f"{code.co_name} ({__get_relative_path(code.co_filename)}:{code.co_firstlineno})"
+        ).replace(";", ":")
+    return label
+
+
+def __get_relative_path(path):
+    """Returns the path relative to the sys.path entry it was imported from, e.g. utils/logger.py."""
+    candidates = [
+        os.path.relpath(path, entry)
+        for entry in sys.path
+        if entry and path.startswith(entry.rstrip(os.sep) + os.sep)
+    ]
+    return min(candidates, key=len) if candidates else path
@@ -1,32 +1,267 @@
 import time
-from threading import Lock
+from collections import deque, namedtuple
+from threading import Condition
+
+from utils import metrics
+
+# Number of recent grants over which each lane's share of the budget is measured
+SHARE_WINDOW_GRANTS = 100
+
+# A priority lane of a RateLimiter: under contention it gets at least min_share of the recent grants
+Lane = namedtuple("Lane", ["name", "min_share"])
+
+DEFAULT_LANE = "default"
+
+# Adaptive rate control: the rate is cut by DECREASE_FACTOR on every rate-limited response, never below
+# MIN_RATE_FRACTION of the configured rate, and probed back up by PROBE_STEP of the configured rate per
+# successful response once no rate-limited response was seen for PROBE_COOLDOWN_SECONDS
+DECREASE_FACTOR = 0.5
+MIN_RATE_FRACTION = 0.1
+PROBE_STEP = 0.02
+PROBE_COOLDOWN_SECONDS = 10
+
+WAIT_SECONDS = metrics.histogram(
+    "rate_limiter_wait_seconds",
+    "Time callers were blocked waiting for a rate limiter token.",
+    labels=("limiter", "lane"),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+RATE_LIMITED = metrics.counter(
+    "rate_limiter_rate_limited_total",
+    "Rate-limited (HTTP 429) responses reported to a rate limiter.",
+    labels=("limiter",),
+)
 
 
 class RateLimiter:
-    def __init__(self, rate_limit_per_second):
+    """
+    Token bucket rate limiter: holds up to capacity tokens, refilled at rate_limit_per_second.
+    Each request takes a token, so up to capacity requests can go out in a burst.
+    An optional window_limit=(max_requests, seconds) additionally caps the requests in any sliding
+    window, for APIs whose limit is defined per window (a bucket alone allows capacity + rate * window).
+    Blocked threads are served in FIFO order.
+
+    Callers can be split into priority lanes (a sequence of Lane, highest priority first) sharing the
+    budget: a freed token goes to the highest-priority lane with waiters, unless a lower lane has
+    fallen below its min_share of the last SHARE_WINDOW_GRANTS grants.
+
+    The rate adapts to the API's responses: callers report them with on_rate_limited() and on_success().
+    A rate-limited response pauses every caller for its Retry-After and lowers the rate, which then
+    slowly climbs back to rate_limit_per_second.
+
+    Waits and rate-limited responses are reported in the metrics, labelled with the limiter's name.
+    """
+
+    def __init__(
+        self,
+        rate_limit_per_second,
+        capacity=1,
+        window_limit=None,
+        lanes=None,
+        name="default",
+    ):
+        self.name = name
         self.rate_limit = rate_limit_per_second
-        self.allowance = 1.0  # Start with the full allowance
+        self.rate = rate_limit_per_second  # Current rate, up to rate_limit
+        self.min_rate = rate_limit_per_second * MIN_RATE_FRACTION
+        self.capacity = capacity
+        self.window_limit = window_limit
+        self.allowance = float(capacity)  # Start with a full bucket
         self.last_check = time.monotonic()
-        self.lock = (
-            Lock()
-        )  # Lock to prevent race conditions in a multi-threaded environment
+        # Lock to prevent race conditions in a multi-threaded environment
+        self.lock = Condition()
+
+        self.__grant_times = deque(maxlen=window_limit[0] if window_limit else 1)
+        self.__paused_until = 0.0
+        self.__last_rate_limited = None
+        self.__rate_limited = 0
+        self.lanes = tuple(lanes or (Lane(DEFAULT_LANE, 0.0),))
+        self.__waiters = {lane.name: deque() for lane in self.lanes}
+        self.__recent_lanes = deque(maxlen=SHARE_WINDOW_GRANTS)
+        self.__lane_stats = {
+            lane.name: {"granted": 0, "waits": 0, "total_wait": 0.0, "max_wait": 0.0}
+            for lane in self.lanes
+        }
 
-    def can_proceed(self):
+    def can_proceed(self, lane=None):
+        """Takes a token if one is available and no thread is waiting for one. Never blocks."""
         # Assumes the rate-limited function is called as soon as can_proceed() returns True
+        lane = self.__get_lane_name(lane)
+        with self.lock:
+            if self.__has_waiters() or self.__get_delay(time.monotonic()) > 0:
+                return False
+            self.__grant(lane, time.monotonic(), 0.0)
+            return True
+
+    def wait_until_can_proceed(self, timeout=None, lane=None):
+        """
+        Blocks until a token is available, sleeping exactly until the next refill.
+        Waiting threads are served by lane, then in arrival order.
+        Returns False if the timeout elapsed first.
+        """
+        lane = self.__get_lane_name(lane)
+        with self.lock:
+            start = time.monotonic()
+            ticket = object()
+            self.__waiters[lane].append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = (
+                        self.__get_delay(now)
+                        if self.__get_next_ticket() is ticket
+                        else None
+                    )
+                    if delay == 0:
+                        self.__grant(lane, now, now - start)
+                        return True
+
+                    if timeout is not None:
+                        remaining = start + timeout - now
+                        if remaining <= 0:
+                            return False
+                        delay = remaining if delay is None else min(delay, remaining)
+
+                    # Without a delay, sleep until the thread ahead is served
+                    self.lock.wait(delay)
+            finally:
+                self.__waiters[lane].remove(ticket)
+                self.lock.notify_all()
+
+    def on_rate_limited(self, retry_after=None):
+        """
+        Reports a rate-limited (HTTP 429) response. Every caller is paused for retry_after seconds, the
+        bucket is emptied and the rate is lowered. Further rate-limited responses during the pause don't lower it again.
+        """
         with self.lock:
-            current_time = time.monotonic()
-            time_passed = current_time - self.last_check
-
-            # Calculate the new allowance based on the time passed
-            self.allowance += time_passed * self.rate_limit
-            self.last_check = current_time
-
-            # Check if there is enough allowance to proceed
-            if self.allowance >= 1.0:
-                self.allowance = 0.0
-                return True
-            return False
-
-    def wait_until_can_proceed(self):
-        while not self.can_proceed():
-            time.sleep(0.1)
+            now = time.monotonic()
+            self.__refill(now)
+            self.__rate_limited += 1
+            RATE_LIMITED.inc(self.name)
+            if now >= self.__paused_until:
+                self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+            self.allowance = min(self.allowance, 0.0)
+            self.__paused_until = max(self.__paused_until, now + (retry_after or 0))
+            self.__last_rate_limited = now
+            self.lock.notify_all()
+
+    def on_success(self):
+        """Reports a response that wasn't rate limited, probing the rate back up after a cooldown."""
+        with self.lock:
+            if self.rate >= self.rate_limit:
+                return
+            now = time.monotonic()
+            if now - self.__last_rate_limited < PROBE_COOLDOWN_SECONDS:
+                return
+            self.__refill(now)
+            self.rate = min(self.rate_limit, self.rate + self.rate_limit * PROBE_STEP)
+
+    def stats(self):
+        """Returns the limiter's configuration, available tokens and wait-time counters, overall and per lane."""
+        with self.lock:
+            self.__refill(time.monotonic())
+            lanes = {
+                lane.name: {
+                    "min_share": lane.min_share,
+                    "waiting": len(self.__waiters[lane.name]),
+                    **self.__summarize(self.__lane_stats[lane.name]),
+                }
+                for lane in self.lanes
+            }
+            totals = {
+                key: sum(stats[key] for stats in self.__lane_stats.values())
+                for key in ("granted", "waits", "total_wait")
+            }
+            totals["max_wait"] = max(
+                stats["max_wait"] for stats in self.__lane_stats.values()
+            )
+            return {
+                "rate_limit": self.rate_limit,
+                "rate": round(self.rate, 3),
+                "capacity": self.capacity,
+                "tokens": round(self.allowance, 2),
+                "rate_limited": self.__rate_limited,
+                "paused_ms": round(
+                    max(self.__paused_until - time.monotonic(), 0.0) * 1000, 2
+                ),
+                "waiting": sum(lane["waiting"] for lane in lanes.values()),
+                **self.__summarize(totals),
+                "lanes": lanes,
+            }
+
+    def __refill(self, now):
+        # No tokens accrue while paused, so the pause isn't followed by a burst
+        time_passed = max(now - max(self.last_check, self.__paused_until), 0.0)
+        self.allowance = min(self.capacity, self.allowance + time_passed * self.rate)
+        self.last_check = now
+
+    def __get_delay(self, now):
+        """Returns how long until a request can be granted, refilling the bucket first."""
+        self.__refill(now)
+        delay = max((1.0 - self.allowance) / self.rate, 0.0) + max(
+            self.__paused_until - now, 0.0
+        )
+
+        if self.window_limit and len(self.__grant_times) == self.window_limit[0]:
+            # The oldest of the last max_requests grants must have left the window
+            window_delay = self.__grant_times[0] + self.window_limit[1] - now
+            delay = max(delay, window_delay, 0.0)
+
+        return delay
+
+    def __get_lane_name(self, lane):
+        lane = lane or self.lanes[0].name
+        if lane not in self.__waiters:
+            raise ValueError(f"Unknown rate limiter lane: {lane}")
+        return lane
+
+    def __has_waiters(self):
+        return any(self.__waiters.values())
+
+    def __get_next_ticket(self):
+        """Returns the waiting ticket to serve next: the head of the lane most below its share, else of the highest-priority lane."""
+        waiting_lanes = [lane for lane in self.lanes if self.__waiters[lane.name]]
+        if not waiting_lanes:
+            return None
+
+        recent_grants = len(self.__recent_lanes)
+        if recent_grants:
+            shortfalls = [
+                (
+                    lane.min_share
+                    - self.__recent_lanes.count(lane.name) / recent_grants,
+                    lane,
+                )
+                for lane in waiting_lanes
+            ]
+            shortfall, lane = max(shortfalls, key=lambda item: item[0])
+            if shortfall > 0:
+                return self.__waiters[lane.name][0]
+
+        return self.__waiters[waiting_lanes[0].name][0]
+
+    def __grant(self, lane, now, waited):
+        self.allowance -= 1.0
+        self.__grant_times.append(now)
+        self.__recent_lanes.append(lane)
+
+        stats = self.__lane_stats[lane]
+        stats["granted"] += 1
+        WAIT_SECONDS.observe(waited, self.name, lane)
+        if waited > 0:
+            stats["waits"] += 1
+            stats["total_wait"] += waited
+            stats["max_wait"] = max(stats["max_wait"], waited)
+
+    @staticmethod
+    def __summarize(stats):
+        return {
+            "granted": stats["granted"],
+            "waits": stats["waits"],
+            "average_wait_ms": (
+                round(stats["total_wait"] / stats["waits"] * 1000, 2)
+                if stats["waits"]
+                else 0.0
+            ),
+            "max_wait_ms": round(stats["max_wait"] * 1000, 2),
+        }
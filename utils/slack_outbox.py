@@ -0,0 +1,208 @@
+import atexit
+import time
+from queue import Queue, Empty, Full
+from threading import Thread, Lock, Condition
+
+from utils import logger, slackbot, metrics, tracing, memory
+
+# Messages posted within this window of the first one are sent together, as one Slack message per channel
+COALESCE_WINDOW_SECONDS = 1.0
+
+# Messages waiting to be sent; producers drop (and log) messages past this backlog rather than block
+MAX_QUEUED_MESSAGES = 1000
+
+# Slack truncates messages longer than 40,000 characters; stay well below it
+MAX_MESSAGE_LENGTH = 4000
+
+# Time given to the queued messages to go out when the process exits
+EXIT_FLUSH_TIMEOUT_SECONDS = 5
+
+
+class SlackOutbox:
+    """
+    Outbound Slack message queue, drained by its own sender thread so producers never wait on Slack.
+    Messages posted within COALESCE_WINDOW_SECONDS are grouped by channel into multi-line posts
+    (identical lines once, with a count), which the sender sends through slackbot.message_channel
+    and thus Slack's shared rate limiter. The sender thread is started on the first post.
+    """
+
+    def __init__(
+        self,
+        send=None,
+        coalesce_window=COALESCE_WINDOW_SECONDS,
+        max_queued_messages=MAX_QUEUED_MESSAGES,
+    ):
+        self.send = send
+        self.coalesce_window = coalesce_window
+        self.__queue = Queue(maxsize=max_queued_messages)
+        self.__lock = Lock()
+        self.__idle = Condition(self.__lock)
+        self.__unsent = 0
+        self.__sender_thread = None
+        self.__stats = {"queued": 0, "dropped": 0, "sent_posts": 0, "failed_posts": 0}
+
+    def post(self, message, channel_id=None):
+        """
+        Queues a message for the channel (default: slackbot's default channel) without blocking.
+        Returns False if the message was dropped because the queue is full.
+        """
+        self.__ensure_started()
+        with self.__lock, tracing.span("notify"):
+            try:
+                self.__queue.put_nowait((channel_id, message))
+            except Full:
+                self.__stats["dropped"] += 1
+                dropped = True
+            else:
+                self.__unsent += 1
+                self.__stats["queued"] += 1
+                dropped = False
+
+        if dropped:
+            logger.log_warning(
+                f"Slack outbox full, dropped message: {message}",
+                logger="slack",
+                bypass_standard=True,
+            )
+        return not dropped
+
+    def flush(self, timeout=None):
+        """Waits until every queued message was sent. Returns False if the timeout elapsed first."""
+        with self.__idle:
+            return self.__idle.wait_for(lambda: self.__unsent == 0, timeout)
+
+    def stats(self):
+        """Returns the queued, dropped, sent and failed counts, and the current backlog."""
+        with self.__lock:
+            return {**self.__stats, "backlog": self.__unsent}
+
+    def get_queue(self):
+        """Returns the queue of (channel id, message) waiting to be sent, e.g. to report its footprint."""
+        return self.__queue
+
+    def __ensure_started(self):
+        with self.__lock:
+            if self.__sender_thread is not None and self.__sender_thread.is_alive():
+                return
+            self.__sender_thread = Thread(
+                target=self.__sender, daemon=True, name="slack-outbox-sender"
+            )
+            self.__sender_thread.start()
+
+    def __sender(self):
+        while True:
+            batch = [self.__queue.get()]
+
+            # Gather what else comes in during the window, so bursts go out as single posts
+            deadline = time.monotonic() + self.coalesce_window
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(
+                        self.__queue.get(timeout=remaining)
+                        if remaining > 0
+                        else self.__queue.get_nowait()
+                    )
+                except Empty:
+                    break
+
+            for channel_id, text in get_posts(batch):
+                try:
+                    (self.send or slackbot.message_channel)(text, channel_id=channel_id)
+                    sent = True
+                except Exception as e:
+                    # Notifying about it would feed the outbox again, only log it
+                    logger.log_error(
+                        f"Error sending Slack message: {e}", logger="slack"
+                    )
+                    sent = False
+                with self.__lock:
+                    self.__stats["sent_posts" if sent else "failed_posts"] += 1
+
+            with self.__idle:
+                self.__unsent -= len(batch)
+                self.__idle.notify_all()
+
+
+def get_posts(batch):
+    """
+    Groups a batch of (channel_id, message) into [(channel_id, text)], one or more posts per channel
+    in order of first appearance. Repeated messages appear once, with the number of repetitions.
+    """
+    counts_by_channel = {}
+    for channel_id, message in batch:
+        counts = counts_by_channel.setdefault(channel_id, {})
+        counts[message] = counts.get(message, 0) + 1
+
+    posts = []
+    for channel_id, counts in counts_by_channel.items():
+        lines = [
+            (message.rstrip() if count == 1 else f"{message.rstrip()} (x{count})")[
+                :MAX_MESSAGE_LENGTH
+            ]
+            for message, count in counts.items()
+        ]
+        text = ""
+        for line in lines:
+            if text and len(text) + 1 + len(line) > MAX_MESSAGE_LENGTH:
+                posts.append((channel_id, text))
+                text = ""
+            text = f"{text}\n{line}" if text else line
+        posts.append((channel_id, text))
+    return posts
+
+
+# Outbox used by the module-level helpers below; replace it with set_outbox (e.g. in tests)
+__outbox = SlackOutbox()
+
+
+def get_outbox():
+    return __outbox
+
+
+def set_outbox(outbox):
+    """Replaces the shared outbox, returning the previous one."""
+    global __outbox
+    previous, __outbox = __outbox, outbox
+    return previous
+
+
+def post(message, channel_id=None):
+    return __outbox.post(message, channel_id)
+
+
+def flush(timeout=None):
+    return __outbox.flush(timeout)
+
+
+def stats():
+    return __outbox.stats()
+
+
+metrics.gauge(
+    "slack_outbox_backlog",
+    "Slack messages queued, not yet sent.",
+    callback=lambda: __outbox.stats()["backlog"],
+)
+metrics.counter(
+    "slack_outbox_messages_total",
+    "Slack messages posted to the outbox, by outcome (queued, or dropped because it was full).",
+    labels=("outcome",),
+    callback=lambda: {
+        ("queued",): __outbox.stats()["queued"],
+        ("dropped",): __outbox.stats()["dropped"],
+    },
+)
+metrics.counter(
+    "slack_outbox_posts_total",
+    "Slack posts sent by the outbox (coalesced messages), by outcome.",
+    labels=("outcome",),
+    callback=lambda: {
+        ("sent",): __outbox.stats()["sent_posts"],
+        ("failed",): __outbox.stats()["failed_posts"],
+    },
+)
+memory.register_queue("slack_outbox", lambda: __outbox.get_queue())
+
+# Give queued notifications a chance to go out before the process exits
+atexit.register(lambda: __outbox.flush(EXIT_FLUSH_TIMEOUT_SECONDS))
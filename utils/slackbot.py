@@ -1,13 +1,12 @@
 import os
-import time
 import requests
-from utils import logger
+from utils import logger, http_transport
 from utils.rate_limiter import RateLimiter
 
 MAX_RETRIES = 3  # Define a maximum number of retries
 
 # Initialize the rate limiter for Slack messages (1 message per second)
-slack_rate_limiter = RateLimiter(rate_limit_per_second=1)
+slack_rate_limiter = RateLimiter(rate_limit_per_second=1, name="slack")
 
 
 def __get_slack_config():
@@ -20,9 +19,10 @@ def __get_slack_config():
     return slack_bot_token, slack_webhook_channel_id
 
 
-def message_channel(message, channel_id=None, retry_count=0):
+def message_channel(message, channel_id=None):
     """
     Sends a message to the specified Slack channel using the Slack Web API.
+    Rate-limited messages are retried once the Retry-After pause, shared by all Slack messages, has passed.
     """
 
     # Fetch the Slack configuration dynamically
@@ -52,32 +52,36 @@ def message_channel(message, channel_id=None, retry_count=0):
     }
     data = {"channel": channel_id, "text": message}
 
-    # Check if the rate limiter allows sending the message
-    slack_rate_limiter.wait_until_can_proceed()
+    for attempt in range(MAX_RETRIES + 1):
+        # Wait until the rate limiter allows sending the message
+        slack_rate_limiter.wait_until_can_proceed()
 
-    try:
-        # Send the message to Slack
-        response = requests.post(url, headers=headers, json=data)
+        try:
+            # Send the message to Slack
+            response = http_transport.post(url, headers=headers, json=data)
+        except requests.exceptions.RequestException as e:
+            logger.log_error(f"Error sending message to Slack: {e}", logger="slack")
+            return
 
-        # Handle rate limit error (HTTP 429)
+        # Handle rate limit error (HTTP 429): pause every Slack message, not just this one
         if response.status_code == 429:
-            if retry_count < MAX_RETRIES:
-                retry_after = int(response.headers.get("Retry-After", 1))
+            retry_after = http_transport.get_retry_after(response, default=1)
+            slack_rate_limiter.on_rate_limited(retry_after)
+            if attempt < MAX_RETRIES:
                 logger.log_warning(
-                    f"Rate limit hit. Retrying after {retry_after} seconds (Attempt {retry_count + 1}/{MAX_RETRIES}).",
+                    f"Rate limit hit. Retrying after {retry_after:g} seconds (Attempt {attempt + 1}/{MAX_RETRIES}).",
                     logger="slack",
                     bypass_standard=True,
                 )
-                time.sleep(retry_after)
-                return message_channel(
-                    message, channel_id, retry_count + 1
-                )  # Retry sending the message
-            else:
-                logger.log_error(
-                    "Max retries reached. Failed to send message due to rate limiting.",
-                    logger="slack",
-                )
-                return
+                continue
+
+            logger.log_error(
+                "Max retries reached. Failed to send message due to rate limiting.",
+                logger="slack",
+            )
+            return
+
+        slack_rate_limiter.on_success()
 
         # Log the response from Slack
         if response.status_code == 200 and response.json().get("ok"):
@@ -86,6 +90,4 @@ def message_channel(message, channel_id=None, retry_count=0):
             )
         else:
             logger.log_error(f"Failed to send message: {response.text}", logger="slack")
-
-    except requests.exceptions.RequestException as e:
-        logger.log_error(f"Error sending message to Slack: {e}", logger="slack")
+        return
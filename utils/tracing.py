@@ -0,0 +1,245 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+
+from utils import logger
+
+# Traces kept in memory for the /traces endpoint, most recent last; the span log keeps them all
+RECENT_TRACES = 1000
+
+# Spans recorded per segment at most (e.g. a payload running thousands of statements)
+MAX_SPANS_PER_SEGMENT = 200
+
+# Segment of the trace being recorded on the current thread (None: no trace, spans are not recorded)
+__current_segment = ContextVar("current_segment", default=None)
+
+__lock = threading.Lock()
+__recent_traces = OrderedDict()  # trace id -> [segments]
+
+
+class Segment:
+    """
+    The part of a trace recorded in one place, e.g. a webhook's reception, then its processing.
+    Spans are (name, start offset, duration, attributes), offsets and durations in seconds.
+    Each span's self time, its duration minus the spans it contains, adds up to the breakdown.
+    """
+
+    def __init__(self, trace_id, name, fields):
+        self.trace_id = trace_id
+        self.name = name
+        self.fields = fields
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+        self.spans = []
+        self.dropped_spans = 0
+        self.breakdown = {}
+        self.open_spans = []  # Per open span: the time spent in the spans it contains
+
+    def add_span(self, name, start, duration, attributes, child_time=0.0):
+        if self.open_spans:
+            self.open_spans[-1] += duration
+        self.breakdown[name] = self.breakdown.get(name, 0.0) + duration - child_time
+        if len(self.spans) < MAX_SPANS_PER_SEGMENT:
+            self.spans.append((name, start - self.start, duration, attributes))
+        else:
+            self.dropped_spans += 1
+
+
+def new_trace_id():
+    return secrets.token_hex(8)
+
+
+@contextmanager
+def trace(trace_id, name, queued_at=None, **fields):
+    """
+    Records a segment of the trace (a new trace if trace_id is None) while the block runs.
+    queued_at, the UTC time the work was queued at, adds the wait before it as a "queue_wait" span.
+    The finished segment is written to the span log ('tracing' log) and kept for the /traces endpoint.
+    """
+    segment = Segment(trace_id or new_trace_id(), name, fields)
+    if queued_at is not None:
+        waited = max(
+            (
+                datetime.now(timezone.utc).replace(tzinfo=None) - queued_at
+            ).total_seconds(),
+            0.0,
+        )
+        segment.start -= waited
+        segment.started_at -= waited
+        segment.add_span("queue_wait", segment.start, waited, {})
+
+    token = __current_segment.set(segment)
+    try:
+        yield segment
+    except Exception as e:
+        segment.error = str(e)
+        raise
+    finally:
+        __current_segment.reset(token)
+        segment.duration = time.perf_counter() - segment.start
+        other = segment.duration - sum(segment.breakdown.values())
+        segment.breakdown["other"] = max(other, 0.0)
+        __record(segment)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Records the block as a span of the current trace segment, if any."""
+    segment = __current_segment.get()
+    if segment is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    segment.open_spans.append(0.0)
+    try:
+        yield
+    finally:
+        child_time = segment.open_spans.pop()
+        segment.add_span(
+            name, start, time.perf_counter() - start, attributes, child_time
+        )
+
+
+def get_trace_id():
+    """Returns the id of the trace recorded on the current thread, or None."""
+    segment = __current_segment.get()
+    return segment.trace_id if segment is not None else None
+
+
+def instrument_engine(engine):
+    """Records the SQL statements run on the engine as "db" spans of the current trace."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        if __current_segment.get() is not None:
+            span_context = span("db", statement=statement.split(None, 1)[0].upper())
+            span_context.__enter__()
+            conn.info.setdefault("trace_spans", []).append(span_context)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            spans.pop().__exit__(None, None, None)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        spans = (
+            context.connection.info.get("trace_spans") if context.connection else None
+        )
+        if spans:
+            spans.pop().__exit__(None, None, None)
+
+
+def get_trace(trace_id):
+    """Returns a recent trace with its segments, oldest first, or None."""
+    with __lock:
+        segments = list(__recent_traces.get(trace_id, []))
+    return __summarize(trace_id, segments) if segments else None
+
+
+def get_slowest_traces(limit=20, min_duration_ms=0):
+    """Returns the slowest recent traces, slowest first, with their breakdown (without their spans)."""
+    with __lock:
+        traces = [
+            (trace_id, list(segments)) for trace_id, segments in __recent_traces.items()
+        ]
+    summaries = [__summarize(trace_id, segments) for trace_id, segments in traces]
+    summaries = [
+        summary for summary in summaries if summary["duration_ms"] >= min_duration_ms
+    ]
+    summaries.sort(key=lambda summary: summary["duration_ms"], reverse=True)
+    return [
+        {key: value for key, value in summary.items() if key != "segments"}
+        for summary in summaries[:limit]
+    ]
+
+
+def clear():
+    with __lock:
+        __recent_traces.clear()
+
+
+def __summarize(trace_id, segments):
+    """A trace spans from its first segment's start to its last segment's end; gaps count as "other"."""
+    start = min(segment.started_at for segment in segments)
+    end = max(segment.started_at + segment.duration for segment in segments)
+    breakdown = {}
+    for segment in segments:
+        for name, duration in segment.breakdown.items():
+            breakdown[name] = breakdown.get(name, 0.0) + duration
+    breakdown["other"] = breakdown.get("other", 0.0) + max(
+        end - start - sum(breakdown.values()), 0.0
+    )
+    return {
+        "trace_id": trace_id,
+        "started_at": datetime.fromtimestamp(start, timezone.utc)
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z"),
+        "duration_ms": __to_ms(end - start),
+        "breakdown_ms": dict(
+            sorted(
+                ((name, __to_ms(duration)) for name, duration in breakdown.items()),
+                key=lambda item: item[1],
+                reverse=True,
+            )
+        ),
+        "segments": [__get_record(segment) for segment in segments],
+    }
+
+
+def __record(segment):
+    with __lock:
+        __recent_traces.setdefault(segment.trace_id, []).append(segment)
+        __recent_traces.move_to_end(segment.trace_id)
+        while len(__recent_traces) > RECENT_TRACES:
+            __recent_traces.popitem(last=False)
+
+    record = __get_record(segment)
+    logger.log_inform(
+        f"Trace {segment.trace_id} {segment.name}: {record['duration_ms']} ms",
+        logger="tracing",
+        **record,
+    )
+
+
+def __get_record(segment):
+    """Returns the segment as a JSON-serializable dict, as written to the span log."""
+    return {
+        "trace_id": segment.trace_id,
+        "segment": segment.name,
+        "started_at": datetime.fromtimestamp(segment.started_at, timezone.utc)
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z"),
+        "duration_ms": __to_ms(segment.duration),
+        "breakdown_ms": {
+            name: __to_ms(duration) for name, duration in segment.breakdown.items()
+        },
+        "spans": [
+            {
+                "name": name,
+                "offset_ms": __to_ms(offset),
+                "duration_ms": __to_ms(duration),
+                **attributes,
+            }
+            for name, offset, duration, attributes in segment.spans
+        ],
+        "dropped_spans": segment.dropped_spans,
+        "error": segment.error,
+        **segment.fields,
+    }
+
+
+def __to_ms(seconds):
+    return round(seconds * 1000, 3)
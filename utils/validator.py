@@ -1,7 +1,8 @@
 import os
 import re
 import bleach
-from sqlalchemy.types import Integer, String, Boolean
+from datetime import date, datetime
+from sqlalchemy.types import Integer, String, Boolean, Date, DateTime
 from sqlalchemy import inspect
 
 import models
@@ -15,6 +16,9 @@ VALID_HOSTAWAY_EVENTS = {
     "reservation": ["reservation.created", "reservation.updated"],
 }
 
+# Columns set by the database or the app, never validated or taken from Hostaway payloads
+MODEL_MANAGED_COLUMNS = {"created_at", "updated_at", "content_hash"}
+
 
 def validate_and_sanitize_slack_input(request_data):
     """
@@ -47,41 +51,46 @@ def validate_and_sanitize_slack_input(request_data):
 
 def validate_hostaway_webhook_payload(payload):
     """
-    Validates a Hostaway webhook payload.
-    Returns a tuple of (success[bool], message[str]).
+    Validates a Hostaway webhook payload. The payload itself is left as received.
+    Returns a tuple of (success[bool], message[str], cleaned_payload[dict or None]), where the cleaned
+    payload is a copy whose data is cleaned (see validate_and_clean_hostaway_payload).
     """
     # Validate structure
     if not payload:
-        return False, "Invalid data format"
+        return False, "Invalid data format", None
     if "object" not in payload:
-        return False, "Invalid data format"
+        return False, "Invalid data format", None
     if "event" not in payload:
-        return False, "Invalid data format"
+        return False, "Invalid data format", None
     if "accountId" not in payload:
-        return False, "Invalid data format"
+        return False, "Invalid data format", None
     if "data" not in payload:
-        return False, "Invalid data format"
+        return False, "Invalid data format", None
     if "id" not in payload["data"]:
-        return False, "Invalid data format"
+        return False, "Invalid data format", None
     if not isinstance(payload["data"], dict):
-        return False, "Invalid data format"
+        return False, "Invalid data format", None
 
     # Validate content
     if str(payload["accountId"]) != str(HOSTAWAY_ACCOUNT_ID):
-        return (False, "Invalid account ID")
+        return False, "Invalid account ID", None
     if payload["object"] not in VALID_HOSTAWAY_EVENTS:
-        return False, f"Invalid object type: {payload['object']}"
+        return False, f"Invalid object type: {payload['object']}", None
     if payload["event"] not in VALID_HOSTAWAY_EVENTS[payload["object"]]:
-        return False, f"Invalid event for {payload['object']}: {payload['event']}"
+        return (
+            False,
+            f"Invalid event for {payload['object']}: {payload['event']}",
+            None,
+        )
 
     # Validate data against models
-    isValidAgainstModel, msg = validate_hostaway_payload_against_model(
+    isValidAgainstModel, msg, cleaned_data = validate_and_clean_hostaway_payload(
         payload["data"], payload["object"]
     )
     if not isValidAgainstModel:
-        return False, msg
+        return False, msg, None
 
-    return True, "Valid payload"
+    return True, "Valid payload", {**payload, "data": cleaned_data}
 
 
 def validate_hostaway_payload_against_model(data, object_type):
@@ -89,53 +98,148 @@ def validate_hostaway_payload_against_model(data, object_type):
     Validates that the data dictionary has the correct types and required fields
     according to the SQLAlchemy model.
     """
-    if object_type == "conversationMessage":
-        model = models.ConversationMessage
-    elif object_type == "task":
-        model = models.Task
-    elif object_type == "reservation":
-        model = models.Reservation
-    else:
-        return False, f"Invalid object type: {object_type}"
+    isValid, msg, _ = validate_and_clean_hostaway_payload(data, object_type)
+    return isValid, msg
 
-    inspector = inspect(model)
 
-    for column in inspector.columns:
-        column_name = column.name
-        column_type = column.type
-        is_nullable = column.nullable
-
-        # Check if the column is required but not present in the data
-        if (
-            not is_nullable
-            and column_name not in data
-            and column_name not in ["created_at", "updated_at"]
-        ):
-            return False, f"Missing required field: {column_name}"
-
-        # If the column is present, validate its type
-        if column_name in data:
-            value = data[column_name]
-
-            # Validate based on the SQLAlchemy column type
-            if value is not None:
-                if isinstance(column_type, Integer) and not isinstance(value, int):
-                    return (
-                        False,
-                        f"Incorrect type for {object_type} field {column_name}: expected int, got {type(value).__name__}",
-                    )
-                elif isinstance(column_type, String) and not isinstance(value, str):
+def validate_and_clean_hostaway_payload(data, object_type):
+    """
+    Validates a Hostaway object against its SQLAlchemy model and returns a cleaned copy in the same pass.
+    The cleaned copy only keeps model columns, with 0/1 booleans and ISO date strings converted.
+    Returns a tuple of (success[bool], message[str], cleaned_data[dict or None]).
+    """
+    model_validator = __compiled_model_validators.get(object_type)
+    if model_validator is None:
+        return False, f"Invalid object type: {object_type}", None
+
+    return model_validator(data)
+
+
+def __compile_model_validator(model, object_type):
+    """
+    Builds a validation and filtering function specialized for the model's columns.
+    Column metadata is resolved once here instead of on every validated payload.
+    """
+    inspector = inspect(model)
+    required_columns = tuple(
+        column.name
+        for column in inspector.columns
+        if not column.nullable and column.name not in MODEL_MANAGED_COLUMNS
+    )
+    # Required columns without a default can't be null; defaulted ones fall back to their default
+    non_null_columns = frozenset(
+        column.name
+        for column in inspector.columns
+        if column.name in required_columns
+        and column.default is None
+        and column.server_default is None
+    )
+    defaulted_columns = frozenset(required_columns) - non_null_columns
+    converters = {
+        column.name: __get_column_converter(column.type)
+        for column in inspector.columns
+        if column.name not in MODEL_MANAGED_COLUMNS
+    }
+
+    def validate_and_clean(data):
+        # Check that required columns are present in the data
+        for column_name in required_columns:
+            if column_name not in data:
+                return False, f"Missing required field: {column_name}", None
+
+        # Validate and convert present columns, dropping unknown fields
+        cleaned_data = {}
+        for column_name, value in data.items():
+            convert = converters.get(column_name)
+            if convert is None:
+                continue
+            if value is None:
+                if column_name in non_null_columns:
+                    return False, f"Null value for required field: {column_name}", None
+                if column_name in defaulted_columns:
+                    continue
+            else:
+                try:
+                    value = convert(value)
+                except (TypeError, ValueError) as e:
                     return (
                         False,
-                        f"Incorrect type for {object_type} field {column_name}: expected str, got {type(value).__name__}",
+                        f"Incorrect type for {object_type} field {column_name}: expected {e.args[0]}, got {type(value).__name__}",
+                        None,
                     )
-                elif isinstance(column_type, Boolean) and not isinstance(
-                    value, int
-                ):  # Hostaway API v1 returns 0 or 1 for all boolean fields
-                    if value not in [0, 1]:
-                        return (
-                            False,
-                            f"Incorrect type for {object_type} field {column_name}: expected bool, got {type(value).__name__}",
-                        )
-
-    return True, "Valid data"
+            cleaned_data[column_name] = value
+
+        return True, "Valid data", cleaned_data
+
+    return validate_and_clean
+
+
+def __get_column_converter(column_type):
+    """Returns a function validating and converting a non-null value for the given SQLAlchemy column type."""
+    if isinstance(column_type, Integer):
+        return __convert_int
+    if isinstance(column_type, String):
+        return __convert_str
+    if isinstance(column_type, Boolean):
+        return __convert_bool
+    if isinstance(column_type, DateTime):
+        return __convert_datetime
+    if isinstance(column_type, Date):
+        return __convert_date
+    return __convert_any
+
+
+def __convert_int(value):
+    if not isinstance(value, int):
+        raise TypeError("int")
+    return value
+
+
+def __convert_str(value):
+    if not isinstance(value, str):
+        raise TypeError("str")
+    return value
+
+
+def __convert_bool(value):
+    # Hostaway API v1 returns 0 or 1 for all boolean fields
+    if not isinstance(value, int):
+        raise TypeError("bool")
+    return bool(value)
+
+
+def __convert_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if not isinstance(value, str):
+        raise TypeError("datetime")
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError("datetime")
+
+
+def __convert_date(value):
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str):
+        raise TypeError("date")
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError("date")
+
+
+def __convert_any(value):
+    return value
+
+
+# Validators compiled once per Hostaway object type at startup
+__compiled_model_validators = {
+    object_type: __compile_model_validator(model, object_type)
+    for object_type, model in (
+        ("conversationMessage", models.ConversationMessage),
+        ("task", models.Task),
+        ("reservation", models.Reservation),
+    )
+}
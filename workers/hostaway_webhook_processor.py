@@ -1,50 +1,438 @@
-from threading import Thread
+import time
+import zlib
+from collections import namedtuple
+from queue import Queue, Empty, Full
+from threading import Lock, Thread
 
-from utils import notifier, logger
-from workers.jobs import hostaway_webhook_queue
+from db import unit_of_work, savepoint, rollback
+from utils import notifier, logger, metrics, tracing, memory
+from workers import jobs
 from handlers import hostaway_event_handler
+from services import reservation_index, hydration_service
 
+DEFAULT_WORKER_COUNT = 4
 
-def worker(app):
+# Maximum number of claimed payloads buffered per partition before the dispatcher
+# stops claiming. Keeps leased payloads well within the queue's visibility timeout.
+PARTITION_QUEUE_SIZE = 100
+
+# Threads of the running pool: [dispatcher, partition workers...], and its partition queues
+__pool_threads = []
+__partition_queues = []
+
+# Ids of the payloads claimed by the dispatcher and not acknowledged yet. They may wait in a partition
+# queue, or be parked, longer than the visibility timeout: the dispatcher renews their lease
+__claimed_ids = set()
+__claimed_lock = Lock()
+
+PAYLOAD_FAILURES = metrics.counter(
+    "hostaway_webhook_payload_failures_total",
+    "Failed attempts to process a Hostaway webhook payload.",
+)
+metrics.gauge(
+    "hostaway_webhook_partition_queue_size",
+    "Payloads dispatched to a partition worker, not yet processed.",
+    labels=("partition",),
+    callback=lambda: {
+        (str(partition),): partition_queue.qsize()
+        for partition, partition_queue in enumerate(__partition_queues)
+    },
+)
+
+memory.register_queue("hostaway_webhook_partitions", lambda: __partition_queues)
+
+# Queued by the hydration thread to wake a partition worker once the reservation
+# its parked payloads were waiting for has been fetched (or failed to be)
+ResumeParked = namedtuple("ResumeParked", ["entity_key"])
+
+
+def get_entity_key(payload):
+    """
+    Returns the key of the entity a payload updates.
+    Payloads with the same key are processed strictly in order, by the same worker.
+    Conversation messages are keyed by their reservation: a conversation belongs to
+    exactly one reservation, and a message may have to create the reservation first.
+    """
+    obj = payload.get("data") if isinstance(payload, dict) else None
+    if not isinstance(obj, dict):
+        return None
+
+    object_type = payload.get("object")
+    if object_type == "conversationMessage":
+        return ("reservation", obj.get("reservationId"))
+
+    return (object_type, obj.get("id"))
+
+
+def get_referenced_reservation_id(payload):
+    """Returns the id of the existing reservation a payload depends on, or None."""
+    obj = payload.get("data") if isinstance(payload, dict) else None
+    if not isinstance(obj, dict):
+        return None
+
+    if payload.get("object") == "conversationMessage":
+        return obj.get("reservationId")
+    if payload.get("event") == "reservation.updated":
+        return obj.get("id")
+    return None
+
+
+def get_log_fields(payload):
+    """Returns the ids of the entities a payload concerns, as fields for its log records."""
+    obj = payload.get("data") if isinstance(payload, dict) else None
+    if not isinstance(obj, dict):
+        return {}
+
+    object_type = payload.get("object")
+    if object_type == "conversationMessage":
+        return {
+            "reservation_id": obj.get("reservationId"),
+            "conversation_id": obj.get("conversationId"),
+        }
+    if object_type in ("reservation", "task"):
+        return {f"{object_type}_id": obj.get("id")}
+    return {}
+
+
+def get_partition(payload, partition_count):
+    """Maps a payload to a partition by a stable hash of its entity key."""
+    return zlib.crc32(repr(get_entity_key(payload)).encode()) % partition_count
+
+
+def dispatcher(partition_queues):
+    """
+    Claims payloads from the Hostaway payload queue and routes them to the partition worker owning their entity key.
+    A None payload is forwarded to every partition worker, which drain their partition before exiting.
+    The lease of the claimed payloads is renewed every third of the visibility timeout until they are
+    acknowledged, or they would be claimed again and processed twice, out of order.
     """
-    Worker function to continuously process webhook payloads from the Hostaway payload queue.
+    lease_renewal_interval = jobs.hostaway_webhook_queue.visibility_timeout / 3
+    next_renewal = time.monotonic() + lease_renewal_interval
+
+    while True:
+        if time.monotonic() >= next_renewal:
+            renew_leases()
+            next_renewal = time.monotonic() + lease_renewal_interval
+
+        try:
+            items = jobs.hostaway_webhook_queue.get_batch(
+                PARTITION_QUEUE_SIZE, timeout=next_renewal - time.monotonic()
+            )
+        except Empty:
+            continue
+        except Exception as e:
+            notifier.error(f"Failed to claim Hostaway webhook payloads: {e}")
+            time.sleep(1)  # Avoid a hot loop while the queue storage is unavailable
+            continue
+
+        with __claimed_lock:
+            __claimed_ids.update(item.id for item in items if item is not None)
+
+        for item in items:
+            if item is None:  # Drain and stop all workers if a None payload is received
+                for partition_queue in partition_queues:
+                    partition_queue.put(None)
+                return
+
+            partition_queue = partition_queues[
+                get_partition(item.payload, len(partition_queues))
+            ]
+            while True:  # Keep renewing the leases while a slow partition is full
+                if time.monotonic() >= next_renewal:
+                    renew_leases()
+                    next_renewal = time.monotonic() + lease_renewal_interval
+                try:
+                    partition_queue.put(
+                        item, timeout=max(next_renewal - time.monotonic(), 0)
+                    )
+                    break
+                except Full:
+                    continue
+
+
+def worker(app, partition_queue, batch_size=1, batch_wait=0.0):
+    """
+    Worker function to continuously process webhook payloads from one partition of the Hostaway payload queue.
+    With a batch_size above 1, payloads are applied in micro-batches of up to batch_size payloads,
+    collected for at most batch_wait seconds, each batch committed in a single transaction.
+    Payloads referencing a reservation missing from the database are parked, along with any later
+    payload for the same entity, while the reservation is fetched; the worker moves on meanwhile.
     Assumes the queue is populated with validated Hostaway webhook payloads.
     """
+    # Entity key -> payloads waiting for a reservation to be fetched, in order
+    parked = {}
+
     with app.app_context():
         while True:
-            try:
-                # Get a payload from the queue
-                payload = hostaway_webhook_queue.get()
+            items = collect_batch(partition_queue, batch_size, batch_wait)
 
-                if payload is None:  # Exit the worker if a None payload is received
-                    break
+            queued_items = []
+            # Entity keys with a payload in the batch: an earlier payload may create the reservation
+            batch_keys = set()
+            for item in items:
+                if item is None:
+                    continue
+                if isinstance(item, ResumeParked):
+                    queued_items.extend(parked.pop(item.entity_key, []))
+                    batch_keys.add(item.entity_key)
+                    continue
+
+                entity_key = get_entity_key(item.payload)
+                if entity_key in batch_keys or not park_item(
+                    item, parked, partition_queue
+                ):
+                    queued_items.append(item)
+                    batch_keys.add(entity_key)
 
-                if (
-                    str(payload) == "{'data': 'test'}"
-                ):  # Ignore test payload during webhook registration event
-                    logger.log_inform(
-                        "Test payload received. Ignoring...", logger="hostaway"
+            if items[-1] is None and parked:
+                # Draining: process the parked payloads now, joining their in-flight fetches
+                for waiting_items in parked.values():
+                    queued_items.extend(waiting_items)
+                parked.clear()
+
+            if len(queued_items) == 1:
+                process_item(queued_items[0])
+            elif queued_items:
+                process_batch(queued_items)
+
+            # Acknowledge the payloads so they are removed from the durable queue
+            if queued_items:
+                try:
+                    jobs.hostaway_webhook_queue.ack([item.id for item in queued_items])
+                except Exception as e:
+                    notifier.error(
+                        f"Failed to acknowledge Hostaway webhook payloads: {e}"
                     )
-                    continue
+                # Even if the acknowledgement failed: they're redelivered once their lease expires
+                release_leases([item.id for item in queued_items])
 
-                # Send to Hostaway event handler
-                hostaway_event_handler.handle_event(payload)
+            for _ in items:
+                partition_queue.task_done()
 
-            except Exception as e:
-                notifier.error(
-                    f"Failed to process Hostaway webhook payload: {e}. Data: {payload}"
-                )
+            if items[-1] is None:  # Exit the worker if a None payload is received
+                break
 
-            finally:
-                hostaway_webhook_queue.task_done()
+
+def park_item(item, parked, partition_queue):
+    """
+    Parks a queued payload if it has to wait for a reservation to be fetched from Hostaway.
+    A payload waits if earlier payloads for its entity are parked, or if the reservation it references
+    is missing, in which case a fetch is requested and the partition is resumed when it completes.
+    Returns True if the payload was parked.
+    """
+    entity_key = get_entity_key(item.payload)
+    if entity_key in parked:
+        parked[entity_key].append(item)
+        return True
+
+    reservation_id = get_referenced_reservation_id(item.payload)
+    if reservation_id is None:
+        return False
+
+    try:
+        if reservation_index.reservation_exists(reservation_id):
+            return False
+    except Exception as e:
+        # Let the event handler deal with it, as if the payload had never been parked
+        notifier.error(f"Failed to check if reservation {reservation_id} exists: {e}")
+        return False
+
+    parked[entity_key] = [item]
+    if not hydration_service.request(
+        reservation_id, lambda success: __resume(partition_queue, entity_key)
+    ):
+        # No hydration thread: the event handler fetches the reservation inline
+        del parked[entity_key]
+        return False
+
+    return True
+
+
+def renew_leases():
+    """Extends the lease of the payloads claimed from the Hostaway payload queue, not acknowledged yet."""
+    with __claimed_lock:
+        item_ids = list(__claimed_ids)
+    try:
+        jobs.hostaway_webhook_queue.extend_lease(item_ids)
+    except Exception as e:
+        notifier.error(
+            f"Failed to extend the lease of claimed Hostaway webhook payloads: {e}"
+        )
+
+
+def release_leases(item_ids):
+    """Stops renewing the lease of processed payloads."""
+    with __claimed_lock:
+        __claimed_ids.difference_update(item_ids)
+
+
+def __resume(partition_queue, entity_key):
+    """Wakes the partition worker up to process the payloads parked for an entity."""
+    try:
+        partition_queue.put_nowait(ResumeParked(entity_key))
+    except Full:
+        # Never block the caller on a full partition, it may be the partition worker itself
+        Thread(
+            target=partition_queue.put, args=(ResumeParked(entity_key),), daemon=True
+        ).start()
+
+
+def collect_batch(partition_queue, batch_size, batch_wait):
+    """
+    Blocks for the next queued item, then collects up to batch_size items arriving within batch_wait seconds.
+    A None item ends the batch.
+    """
+    items = [partition_queue.get()]
+    deadline = time.monotonic() + batch_wait
+
+    while len(items) < batch_size and items[-1] is not None:
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining > 0:
+                items.append(partition_queue.get(timeout=remaining))
+            else:
+                items.append(partition_queue.get_nowait())
+        except Empty:
+            break
+
+    return items
+
+
+def process_item(item):
+    """Processes a single queued payload, committing its changes on its own."""
+    try:
+        with __trace(item):
+            process_payload(item.payload)
+
+    except Exception as e:
+        # Leave the worker's session usable for the next payload, whatever failed
+        rollback()
+        PAYLOAD_FAILURES.inc()
+        notifier.error(
+            f"Failed to process Hostaway webhook payload: {e}. Data: {item.payload}"
+        )
+
+
+def process_batch(items):
+    """
+    Processes queued payloads in a single database transaction.
+    Each payload runs in its own savepoint, so a bad payload is rolled back without affecting the others.
+    If the batch fails to commit, its payloads are retried one by one with per-payload commits.
+    """
+    try:
+        with unit_of_work():
+            for item in items:
+                try:
+                    with __trace(item), savepoint():
+                        process_payload(item.payload)
+
+                except Exception as e:
+                    PAYLOAD_FAILURES.inc()
+                    notifier.error(
+                        f"Failed to process Hostaway webhook payload: {e}. Data: {item.payload}"
+                    )
+
+    except Exception as e:
+        logger.log_warning(
+            f"Failed to commit batch of {len(items)} Hostaway webhook payloads: {e}. Retrying payloads individually...",
+            logger="hostaway",
+        )
+        for item in items:
+            process_item(item)
+
+
+def process_payload(payload):
+    """Sends a single Hostaway webhook payload to the Hostaway event handler."""
+    if (
+        str(payload) == "{'data': 'test'}"
+    ):  # Ignore test payload during webhook registration event
+        logger.log_inform("Test payload received. Ignoring...", logger="hostaway")
+        return
+
+    with logger.timed(
+        "Hostaway webhook payload processed",
+        logger="hostaway",
+        hostaway_event=payload.get("event"),
+        **get_log_fields(payload),
+    ):
+        hostaway_event_handler.handle_event(payload)
+
+
+def __trace(item):
+    """Records the processing of a queued payload as a segment of the trace started when it was received."""
+    return tracing.trace(
+        item.trace_id,
+        "process",
+        queued_at=item.enqueued_at,
+        attempt=item.attempts,
+        hostaway_event=(
+            item.payload.get("event") if isinstance(item.payload, dict) else None
+        ),
+        **get_log_fields(item.payload),
+    )
 
 
 def start_worker(app):
     """
-    Start the worker function in a separate thread.
+    Start the dispatcher and a pool of partition workers in separate threads.
+    The pool size is read from the HOSTAWAY_WEBHOOK_WORKER_COUNT setting, and micro-batching
+    from HOSTAWAY_WEBHOOK_BATCH_SIZE and HOSTAWAY_WEBHOOK_BATCH_WAIT_MS.
     Assumes the job queue is populated with validated Hostaway webhook payloads.
     """
-    worker_thread = Thread(target=worker, args=(app,))
-    worker_thread.daemon = True
-    worker_thread.start()
-    return worker_thread
+    worker_count = max(
+        int(app.config.get("HOSTAWAY_WEBHOOK_WORKER_COUNT") or DEFAULT_WORKER_COUNT),
+        1,
+    )
+    batch_size = max(int(app.config.get("HOSTAWAY_WEBHOOK_BATCH_SIZE") or 1), 1)
+    batch_wait = int(app.config.get("HOSTAWAY_WEBHOOK_BATCH_WAIT_MS") or 0) / 1000
+    partition_queues = [
+        Queue(maxsize=PARTITION_QUEUE_SIZE) for _ in range(worker_count)
+    ]
+
+    # Named threads, so they can be told apart in profiles (see /admin/profile)
+    threads = [
+        Thread(
+            target=dispatcher,
+            args=(partition_queues,),
+            name="hostaway-webhook-dispatcher",
+        )
+    ]
+    threads.extend(
+        Thread(
+            target=worker,
+            args=(app, partition_queue, batch_size, batch_wait),
+            name=f"hostaway-webhook-worker-{index}",
+        )
+        for index, partition_queue in enumerate(partition_queues)
+    )
+    # Load the known reservation ids so existence checks don't hit the database
+    with app.app_context():
+        try:
+            reservation_index.warm()
+        except Exception as e:
+            notifier.error(f"Failed to warm the reservation index: {e}")
+
+    # Fetch missing reservations in the background, so payloads waiting for them don't block workers
+    hydration_service.start(app)
+
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    __pool_threads[:] = threads
+    __partition_queues[:] = partition_queues
+    return threads
+
+
+def stop_worker(timeout=30):
+    """
+    Stop the worker pool after the payloads already dispatched have been processed.
+    Payloads still waiting in the durable queue are left there for the next start.
+    """
+    if not __pool_threads:
+        return
+
+    jobs.hostaway_webhook_queue.put(None)
+    for thread in __pool_threads:
+        thread.join(timeout)
+    __pool_threads.clear()
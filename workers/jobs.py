@@ -1,9 +1,91 @@
+import time
 from queue import Queue
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.schema import CreateColumn
 
-# Create a global job queue for processing Hostaway webhook payloads
-# Each queue item is a Hostaway webhook payload
-hostaway_webhook_queue = Queue()
+from db import db
+import models
+from utils import metrics, memory
+from utils.persistent_queue import PersistentQueue
+
+# Create a global, durable job queue for processing Hostaway webhook payloads
+# Each queue item is a Hostaway webhook payload, persisted until a worker acknowledges it
+hostaway_webhook_queue = PersistentQueue("hostaway_webhook")
 
 # Create a global job queue for processing Slack slash command payloads
 # Each queue item is a tuple: (slack command, request)
 slack_command_queue = Queue()
+
+
+# The queue's stats run an aggregate query: the metrics of one scrape share it
+QUEUE_STATS_MAX_AGE_SECONDS = 1.0
+__queue_stats = None  # (expires at, Hostaway webhook queue stats)
+
+
+def __get_queue_stats():
+    global __queue_stats
+    now = time.monotonic()
+    if __queue_stats is None or __queue_stats[0] <= now:
+        __queue_stats = (
+            now + QUEUE_STATS_MAX_AGE_SECONDS,
+            hostaway_webhook_queue.stats(),
+        )
+    return __queue_stats[1]
+
+
+def __get_queue_entries():
+    stats = __get_queue_stats()
+    return {
+        ("hostaway_webhook", "ready"): stats["ready"],
+        ("hostaway_webhook", "in_flight"): stats["in_flight"],
+        ("hostaway_webhook", "dead"): stats["dead"],
+        ("slack_command", "ready"): slack_command_queue.qsize(),
+    }
+
+
+metrics.gauge(
+    "job_queue_entries",
+    "Entries of the job queues, by state (in_flight: claimed, not yet acknowledged; dead: out of attempts).",
+    labels=("queue", "state"),
+    callback=__get_queue_entries,
+)
+metrics.gauge(
+    "job_queue_lag_seconds",
+    "Age of the oldest Hostaway webhook payload waiting to be claimed.",
+    labels=("queue",),
+    callback=lambda: {("hostaway_webhook",): __get_queue_stats()["lag_seconds"] or 0.0},
+)
+memory.register_queue("slack_command", lambda: slack_command_queue)
+
+
+def initialize(app):
+    """
+    Bind the persistent job queues to their storage.
+    Uses JOB_QUEUE_DATABASE_URI if configured (e.g. a local SQLite file), otherwise the application database.
+    """
+    queue_database_uri = app.config.get("JOB_QUEUE_DATABASE_URI")
+    if queue_database_uri:
+        engine = create_engine(queue_database_uri)
+        models.QueuedJob.__table__.create(engine, checkfirst=True)
+        __add_missing_columns(engine)
+    else:
+        with app.app_context():
+            engine = db.engine
+
+    hostaway_webhook_queue.bind(engine)
+
+
+def __add_missing_columns(engine):
+    """
+    The separate job queue store isn't migrated with the application database:
+    add the (nullable) columns added to the job_queue table since it was created.
+    """
+    table = models.QueuedJob.__table__
+    existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+    with engine.begin() as connection:
+        for column in table.columns:
+            if column.name not in existing:
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD COLUMN "
+                    f"{CreateColumn(column).compile(dialect=engine.dialect)}"
+                )
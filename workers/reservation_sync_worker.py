@@ -1,36 +1,67 @@
 import time
 from threading import Thread
 
+from db import rollback
 from services import reservation_sync_service
 from utils import notifier
 
+# How often the incremental sync checks for windows due for a re-scan, in seconds
+INCREMENTAL_SYNC_CHECK_INTERVAL = 15 * 60
+
 
 def worker(app):
-    """Worker that runs the reservation sync process daily at midnight."""
+    """
+    Worker that keeps reservations in sync with Hostaway.
+    In incremental mode (the default), the windows of the portfolio due for a re-scan are synced every
+    INCREMENTAL_SYNC_CHECK_INTERVAL seconds. In full mode, every reservation is synced at startup and daily at midnight.
+    """
     with app.app_context():
-        # Sync reservations once at application startup
+        if app.config.get("RESERVATION_SYNC_MODE", "incremental") == "full":
+            __sync_fully_at_midnight()
+        else:
+            history_months = int(
+                app.config.get("RESERVATION_SYNC_HISTORY_MONTHS")
+                or reservation_sync_service.DEFAULT_HISTORY_MONTHS
+            )
+            __sync_incrementally(history_months)
+
+
+def __sync_incrementally(history_months):
+    while True:
         try:
-            reservation_sync_service.sync_reservations_with_hostaway()
+            reservation_sync_service.sync_reservations_incrementally(history_months)
         except Exception as e:
+            rollback()
             notifier.error(f"Failed to sync reservations: {str(e)}")
+        time.sleep(INCREMENTAL_SYNC_CHECK_INTERVAL)
+
+
+def __sync_fully_at_midnight():
+    # Sync reservations once at application startup
+    try:
+        reservation_sync_service.sync_reservations_with_hostaway()
+    except Exception as e:
+        rollback()
+        notifier.error(f"Failed to sync reservations: {str(e)}")
 
-        # Sync reservations daily at midnight
-        while True:
-            current_time = time.strftime("%H:%M")
-            if current_time == "00:00":
-                try:
-                    reservation_sync_service.sync_reservations_with_hostaway()
-                except Exception as e:
-                    notifier.error(f"Failed to sync reservations: {str(e)}")
-            time.sleep(60)  # Wait for 1 minute before checking again
+    # Sync reservations daily at midnight
+    while True:
+        current_time = time.strftime("%H:%M")
+        if current_time == "00:00":
+            try:
+                reservation_sync_service.sync_reservations_with_hostaway()
+            except Exception as e:
+                rollback()
+                notifier.error(f"Failed to sync reservations: {str(e)}")
+        time.sleep(60)  # Wait for 1 minute before checking again
 
 
 def start_worker(app):
     """
     Start the worker function in a separate thread.
-    Worker runs the reservation sync process daily at midnight.
+    Worker keeps reservations in sync with Hostaway, incrementally or daily at midnight (see RESERVATION_SYNC_MODE).
     """
-    worker_thread = Thread(target=worker, args=(app,))
+    worker_thread = Thread(target=worker, args=(app,), name="reservation-sync-worker")
     worker_thread.daemon = True
     worker_thread.start()
     return worker_thread
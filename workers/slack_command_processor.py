@@ -40,7 +40,7 @@ def start_worker(app):
     Start the worker function in a separate thread.
     Assumes the job queue is populated with validated Slack slashcommand payloads.
     """
-    worker_thread = Thread(target=worker, args=(app,))
+    worker_thread = Thread(target=worker, args=(app,), name="slack-command-worker")
     worker_thread.daemon = True
     worker_thread.start()
     return worker_thread
@@ -4,7 +4,9 @@ from utils import hostaway_webhook_manager
 
 
 def start(app):
-    worker_thread = Thread(target=register_webhook, args=(app,))
+    worker_thread = Thread(
+        target=register_webhook, args=(app,), name="webhook-registration"
+    )
     worker_thread.daemon = True
     worker_thread.start()
     return worker_thread